@@ -1,4 +1,4 @@
-import asyncio, random, string
+import asyncio, os, random, string
 import nest_asyncio
 
 nest_asyncio.apply()
@@ -12,7 +12,7 @@ import uuid
 import models
 
 from python.helpers import extract_tools, files, errors, history, tokens, context as context_helper
-from python.helpers import dirty_json
+from python.helpers import dirty_json, push
 from python.helpers.print_style import PrintStyle
 
 from langchain_core.prompts import (
@@ -21,8 +21,8 @@ from langchain_core.prompts import (
 from langchain_core.messages import SystemMessage, BaseMessage
 
 import python.helpers.log as Log
-from python.helpers.dirty_json import DirtyJson
-from python.helpers.defer import DeferredTask
+from python.helpers.dirty_json import DirtyJsonStream
+from python.helpers.defer import DeferredTask, EventLoopPool
 from typing import Callable
 from python.helpers.localization import Localization
 from python.helpers.extension import call_extensions
@@ -40,6 +40,7 @@ class AgentContext:
     _contexts: dict[str, "AgentContext"] = {}
     _counter: int = 0
     _notification_manager = None
+    _loop_pool: EventLoopPool | None = None
 
     def __init__(
         self,
@@ -82,6 +83,7 @@ class AgentContext:
         self.last_message = last_message or datetime.now(timezone.utc)
         self.data = data or {}
         self.output_data = output_data or {}
+        push.notify()
 
 
 
@@ -135,11 +137,24 @@ class AgentContext:
             cls._notification_manager = NotificationManager()
         return cls._notification_manager
 
+    @classmethod
+    def get_loop_pool(cls):
+        # chats run on a pool of event loops so sync work in one does not stall the others
+        if cls._loop_pool is None:
+            from python.helpers.dotenv import get_dotenv_value
+            size = int(get_dotenv_value("AGENT_EVENT_LOOPS", 0) or 0)
+            cls._loop_pool = EventLoopPool(
+                cls.__name__, size or min(8, os.cpu_count() or 1)
+            )
+        return cls._loop_pool
+
     @staticmethod
     def remove(id: str):
         context = AgentContext._contexts.pop(id, None)
         if context and context.task:
             context.task.kill()
+        AgentContext.get_loop_pool().release(id)
+        push.notify()
         return context
 
     def get_data(self, key: str, recursive: bool = True):
@@ -169,7 +184,7 @@ class AgentContext:
             ),
             "no": self.no,
             "log_guid": self.log.guid,
-            "log_version": len(self.log.updates),
+            "log_version": self.log.version,
             "log_length": len(self.log.logs),
             "paused": self.paused,
             "last_message": (
@@ -245,7 +260,7 @@ class AgentContext:
     ):
         if not self.task:
             self.task = DeferredTask(
-                thread_name=self.__class__.__name__,
+                thread_name=AgentContext.get_loop_pool().place(self.id),
             )
         self.task.start_task(func, *args, **kwargs)
         return self.task
@@ -302,6 +317,8 @@ class LoopData:
         self.system = []
         self.user_message: history.Message | None = None
         self.history_output: list[history.OutputMessage] = []
+        # set by extensions that edit history_output content in place (nested)
+        self.history_output_changed = False
         self.extras_temporary: OrderedDict[str, history.MessageContent] = OrderedDict()
         self.extras_persistent: OrderedDict[str, history.MessageContent] = OrderedDict()
         self.last_response = ""
@@ -330,7 +347,7 @@ class Agent:
 
     DATA_NAME_SUPERIOR = "_superior"
     DATA_NAME_SUBORDINATE = "_subordinate"
-    DATA_NAME_CTX_WINDOW = "ctx_window"
+    DATA_NAME_CTX_WINDOW = "_ctx_window"
 
     def __init__(
         self, number: int, config: AgentConfig, context: AgentContext | None = None
@@ -490,6 +507,8 @@ class Agent:
         # set system prompt and message history
         loop_data.system = await self.get_system_prompt(self.loop_data)
         loop_data.history_output = self.history.output()
+        loop_data.history_output_changed = False
+        history_contents = history.output_contents(loop_data.history_output)
 
         # and allow extensions to edit them
         await self.call_extensions("message_loop_prompts_after", loop_data=loop_data)
@@ -506,32 +525,40 @@ class Agent:
                     {**loop_data.extras_persistent, **loop_data.extras_temporary}
                 ),
             ),
-        ).output()
+        ).output_langchain()
         loop_data.extras_temporary.clear()
 
         # convert history + extras to LLM format
-        history_langchain: list[BaseMessage] = history.output_langchain(
-            loop_data.history_output + extras
-        )
+        # history records cache their conversion, unless extensions edited the output
+        if not loop_data.history_output_changed and history.output_unchanged(
+            loop_data.history_output, history_contents
+        ):
+            history_langchain = self.history.output_langchain()
+        else:
+            history_langchain = history.output_langchain(loop_data.history_output)
+        history_langchain = history.join_messages_abab(history_langchain, extras)
 
         # build full prompt from system prompt, message history and extrS
         full_prompt: list[BaseMessage] = [
             SystemMessage(content=system_text),
             *history_langchain,
         ]
-        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
-
-        # store as last context window content
-        self.set_data(
-            Agent.DATA_NAME_CTX_WINDOW,
-            {
-                "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
-            },
-        )
+
+        # store as last context window content, text is rendered on request
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW, {"messages": full_prompt})
 
         return full_prompt
 
+    def get_ctx_window(self) -> dict:
+        window = self.get_data(Agent.DATA_NAME_CTX_WINDOW)
+        if not window or not isinstance(window, dict):
+            return {"text": "", "tokens": 0}
+        if "text" not in window:
+            text = ChatPromptTemplate.from_messages(window["messages"]).format()
+            window["text"] = text
+            window["tokens"] = tokens.approximate_tokens(text)
+        return window
+
     def handle_critical_exception(self, exception: Exception):
         if isinstance(exception, HandledException):
             raise exception  # Re-raise the exception to kill the loop
@@ -661,20 +688,10 @@ class Agent:
         return self.history.output_text(human_label="user", ai_label="assistant")
 
     def get_chat_model(self):
-        return models.get_chat_model(
-            self.config.chat_model.provider,
-            self.config.chat_model.name,
-            model_config=self.config.chat_model,
-            **self.config.chat_model.build_kwargs(),
-        )
+        return models.get_cached_model("chat", self.config.chat_model)
 
     def get_utility_model(self):
-        return models.get_chat_model(
-            self.config.utility_model.provider,
-            self.config.utility_model.name,
-            model_config=self.config.utility_model,
-            **self.config.utility_model.build_kwargs(),
-        )
+        return models.get_cached_model("chat", self.config.utility_model)
 
     def get_browser_model(self):
         return models.get_browser_model(
@@ -685,12 +702,7 @@ class Agent:
         )
 
     def get_embedding_model(self):
-        return models.get_embedding_model(
-            self.config.embeddings_model.provider,
-            self.config.embeddings_model.name,
-            model_config=self.config.embeddings_model,
-            **self.config.embeddings_model.build_kwargs(),
-        )
+        return models.get_cached_model("embedding", self.config.embeddings_model)
 
     async def call_utility_model(
         self,
@@ -876,13 +888,19 @@ class Agent:
         try:
             if len(stream) < 25:
                 return  # no reason to try
-            response = DirtyJson.parse_string(stream)
+            # one incremental parser per loop iteration, only new text is parsed
+            parser = self.loop_data.params_temporary.get("response_stream_parser")
+            if parser is None:
+                parser = DirtyJsonStream()
+                self.loop_data.params_temporary["response_stream_parser"] = parser
+            response = parser.update(stream)
             if isinstance(response, dict):
                 await self.call_extensions(
                     "response_stream",
                     loop_data=self.loop_data,
                     text=stream,
-                    parsed=response,
+                    # shallow copy, extensions may replace values
+                    parsed=dict(response),
                 )
 
         except Exception as e:
@@ -894,26 +912,26 @@ class Agent:
         from python.tools.unknown import Unknown
         from python.helpers.tool import Tool
 
-        classes = []
+        tool_class = None
 
-        # try agent tools first
+        # try agent tools first, classes are cached until their files change
         if self.config.profile:
             try:
-                classes = extract_tools.load_classes_from_file(
-                    "agents/" + self.config.profile + "/tools/" + name + ".py", Tool  # type: ignore[arg-type]
+                tool_class = extract_tools.load_class_by_name(
+                    "agents/" + self.config.profile + "/tools", name, Tool  # type: ignore[arg-type]
                 )
             except Exception:
                 pass
 
         # try default tools
-        if not classes:
+        if not tool_class:
             try:
-                classes = extract_tools.load_classes_from_file(
-                    "python/tools/" + name + ".py", Tool  # type: ignore[arg-type]
+                tool_class = extract_tools.load_class_by_name(
+                    "python/tools", name, Tool  # type: ignore[arg-type]
                 )
             except Exception as e:
                 pass
-        tool_class = classes[0] if classes else Unknown
+        tool_class = tool_class or Unknown
         return tool_class(
             agent=self, name=name, method=method, args=args, message=message, loop_data=loop_data, **kwargs
         )
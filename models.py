@@ -1,12 +1,18 @@
+from abc import abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
+import asyncio
+import json
 import logging
 import os
+import threading
+import weakref
 from typing import (
     Any,
     Awaitable,
     Callable,
     List,
+    Mapping,
     Optional,
     Iterator,
     AsyncIterator,
@@ -17,14 +23,17 @@ from typing import (
 from litellm import completion, acompletion, embedding
 import litellm
 import openai
+import httpx
 from litellm.types.utils import ModelResponse
 
-from python.helpers import dotenv
+from python.helpers import dotenv, files
 from python.helpers import settings, dirty_json
 from python.helpers.dotenv import load_dotenv
 from python.helpers.providers import get_provider_config
-from python.helpers.rate_limiter import RateLimiter
-from python.helpers.tokens import approximate_tokens
+from python.helpers.rate_limiter import RateLimiter, SharedRateLimiter
+from python.helpers.embedding_batcher import EmbeddingBatcher
+from python.helpers.defer import EventLoopThread
+from python.helpers.tokens import approximate_tokens, estimate_tokens
 from python.helpers import dirty_json, browser_use_monkeypatch
 
 from langchain_core.language_models.chat_models import SimpleChatModel
@@ -61,6 +70,98 @@ browser_use_monkeypatch.apply()
 
 litellm.modify_params = True # helps fix anthropic tool calls by browser-use
 
+
+class _ClosingStream(httpx.AsyncByteStream):
+    # response body that closes its single-use transport when done
+    def __init__(self, stream: httpx.AsyncByteStream, transport: httpx.AsyncHTTPTransport):
+        self._stream = stream
+        self._transport = transport
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            await self._transport.aclose()
+
+
+class _LoopLocalTransport(httpx.AsyncBaseTransport):
+    """Keep-alive connection pool per event loop.
+
+    httpx pools are bound to the loop they are used on and chats run on
+    several loops (see Agent.get_loop_pool), so one shared client dispatches
+    each request to the pool of the calling loop. Only loops of
+    EventLoopThread live for the whole process, requests from other loops
+    (asyncio.run in sync wrappers) use a connection closed with the response.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._pools: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> httpx.AsyncHTTPTransport | None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                if not any(
+                    thread.loop is loop
+                    for thread in list(EventLoopThread._instances.values())
+                ):
+                    return None
+                pool = self._pools[loop] = httpx.AsyncHTTPTransport(limits=self.limits)
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        pool = self._get_pool()
+        if pool is not None:
+            return await pool.handle_async_request(request)
+
+        transport = httpx.AsyncHTTPTransport(limits=self.limits)
+        try:
+            response = await transport.handle_async_request(request)
+        except BaseException:
+            await transport.aclose()
+            raise
+        response.stream = _ClosingStream(response.stream, transport)  # type: ignore
+        return response
+
+    async def aclose(self):
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool:
+            await pool.aclose()
+
+
+class _SharedAsyncClient(httpx.AsyncClient):
+    # shared by all clients litellm creates, must outlive each of them
+    async def aclose(self):
+        pass
+
+
+def _uses_env_proxy() -> bool:
+    # a custom transport disables httpx proxy detection, keep litellm defaults then
+    return any(
+        os.environ.get(name)
+        for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy")
+    )
+
+
+# pooled async HTTP session for litellm, reuses connections and TLS sessions between calls
+if litellm.aclient_session is None and not _uses_env_proxy():
+    litellm.aclient_session = _SharedAsyncClient(
+        transport=_LoopLocalTransport(
+            httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+        ),
+        timeout=None,  # timeouts are set per request
+    )
+
 class ModelType(Enum):
     CHAT = "Chat"
     EMBEDDING = "Embedding"
@@ -85,6 +186,25 @@ class ModelConfig:
             kwargs["api_base"] = self.api_base
         return kwargs
 
+    def fingerprint(self) -> str:
+        """All values of the config, equal configs share cached model wrappers."""
+        return json.dumps(
+            [
+                self.type.value,
+                self.provider,
+                self.name,
+                self.api_base,
+                self.ctx_length,
+                self.limit_requests,
+                self.limit_input,
+                self.limit_output,
+                self.vision,
+                self.kwargs,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
 
 class ChatChunk(TypedDict):
     """Simplified response chunk for chat models."""
@@ -196,16 +316,25 @@ class ChatGenerationResult:
 
 rate_limiters: dict[str, RateLimiter] = {}
 api_keys_round_robin: dict[str, int] = {}
+# model wrappers by kind and model config values, see get_cached_model
+model_cache: dict[tuple[str, str], Any] = {}
+model_cache_lock = threading.Lock()
+embedding_batchers: dict[str, EmbeddingBatcher] = {}
+embedding_dimensions: dict[str, int] = {}
 
 
-def get_api_key(service: str) -> str:
-    # get api key for the service
-    key = (
+def _get_api_key_value(service: str) -> str:
+    return (
         dotenv.get_dotenv_value(f"API_KEY_{service.upper()}")
         or dotenv.get_dotenv_value(f"{service.upper()}_API_KEY")
         or dotenv.get_dotenv_value(f"{service.upper()}_API_TOKEN")
         or "None"
     )
+
+
+def get_api_key(service: str) -> str:
+    # get api key for the service
+    key = _get_api_key_value(service)
     # if the key contains a comma, use round-robin
     if "," in key:
         api_keys = [k.strip() for k in key.split(",") if k.strip()]
@@ -218,7 +347,15 @@ def get_rate_limiter(
     provider: str, name: str, requests: int, input: int, output: int
 ) -> RateLimiter:
     key = f"{provider}\\{name}"
-    rate_limiters[key] = limiter = rate_limiters.get(key, RateLimiter(seconds=60))
+    limiter = rate_limiters.get(key)
+    if not limiter:
+        # sqlite file shared by several processes using the same providers
+        shared_db = dotenv.get_dotenv_value("RATE_LIMIT_SHARED_DB")
+        if shared_db:
+            limiter = SharedRateLimiter(files.get_abs_path(shared_db), key, seconds=60)
+        else:
+            limiter = RateLimiter(seconds=60)
+        rate_limiters[key] = limiter
     limiter.limits["requests"] = requests or 0
     limiter.limits["input"] = input or 0
     limiter.limits["output"] = output or 0
@@ -256,6 +393,7 @@ async def apply_rate_limiter(
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
+    fifo: bool = True,
 ):
     if not model_config:
         return
@@ -266,9 +404,12 @@ async def apply_rate_limiter(
         model_config.limit_input,
         model_config.limit_output,
     )
-    limiter.add(input=approximate_tokens(input_text))
-    limiter.add(requests=1)
-    await limiter.wait(rate_limiter_callback)
+    await limiter.wait(
+        rate_limiter_callback,
+        fifo=fifo,
+        input=approximate_tokens(input_text),
+        requests=1,
+    )
     return limiter
 
 
@@ -284,8 +425,9 @@ def apply_rate_limiter_sync(
     import asyncio, nest_asyncio
 
     nest_asyncio.apply()
+    # the nested loop blocks the caller's loop, queueing behind its waiters could deadlock
     return asyncio.run(
-        apply_rate_limiter(model_config, input_text, rate_limiter_callback)
+        apply_rate_limiter(model_config, input_text, rate_limiter_callback, fifo=False)
     )
 
 
@@ -521,11 +663,11 @@ class LiteLLMChatWrapper(SimpleChatModel):
                             if tokens_callback:
                                 await tokens_callback(
                                     output["reasoning_delta"],
-                                    approximate_tokens(output["reasoning_delta"]),
+                                    estimate_tokens(output["reasoning_delta"]),
                                 )
                             # Add output tokens to rate limiter if configured
                             if limiter:
-                                limiter.add(output=approximate_tokens(output["reasoning_delta"]))
+                                limiter.add(output=estimate_tokens(output["reasoning_delta"]))
                         # collect response delta and call callbacks
                         if output["response_delta"]:
                             if response_callback:
@@ -533,11 +675,11 @@ class LiteLLMChatWrapper(SimpleChatModel):
                             if tokens_callback:
                                 await tokens_callback(
                                     output["response_delta"],
-                                    approximate_tokens(output["response_delta"]),
+                                    estimate_tokens(output["response_delta"]),
                                 )
                             # Add output tokens to rate limiter if configured
                             if limiter:
-                                limiter.add(output=approximate_tokens(output["response_delta"]))
+                                limiter.add(output=estimate_tokens(output["response_delta"]))
 
                 # non-stream response
                 else:
@@ -657,7 +799,59 @@ class BrowserCompatibleChatWrapper(ChatOpenRouter):
 
         return resp
 
-class LiteLLMEmbeddingWrapper(Embeddings):
+class BatchedEmbeddings(Embeddings):
+    """Embeddings routed through a shared EmbeddingBatcher per model,
+    async calls wait on the batcher without blocking the event loop."""
+
+    model_name: str
+    a0_model_conf: Optional[ModelConfig] = None
+
+    @abstractmethod
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch synchronously, called from the batcher worker thread."""
+
+    @abstractmethod
+    def _cache_key(self) -> str:
+        """Provider, model and kwargs, keys the shared batcher and dimension."""
+
+    def _get_batcher(self) -> EmbeddingBatcher:
+        key = self._cache_key()
+        if key not in embedding_batchers:
+            embedding_batchers[key] = EmbeddingBatcher(
+                self._embed_batch, name=self.model_name
+            )
+        return embedding_batchers[key]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Apply rate limiting if configured
+        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+        return self._get_batcher().embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Apply rate limiting if configured
+        await apply_rate_limiter(self.a0_model_conf, " ".join(texts))
+        return await self._get_batcher().aembed(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def get_dimension(self) -> int:
+        key = self._cache_key()
+        if key not in embedding_dimensions:
+            embedding_dimensions[key] = len(self.embed_query("example"))
+        return embedding_dimensions[key]
+
+    async def aget_dimension(self) -> int:
+        key = self._cache_key()
+        if key not in embedding_dimensions:
+            embedding_dimensions[key] = len(await self.aembed_query("example"))
+        return embedding_dimensions[key]
+
+
+class LiteLLMEmbeddingWrapper(BatchedEmbeddings):
     model_name: str
     kwargs: dict = {}
     a0_model_conf: Optional[ModelConfig] = None
@@ -673,26 +867,19 @@ class LiteLLMEmbeddingWrapper(Embeddings):
         self.kwargs = kwargs
         self.a0_model_conf = model_config
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+    def _cache_key(self) -> str:
+        # different api keys / endpoints must not share a batch
+        return self.model_name + repr(sorted(self.kwargs.items(), key=lambda x: x[0]))
 
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
         resp = embedding(model=self.model_name, input=texts, **self.kwargs)
         return [
             item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
             for item in resp.data  # type: ignore
         ]
 
-    def embed_query(self, text: str) -> List[float]:
-        # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, text)
-
-        resp = embedding(model=self.model_name, input=[text], **self.kwargs)
-        item = resp.data[0]  # type: ignore
-        return item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
-
 
-class LocalSentenceTransformerWrapper(Embeddings):
+class LocalSentenceTransformerWrapper(BatchedEmbeddings):
     """Local wrapper for sentence-transformers models to avoid HuggingFace API calls"""
 
     def __init__(
@@ -722,24 +909,30 @@ class LocalSentenceTransformerWrapper(Embeddings):
 
         self.model = SentenceTransformer(model, **st_kwargs)
         self.model_name = model
+        self.provider = provider
+        self.st_kwargs = st_kwargs
         self.a0_model_conf = model_config
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+    def _cache_key(self) -> str:
+        # each wrapper loads its own model, devices or revisions must not share a batch
+        return f"{self.provider}/{self.model_name}" + repr(
+            sorted(self.st_kwargs.items(), key=lambda x: x[0])
+        )
 
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # runs in the batcher worker thread, off the event loop
         embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
         return embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings  # type: ignore
 
-    def embed_query(self, text: str) -> List[float]:
-        # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, text)
+    def get_dimension(self) -> int:
+        key = self._cache_key()
+        if key not in embedding_dimensions:
+            dim = self.model.get_sentence_embedding_dimension()
+            embedding_dimensions[key] = dim or super().get_dimension()
+        return embedding_dimensions[key]
 
-        embedding = self.model.encode([text], convert_to_tensor=False)  # type: ignore
-        result = (
-            embedding[0].tolist() if hasattr(embedding[0], "tolist") else embedding[0]
-        )
-        return result  # type: ignore
+    async def aget_dimension(self) -> int:
+        return self.get_dimension()
 
 
 def _get_litellm_chat(
@@ -847,7 +1040,7 @@ def _merge_provider_defaults(
     provider_type: str, original_provider: str, kwargs: dict
 ) -> tuple[str, dict]:
     # Normalize .env-style numeric strings (e.g., "timeout=30") into ints/floats for LiteLLM
-    def _normalize_values(values: dict) -> dict:
+    def _normalize_values(values: Mapping) -> dict:
         result: dict[str, Any] = {}
         for k, v in values.items():
             if isinstance(v, str):
@@ -859,7 +1052,7 @@ def _merge_provider_defaults(
                     except ValueError:
                         result[k] = v
             else:
-                result[k] = v
+                result[k] = settings.thaw(v)
         return result
 
     provider_name = original_provider  # default: unchanged
@@ -881,10 +1074,10 @@ def _merge_provider_defaults(
 
     # Merge LiteLLM global kwargs (timeouts, stream_timeout, etc.)
     try:
-        global_kwargs = settings.get_settings().get("litellm_global_kwargs", {})  # type: ignore[union-attr]
+        global_kwargs = settings.get_snapshot().get("litellm_global_kwargs", {})  # type: ignore[union-attr]
     except Exception:
         global_kwargs = {}
-    if isinstance(global_kwargs, dict):
+    if isinstance(global_kwargs, Mapping):
         for k, v in _normalize_values(global_kwargs).items():
             kwargs.setdefault(k, v)
 
@@ -917,3 +1110,50 @@ def get_embedding_model(
     orig = provider.lower()
     provider_name, kwargs = _merge_provider_defaults("embedding", orig, kwargs)
     return _get_litellm_embedding(name, provider_name, model_config, **kwargs)
+
+
+def get_cached_model(kind: str, model_config: ModelConfig):
+    """Model wrapper of the given kind ("chat" or "embedding") for a model config.
+
+    The wrapper is built once per distinct config values and reused, settings
+    changes clear the cache. Providers with several round-robin api keys get a
+    new wrapper on each call to keep rotating.
+    """
+    factory = {"chat": get_chat_model, "embedding": get_embedding_model}[kind]
+
+    def build():
+        return factory(
+            model_config.provider,
+            model_config.name,
+            model_config=model_config,
+            **model_config.build_kwargs(),
+        )
+
+    provider = model_config.provider.lower()
+    if "," in _get_api_key_value(provider):
+        return build()
+
+    key = (kind, model_config.fingerprint())
+    model = model_cache.get(key)
+    if model is not None:
+        return model
+    model = build()
+    with model_cache_lock:
+        return model_cache.setdefault(key, model)
+
+
+def clear_model_cache():
+    with model_cache_lock:
+        model_cache.clear()
+
+
+def get_embedding_dimension(model: Embeddings) -> int:
+    # unwrap CacheBackedEmbeddings and similar wrappers
+    model = getattr(model, "underlying_embeddings", model)
+    if isinstance(model, BatchedEmbeddings):
+        return model.get_dimension()
+    return len(model.embed_query("example"))
+
+
+def get_embedding_metrics() -> list[dict]:
+    return [batcher.get_metrics() for batcher in embedding_batchers.values()]
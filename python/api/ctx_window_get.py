@@ -1,16 +1,12 @@
 from python.helpers.api import ApiHandler, Input, Output, Request, Response
 
-from python.helpers import tokens
-
 
 class GetCtxWindow(ApiHandler):
     async def process(self, input: Input, request: Request) -> Output:
         ctxid = input.get("context", [])
         context = self.use_context(ctxid)
         agent = context.streaming_agent or context.agent0
-        window = agent.get_data(agent.DATA_NAME_CTX_WINDOW)
-        if not window or not isinstance(window, dict):
-            return {"content": "", "tokens": 0}
+        window = agent.get_ctx_window()
 
         text = window["text"]
         tokens = window["tokens"]
@@ -0,0 +1,13 @@
+from python.helpers.api import ApiHandler, Request, Response
+import models
+
+
+class GetEmbeddingMetrics(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        # queue depth and batch sizes of the embedding batchers, one per embedding model
+        return {"batchers": models.get_embedding_metrics()}
@@ -0,0 +1,13 @@
+from python.helpers.api import ApiHandler, Request, Response
+from agent import AgentContext
+
+
+class GetEventLoops(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        # load of the event loops running chats, to spot one chat stalling others
+        return {"loops": AgentContext.get_loop_pool().metrics()}
@@ -0,0 +1,15 @@
+from python.helpers.api import ApiHandler, Request, Response
+from python.helpers import extension
+
+
+class GetExtensionTimings(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        timings = extension.get_timings()
+        if input.get("reset"):
+            extension.reset_timings()
+        return {"timings": timings}
@@ -23,6 +23,8 @@ class MemoryDashboard(ApiHandler):
                 return await self._bulk_delete_memories(input)
             elif action == "update":
                 return await self._update_memory(input)
+            elif action == "index_info":
+                return await self._get_index_info(input)
             else:
                 return {
                     "success": False,
@@ -127,6 +129,15 @@ class MemoryDashboard(ApiHandler):
                 "memory_subdir": "default",
             }
 
+    async def _get_index_info(self, input: dict) -> dict:
+        """Get vector index type, size and measured recall of a memory subdirectory."""
+        try:
+            memory_subdir = input.get("memory_subdir", "default")
+            memory = await Memory.get_by_subdir(memory_subdir, preload_knowledge=False)
+            return {"success": True, "index": memory.get_index_info()}
+        except Exception as e:
+            return {"success": False, "error": f"Failed to get index info: {str(e)}"}
+
     async def _get_memory_subdirs(self) -> dict:
         """Get available memory subdirectories."""
         try:
@@ -164,12 +175,10 @@ class MemoryDashboard(ApiHandler):
                 memories = docs
             else:
                 # If no search query, get all memories from specified area(s)
-                all_docs = memory.db.get_all_docs()
-                for doc_id, doc in all_docs.items():
-                    # Apply area filter if specified
-                    if area_filter and doc.metadata.get("area", "") != area_filter:
-                        continue
-                    memories.append(doc)
+                if area_filter:
+                    memories = await memory.search_by_metadata({"area": area_filter})
+                else:
+                    memories = list(memory.db.get_all_docs().values())
 
                 # sort by timestamp
                 def get_sort_key(m):
@@ -1,4 +1,5 @@
 from python.helpers.api import ApiHandler, Request, Response
+from python.helpers import push
 
 
 class Pause(ApiHandler):
@@ -11,6 +12,7 @@ class Pause(ApiHandler):
             context = self.use_context(ctxid)
 
             context.paused = paused
+            push.notify()
 
             return {
                 "message": "Agent paused." if paused else "Agent unpaused.",
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+
+from python.helpers.api import ApiHandler, Request, Response
+from python.helpers import push
+from python.helpers.localization import Localization
+from python.helpers.dotenv import get_dotenv_value
+from python.api.poll import get_state, get_contexts_and_tasks
+from agent import AgentContext
+
+# wait this long after a change so bursts of updates go out as one event
+COALESCE_DELAY = 0.05
+# recheck state even without a change signal (scheduler tasks, renames...)
+IDLE_INTERVAL = 1.0
+# comment line keeping idle connections alive and detecting closed ones
+HEARTBEAT_INTERVAL = 15.0
+
+# context fields changing with every log update, the list is not resent for them
+VOLATILE_CONTEXT_FIELDS = ("log_version", "log_length")
+
+# context list shared by all streams, rebuilt once per change
+_contexts_lock = threading.Lock()
+_contexts: tuple[int, float, list[dict], list[dict], list] | None = None
+
+
+class PollStream(ApiHandler):
+    """Server-sent events version of /poll.
+
+    Each connection keeps its own log and notification cursors and receives
+    an event shaped like the /poll response whenever the state changes, with
+    contexts and tasks included only when they changed. Events are produced
+    one at a time as the client consumes them, a slow client gets fewer,
+    larger events instead of a growing queue.
+    """
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET"]
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        ctxid = request.args.get("context", "")
+        log_guid = request.args.get("log_guid", "")
+        log_from = request.args.get("log_from", 0, type=int)
+        notifications_guid = request.args.get("notifications_guid", "")
+        notifications_from = request.args.get("notifications_from", 0, type=int)
+
+        timezone = request.args.get("timezone", get_dotenv_value("DEFAULT_USER_TIMEZONE", "UTC"))
+        Localization.get().set_timezone(timezone)
+
+        return Response(
+            _stream(ctxid, log_guid, log_from, notifications_guid, notifications_from),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+def _stream(ctxid: str, log_guid: str, log_from: int, notifications_guid: str, notifications_from: int):
+    version = -1
+    sent_contexts = None
+    sent_state = None
+    last_write = time.monotonic()
+
+    while True:
+        changed = push.wait(version, IDLE_INTERVAL)
+        if changed != version and version != -1:
+            time.sleep(COALESCE_DELAY)
+        version = push.get_version()
+
+        context = AgentContext.get(ctxid) if ctxid else None
+        if context and context.log.guid != log_guid:
+            # chat was reset or switched, send the whole log again
+            log_guid, log_from = context.log.guid, 0
+        notification_manager = AgentContext.get_notification_manager()
+        if notification_manager.guid != notifications_guid:
+            notifications_guid, notifications_from = notification_manager.guid, 0
+
+        event = {
+            "deselect_chat": bool(ctxid and not context),
+            "context": context.id if context else "",
+            **get_state(context, log_from, notifications_from),
+        }
+        state = {k: v for k, v in event.items() if k not in ("logs", "notifications")}
+        contexts, tasks, contexts_key = _get_contexts(version)
+
+        if (
+            event["logs"]
+            or event["notifications"]
+            or state != sent_state
+            or contexts_key != sent_contexts
+        ):
+            if contexts_key != sent_contexts:
+                event["contexts"], event["tasks"] = contexts, tasks
+                sent_contexts = contexts_key
+            sent_state = state
+            log_from = event["log_version"]
+            notifications_from = event["notifications_version"]
+            last_write = time.monotonic()
+            yield f"data: {json.dumps(event)}\n\n"
+        elif time.monotonic() - last_write > HEARTBEAT_INTERVAL:
+            last_write = time.monotonic()
+            yield ": ping\n\n"
+
+        if event["deselect_chat"]:
+            return
+
+
+def _get_contexts(version: int) -> tuple[list[dict], list[dict], list]:
+    """Contexts, tasks and their comparison key without the volatile log counters."""
+    global _contexts
+    with _contexts_lock:
+        now = time.monotonic()
+        if not _contexts or _contexts[0] != version or now - _contexts[1] >= IDLE_INTERVAL:
+            contexts, tasks = get_contexts_and_tasks()
+            key = [
+                [_stable(ctx) for ctx in contexts],
+                [_stable(task) for task in tasks],
+            ]
+            _contexts = (version, now, contexts, tasks, key)
+        return _contexts[2], _contexts[3], _contexts[4]
+
+
+def _stable(ctx: dict) -> dict:
+    return {k: v for k, v in ctx.items() if k not in VOLATILE_CONTEXT_FIELDS}
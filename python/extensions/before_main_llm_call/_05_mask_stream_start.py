@@ -0,0 +1,14 @@
+from python.helpers.extension import Extension
+from python.helpers.secrets import get_secrets_manager
+
+
+class MaskStreamStart(Extension):
+
+    async def execute(self, loop_data=None, **kwargs):
+        if not loop_data:
+            return
+
+        # new streaming filters for the reasoning and response of this call
+        secrets_mgr = get_secrets_manager(self.agent.context)
+        loop_data.params_temporary["_reason_stream_filter"] = secrets_mgr.create_streaming_filter()
+        loop_data.params_temporary["_resp_stream_filter"] = secrets_mgr.create_streaming_filter()
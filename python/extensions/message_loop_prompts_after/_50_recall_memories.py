@@ -22,7 +22,7 @@ class RecallMemories(Extension):
 
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
 
-        set = settings.get_settings()
+        set = settings.get_snapshot()
 
         # turned off in settings?
         if not set["memory_recall_enabled"]:
@@ -57,7 +57,7 @@ class RecallMemories(Extension):
             del extras["solutions"]
 
 
-        set = settings.get_settings()
+        set = settings.get_snapshot()
         # try:
 
         # get system message and chat history for util llm
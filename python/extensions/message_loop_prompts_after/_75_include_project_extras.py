@@ -16,7 +16,7 @@ class IncludeProjectExtras(Extension):
 
         # load file structure if enabled
         if project["file_structure"]["enabled"]:
-            file_structure = projects.get_file_structure(project_name)
+            file_structure = projects.get_file_structure(project_name, project)
             gitignore = cleanup_gitignore(project["file_structure"]["gitignore"])
 
             # read prompt
@@ -9,6 +9,8 @@ from python.extensions.before_main_llm_call._10_log_for_stream import build_head
 
 class LogFromStream(Extension):
 
+    reuse_instance = True
+
     async def execute(self, loop_data: LoopData = LoopData(), text: str = "", **kwargs):
 
         # thought length indicator
@@ -26,4 +28,6 @@ class LogFromStream(Extension):
 
         # update log message
         log_item = loop_data.params_temporary["log_item_generating"]
-        log_item.update(heading=heading, reasoning=text)
+        # the response stream replaces kvps and keeps the reasoning from here
+        loop_data.params_temporary["log_reasoning"] = text
+        log_item.update_throttled(heading=heading, reasoning=text)
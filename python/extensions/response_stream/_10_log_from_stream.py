@@ -10,6 +10,8 @@ from python.extensions.before_main_llm_call._10_log_for_stream import build_head
 
 class LogFromStream(Extension):
 
+    reuse_instance = True
+
     async def execute(
         self,
         loop_data: LoopData = LoopData(),
@@ -41,11 +43,11 @@ class LogFromStream(Extension):
         # update log message
         log_item = loop_data.params_temporary["log_item_generating"]
 
-        # keep reasoning from previous logs in kvps
+        # keep reasoning streamed before the response in kvps
         kvps = {}
-        if log_item.kvps is not None and "reasoning" in log_item.kvps:
-            kvps["reasoning"] = log_item.kvps["reasoning"]
+        if "log_reasoning" in loop_data.params_temporary:
+            kvps["reasoning"] = loop_data.params_temporary["log_reasoning"]
         kvps.update(parsed)
 
-        # update the log item
-        log_item.update(heading=heading, content=text, kvps=kvps)
\ No newline at end of file
+        # update the log item, throttled as this runs for every chunk
+        log_item.update_throttled(heading=heading, content=text, kvps=kvps)
\ No newline at end of file
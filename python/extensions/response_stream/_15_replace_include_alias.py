@@ -4,6 +4,8 @@ from python.helpers.strings import replace_file_includes
 
 
 class ReplaceIncludeAlias(Extension):
+    reuse_instance = True
+
     async def execute(
         self,
         loop_data=None,
@@ -8,6 +8,8 @@ from python.helpers import log
 
 class LiveResponse(Extension):
 
+    reuse_instance = True
+
     async def execute(
         self,
         loop_data: LoopData = LoopData(),
@@ -36,6 +38,6 @@ class LiveResponse(Extension):
 
             # update log message
             log_item = loop_data.params_temporary["log_item_response"]
-            log_item.update(content=parsed["tool_args"]["text"])
+            log_item.update_throttled(content=parsed["tool_args"]["text"])
         except Exception as e:
             pass
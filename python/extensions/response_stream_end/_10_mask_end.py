@@ -1,28 +1,25 @@
 from python.helpers.extension import Extension
-from python.helpers.secrets import SecretsManager
 
 
 class MaskResponseStreamEnd(Extension):
-    async def execute(self, **kwargs):
-        # Get agent and finalize the streaming filter
-        agent = kwargs.get("agent")
-        if not agent:
+    async def execute(self, loop_data=None, **kwargs):
+        if not loop_data:
             return
 
         try:
             # Finalize the response stream filter if it exists
             filter_key = "_resp_stream_filter"
-            filter_instance = agent.get_data(filter_key)
+            filter_instance = loop_data.params_temporary.pop(filter_key, None)
             if filter_instance:
                 tail = filter_instance.finalize()
 
-                # Print any remaining masked content
                 if tail:
+                    # Print any remaining masked content
                     from python.helpers.print_style import PrintStyle
                     PrintStyle().stream(tail)
 
-                # Clean up the filter
-                agent.set_data(filter_key, None)
+                    # the log and the response parser have only seen the text before the held tail
+                    await self.agent.handle_response_stream(filter_instance.masked_text)
         except Exception as e:
             # If masking fails, proceed without masking
             pass
@@ -1,9 +1,20 @@
-from typing import Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
 from python.helpers.extension import Extension
-from python.helpers.mcp_handler import MCPConfig
+from python.helpers.mcp_handler import MCPConfig, get_tools_version
 from agent import Agent, LoopData
-from python.helpers.settings import get_settings
-from python.helpers import projects
+from python.helpers.settings import get_snapshot, get_settings_version
+from python.helpers import files, projects
+
+# built sections by key: [version, prompt file stamps, text, last file check], see get_cached_section
+_sections: OrderedDict[tuple, list] = OrderedDict()
+# prompt file edits show up within this many seconds
+FILES_CHECK_INTERVAL = 1.0
+# least recently used sections are dropped over this count
+MAX_SECTIONS = 256
+_sections_lock = threading.Lock()
 
 
 class SystemPrompt(Extension):
@@ -31,28 +42,64 @@ class SystemPrompt(Extension):
             system_prompt.append(project_prompt)
 
 
+def get_cached_section(key: tuple, version: Any, build: Callable[[], str]) -> str:
+    """Section text reused while its version and the prompt files it was read from are unchanged."""
+    with _sections_lock:
+        entry = _sections.get(key)
+        if entry:
+            _sections.move_to_end(key)
+    if entry and entry[0] == version:
+        now = time.monotonic()
+        if now - entry[3] < FILES_CHECK_INTERVAL:
+            return entry[2]
+        if files.stamps_current(entry[1]):
+            entry[3] = now
+            return entry[2]
+    with files.track_prompt_files() as stamps:
+        text = build()
+    with _sections_lock:
+        _sections[key] = [version, stamps, text, time.monotonic()]
+        _sections.move_to_end(key)
+        while len(_sections) > MAX_SECTIONS:
+            _sections.popitem(last=False)
+    return text
+
+
 def get_main_prompt(agent: Agent):
-    return agent.read_prompt("agent.system.main.md")
+    return get_cached_section(
+        ("main", agent.config.profile),
+        None,
+        lambda: agent.read_prompt("agent.system.main.md"),
+    )
 
 
 def get_tools_prompt(agent: Agent):
-    prompt = agent.read_prompt("agent.system.tools.md")
-    if agent.config.chat_model.vision:
-        prompt += "\n\n" + agent.read_prompt("agent.system.tools_vision.md")
-    return prompt
+    def build():
+        prompt = agent.read_prompt("agent.system.tools.md")
+        if agent.config.chat_model.vision:
+            prompt += "\n\n" + agent.read_prompt("agent.system.tools_vision.md")
+        return prompt
+
+    return get_cached_section(
+        ("tools", agent.config.profile, agent.config.chat_model.vision), None, build
+    )
 
 
 def get_mcp_tools_prompt(agent: Agent):
-    mcp_config = MCPConfig.get_instance()
-    if mcp_config.servers:
-        pre_progress = agent.context.log.progress
-        agent.context.log.set_progress(
-            "Collecting MCP tools"
-        )  # MCP might be initializing, better inform via progress bar
-        tools = MCPConfig.get_instance().get_tools_prompt()
-        agent.context.log.set_progress(pre_progress)  # return original progress
-        return tools
-    return ""
+    def build():
+        mcp_config = MCPConfig.get_instance()
+        if mcp_config.servers:
+            pre_progress = agent.context.log.progress
+            agent.context.log.set_progress(
+                "Collecting MCP tools"
+            )  # MCP might be initializing, better inform via progress bar
+            tools = MCPConfig.get_instance().get_tools_prompt()
+            agent.context.log.set_progress(pre_progress)  # return original progress
+            return tools
+        return ""
+
+    # read before building, a change during the build rebuilds next time
+    return get_cached_section(("mcp",), get_tools_version(), build)
 
 
 def get_secrets_prompt(agent: Agent):
@@ -61,22 +108,38 @@ def get_secrets_prompt(agent: Agent):
         from python.helpers.secrets import get_secrets_manager
 
         secrets_manager = get_secrets_manager(agent.context)
-        secrets = secrets_manager.get_secrets_for_prompt()
-        vars = get_settings()["variables"]
-        return agent.read_prompt("agent.system.secrets.md", secrets=secrets, vars=vars)
+
+        def build():
+            secrets = secrets_manager.get_secrets_for_prompt()
+            vars = get_snapshot()["variables"]
+            return agent.read_prompt("agent.system.secrets.md", secrets=secrets, vars=vars)
+
+        return get_cached_section(
+            ("secrets", agent.config.profile, secrets_manager.get_files()),
+            (secrets_manager.get_files_stamp(), get_settings_version()),
+            build,
+        )
     except Exception as e:
         # If secrets module is not available or has issues, return empty string
         return ""
 
 
 def get_project_prompt(agent: Agent):
-    result = agent.read_prompt("agent.system.projects.main.md")
     project_name = agent.context.get_data(projects.CONTEXT_DATA_KEY_PROJECT)
-    if project_name:
-        project_vars = projects.build_system_prompt_vars(project_name)
-        result += "\n\n" + agent.read_prompt(
-            "agent.system.projects.active.md", **project_vars
-        )
-    else:
-        result += "\n\n" + agent.read_prompt("agent.system.projects.inactive.md")
-    return result
+
+    def build():
+        result = agent.read_prompt("agent.system.projects.main.md")
+        if project_name:
+            project_vars = projects.build_system_prompt_vars(project_name)
+            result += "\n\n" + agent.read_prompt(
+                "agent.system.projects.active.md", **project_vars
+            )
+        else:
+            result += "\n\n" + agent.read_prompt("agent.system.projects.inactive.md")
+        return result
+
+    return get_cached_section(
+        ("project", agent.config.profile, project_name),
+        projects.get_system_prompt_vars_stamp(project_name) if project_name else None,
+        build,
+    )
@@ -1,6 +1,7 @@
 import asyncio
 from dataclasses import dataclass
 import threading
+import time
 from concurrent.futures import Future
 from typing import Any, Callable, Optional, Coroutine, TypeVar, Awaitable
 
@@ -13,6 +14,12 @@ class EventLoopThread:
     def __init__(self, thread_name: str = "Background") -> None:
         """Initialize the event loop thread."""
         self.thread_name = thread_name
+        if not hasattr(self, "active_tasks"):
+            # load metrics, updated from the loop thread
+            self.active_tasks = 0
+            self.tasks_started = 0
+            self._lag = 0.0
+            self._probe: float | None = None
         self._start()
 
     def __new__(cls, thread_name: str = "Background"):
@@ -49,6 +56,79 @@ class EventLoopThread:
             raise RuntimeError("Event loop is not initialized")
         return asyncio.run_coroutine_threadsafe(coro, self.loop)
 
+    def lag(self) -> float:
+        """Seconds the loop needed to pick up the last probe callback, each call schedules a new one."""
+        now = time.monotonic()
+        if self._probe is None and self.loop:
+            self._probe = now
+            self.loop.call_soon_threadsafe(self._probe_done)
+        pending = now - self._probe if self._probe is not None else 0.0
+        return max(self._lag, pending)
+
+    def _probe_done(self):
+        if self._probe is not None:
+            self._lag = time.monotonic() - self._probe
+        self._probe = None
+
+    def metrics(self) -> dict:
+        return {
+            "name": self.thread_name,
+            "active_tasks": self.active_tasks,
+            "tasks_started": self.tasks_started,
+            "lag": self.lag(),
+        }
+
+
+class EventLoopPool:
+    """Fixed number of named event loop threads shared by keyed work.
+
+    Each key (a context ID) is placed on the least loaded loop on first use and
+    stays there, as objects created by its tasks are bound to that loop.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = max(1, size)
+        self._placement: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def thread_names(self) -> list[str]:
+        return [f"{self.name}-{i}" for i in range(self.size)]
+
+    def place(self, key: str) -> str:
+        """Thread name of the loop running tasks of the key."""
+        with self._lock:
+            if key not in self._placement:
+                keys = {name: 0 for name in self.thread_names()}
+                for name in self._placement.values():
+                    keys[name] += 1
+
+                def load(name: str):
+                    thread = EventLoopThread._instances.get(name)
+                    return (thread.active_tasks if thread else 0, keys[name])
+
+                self._placement[key] = min(keys, key=load)
+            return self._placement[key]
+
+    def release(self, key: str):
+        with self._lock:
+            self._placement.pop(key, None)
+
+    def metrics(self) -> list[dict]:
+        with self._lock:
+            placed = list(self._placement.values())
+        result = []
+        for name in self.thread_names():
+            thread = EventLoopThread._instances.get(name)
+            metrics = (
+                thread.metrics()
+                if thread
+                else {"name": name, "active_tasks": 0, "tasks_started": 0, "lag": 0.0}
+            )
+            metrics["keys"] = placed.count(name)
+            result.append(metrics)
+        return result
+
 
 @dataclass
 class ChildTask:
@@ -81,7 +161,13 @@ class DeferredTask:
         self._future = self.event_loop_thread.run_coroutine(self._run())
 
     async def _run(self):
-        return await self.func(*self.args, **self.kwargs)
+        thread = self.event_loop_thread
+        thread.active_tasks += 1
+        thread.tasks_started += 1
+        try:
+            return await self.func(*self.args, **self.kwargs)
+        finally:
+            thread.active_tasks -= 1
 
     def is_ready(self) -> bool:
         return self._future.done() if self._future else False
@@ -1,4 +1,5 @@
 import json
+import re
 
 def try_parse(json_string: str):
     try:
@@ -25,6 +26,7 @@ class DirtyJson:
         self.current_char = None
         self.result = None
         self.stack = []
+        self._stream: DirtyJsonStream | None = None
 
     @staticmethod
     def parse_string(json_string):
@@ -52,10 +54,10 @@ class DirtyJson:
         return self.result
 
     def feed(self, chunk):
-        self.json_string += chunk
-        if not self.current_char and self.json_string:
-            self.current_char = self.json_string[0]
-        self._parse()
+        if self._stream is None:
+            self._stream = DirtyJsonStream()
+        self.result = self._stream.feed(chunk)
+        self.json_string = self._stream.buffer
         return self.result
 
     def _advance(self, count=1):
@@ -333,3 +335,363 @@ class DirtyJson:
         chars = ["{", "[", '"']
         indices = [input_str.find(char) for char in chars if input_str.find(char) != -1]
         return min(indices) if indices else 0
+
+
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_STRING_STOPS = {q: re.compile(r"[\\" + q + "]") for q in ['"', "'", "`"]}
+_LITERALS = (("true", True), ("false", False), ("null", None), ("undefined", None))
+_MISSING = object()
+
+
+class _Frame:
+    __slots__ = ("container", "state", "key")
+
+    def __init__(self, container, state):
+        self.container = container
+        self.state = state
+        self.key = None
+
+
+class DirtyJsonStream:
+    """Resumable variant of DirtyJson for streamed text.
+
+    Follows the same lenient grammar, but keeps its position and open containers
+    between feeds so only new text is processed. Partial strings and containers
+    are visible in result while the text is still incomplete. Numbers, literals,
+    unquoted values and keys cut off at the end are shown as DirtyJson parses
+    them and replaced when more text arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.result = None
+        self.done = False
+        self.started = False
+        self.stack: list[_Frame] = []
+        self.token: dict | None = None  # string being parsed
+        # (container, key, previous value) of a key shown before it is complete
+        self.pending_key: tuple | None = None
+
+    def feed(self, chunk: str):
+        self.buffer += chunk
+        if not self.done:
+            self._drop_pending_key()
+            self._process()
+        return self.result
+
+    def update(self, text: str):
+        """Parse the full text so far, only new text is processed if it extends the previous one."""
+        if not text.startswith(self.buffer):
+            self.__init__()
+        return self.feed(text[len(self.buffer) :])
+
+    def _process(self):
+        while not self.done:
+            if self.token is not None:
+                if not self._continue_string():
+                    return
+            elif not self.started:
+                indices = [
+                    i for i in (self.buffer.find(c, self.pos) for c in "{[\"") if i != -1
+                ]
+                if not indices:
+                    self.pos = len(self.buffer)
+                    return
+                self.pos = min(indices)
+                self.started = True
+            elif not self.stack:
+                if not self._start_value():
+                    return
+            else:
+                frame = self.stack[-1]
+                step = (
+                    self._object_step
+                    if isinstance(frame.container, dict)
+                    else self._array_step
+                )
+                if not step(frame):
+                    return
+
+    def _set_value(self, value):
+        if not self.stack:
+            self.result = value
+            return
+        frame = self.stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container[-1] = value
+
+    def _pending_value(self) -> bool:
+        # the value at the end may still grow, show it as DirtyJson parses it so far
+        parser = DirtyJson()
+        parser.json_string = self.buffer[self.pos :]
+        parser.current_char = parser.json_string[0]
+        try:
+            value = parser._parse_value()
+        except ValueError:
+            value = None  # not a number yet, like "-" or "1e"
+        self._set_value(value)
+        return False
+
+    def _pending_key(self, frame: _Frame, key: str) -> bool:
+        # the key at the end may still grow, show it with no value like DirtyJson
+        self.pending_key = (frame.container, key, frame.container.get(key, _MISSING))
+        frame.container[key] = None
+        return False
+
+    def _drop_pending_key(self):
+        if self.pending_key is None:
+            return
+        container, key, previous = self.pending_key
+        self.pending_key = None
+        if previous is _MISSING:
+            container.pop(key, None)
+        else:
+            container[key] = previous
+
+    def _value_done(self):
+        if self.stack:
+            self.stack[-1].state = "after"
+        else:
+            self.done = True
+
+    def _skip_whitespace(self) -> bool:
+        buf = self.buffer
+        while self.pos < len(buf):
+            char = buf[self.pos]
+            if char.isspace():
+                self.pos += 1
+            elif char == "/":
+                if self.pos + 1 >= len(buf):
+                    return False
+                if buf[self.pos + 1] == "/":
+                    end = buf.find("\n", self.pos)
+                    if end == -1:
+                        return False
+                    self.pos = end + 1
+                elif buf[self.pos + 1] == "*":
+                    end = buf.find("*/", self.pos + 2)
+                    if end == -1:
+                        return False
+                    self.pos = end + 2
+                else:
+                    return True
+            else:
+                return True
+        return False
+
+    def _object_step(self, frame: _Frame) -> bool:
+        if not self._skip_whitespace():
+            return False
+        buf, char = self.buffer, self.buffer[self.pos]
+        if frame.state == "key":
+            if char == "}":
+                if self.pos + 1 >= len(buf):
+                    return False
+                self.pos += 2 if buf[self.pos + 1] == "}" else 1
+                self.stack.pop()
+                self._value_done()
+            elif char in "\"'":
+                self.token = {"quote": char, "multiline": False, "key": True, "text": ""}
+                self.pos += 1
+            else:
+                end = self.pos
+                while end < len(buf) and not buf[end].isspace() and buf[end] not in ":,}]":
+                    end += 1
+                if end >= len(buf):
+                    return self._pending_key(frame, buf[self.pos :])
+                self._set_key(frame, buf[self.pos : end])
+                self.pos = end
+        elif frame.state == "colon":
+            if char == ":":
+                self.pos += 1
+            frame.state = "value"
+        elif frame.state == "value":
+            return self._start_value()
+        else:  # after value
+            if char == ",":
+                self.pos += 1
+            frame.state = "key"
+        return True
+
+    def _array_step(self, frame: _Frame) -> bool:
+        if not self._skip_whitespace():
+            return False
+        char = self.buffer[self.pos]
+        if frame.state == "value":
+            if char == "]":
+                self.pos += 1
+                self.stack.pop()
+                self._value_done()
+                return True
+            frame.container.append(None)
+            frame.state = "item"
+        if frame.state == "item":
+            return self._start_value()
+        if frame.state == "comma":
+            # trailing comma ends the array
+            if char == "]":
+                self.pos += 1
+                self.stack.pop()
+                self._value_done()
+            else:
+                frame.state = "value"
+            return True
+        # after value
+        if char == ",":
+            self.pos += 1
+            frame.state = "comma"
+        elif char == "]":
+            frame.state = "value"
+        else:
+            self.stack.pop()
+            self._value_done()
+        return True
+
+    def _set_key(self, frame: _Frame, key: str):
+        frame.key = key
+        frame.container[key] = None
+        frame.state = "colon"
+
+    def _start_value(self) -> bool:
+        if not self._skip_whitespace():
+            return False
+        buf, pos = self.buffer, self.pos
+        char = buf[pos]
+        if char == "{":
+            if pos + 1 >= len(buf):
+                return self._pending_value()
+            self.pos += 2 if buf[pos + 1] == "{" else 1
+            value = {}
+            self._set_value(value)
+            self.stack.append(_Frame(value, "key"))
+        elif char == "[":
+            self.pos += 1
+            value = []
+            self._set_value(value)
+            self.stack.append(_Frame(value, "value"))
+        elif char in "\"'`":
+            if pos + 2 >= len(buf):
+                return self._pending_value()
+            multiline = buf[pos + 1 : pos + 3] == char * 2
+            self.pos += 3 if multiline else 1
+            self.token = {"quote": char, "multiline": multiline, "key": False, "text": ""}
+            self._set_value("")
+        elif char.isdigit() or char in "-+":
+            end = pos
+            while end < len(buf) and (buf[end].isdigit() or buf[end] in "-+.eE"):
+                end += 1
+            if end >= len(buf):
+                return self._pending_value()
+            number = buf[pos:end]
+            try:
+                value = int(number)
+            except ValueError:
+                try:
+                    value = float(number)
+                except ValueError:
+                    value = number
+            self.pos = end
+            self._set_value(value)
+            self._value_done()
+        else:
+            for text, value in _LITERALS:
+                if char.lower() != text[0]:
+                    continue
+                available = buf[pos : pos + len(text)].lower()
+                if available == text:
+                    self.pos += len(text)
+                    self._set_value(value)
+                    self._value_done()
+                    return True
+                if len(available) < len(text) and text.startswith(available):
+                    return self._pending_value()  # may still become the literal
+            # unquoted string, the terminator is consumed like in DirtyJson
+            end = pos
+            while end < len(buf) and buf[end] not in ":,}]":
+                end += 1
+            if end >= len(buf):
+                return self._pending_value()
+            self.pos = end + 1
+            self._set_value(buf[pos:end].strip())
+            self._value_done()
+        return True
+
+    def _continue_string(self) -> bool:
+        token, buf = self.token, self.buffer
+        assert token is not None
+        quote = token["quote"]
+        parts = [token["text"]]
+        finished = False
+
+        if token["multiline"]:
+            end = buf.find(quote * 3, self.pos)
+            if end != -1:
+                parts.append(buf[self.pos : end])
+                self.pos = end + 3
+                finished = True
+            else:
+                # the last chars may be the start of the closing quotes
+                safe = max(self.pos, len(buf) - 2)
+                parts.append(buf[self.pos : safe])
+                self.pos = safe
+        else:
+            stops = _STRING_STOPS[quote]
+            while True:
+                match = stops.search(buf, self.pos)
+                if not match:
+                    parts.append(buf[self.pos :])
+                    self.pos = len(buf)
+                    break
+                i = match.start()
+                parts.append(buf[self.pos : i])
+                if buf[i] == quote:
+                    self.pos = i + 1
+                    finished = True
+                    break
+                # escape sequence
+                if i + 1 >= len(buf):
+                    self.pos = i
+                    break
+                esc = buf[i + 1]
+                if esc in "\"'\\/bfnrt":
+                    parts.append(_ESCAPES.get(esc, esc))
+                    self.pos = i + 2
+                elif esc == "u":
+                    digits = buf[i + 2 : i + 6]
+                    invalid = next((k for k, c in enumerate(digits) if not c.isalnum()), -1)
+                    if invalid != -1:
+                        # not a unicode escape, ends the string like in DirtyJson
+                        parts.append("\\u" + digits[:invalid])
+                        self.pos = i + 2 + invalid
+                        finished = True
+                        break
+                    if len(digits) < 4:
+                        self.pos = i
+                        break
+                    try:
+                        parts.append(chr(int(digits, 16)))
+                    except ValueError:
+                        parts.append("\\u" + digits)
+                    self.pos = i + 6
+                else:
+                    # unknown escapes are dropped
+                    self.pos = i + 2
+
+        text = "".join(parts)
+        token["text"] = text
+        if token["key"]:
+            if finished:
+                self.token = None
+                self._set_key(self.stack[-1], text)
+            else:
+                self._pending_key(self.stack[-1], text)
+            return finished
+
+        self._set_value(text.strip() if token["multiline"] else text)
+        if finished:
+            self.token = None
+            self._value_done()
+        return finished
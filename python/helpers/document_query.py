@@ -2,15 +2,20 @@ import mimetypes
 import os
 import asyncio
 import aiohttp
+import hashlib
 import json
+import threading
+import time
+from collections import OrderedDict
 
 from python.helpers.vector_db import VectorDB
+from python.helpers.metadata_index import MetadataFilter
 
 os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"  # noqa E402
 from langchain_unstructured import UnstructuredLoader  # noqa E402
 
 from urllib.parse import urlparse
-from typing import Callable, Sequence, List, Optional, Tuple
+from typing import Callable, Mapping, Sequence, List, Optional, Tuple
 from datetime import datetime
 
 from langchain_community.document_loaders import AsyncHtmlLoader
@@ -24,6 +29,7 @@ from langchain.schema import SystemMessage, HumanMessage
 
 from python.helpers.print_style import PrintStyle
 from python.helpers import files, errors
+from python.helpers.defer import DeferredTask
 from agent import Agent
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -42,26 +48,131 @@ class DocumentQueryStore:
     DEFAULT_CHUNK_SIZE = 1000
     DEFAULT_CHUNK_OVERLAP = 100
 
-    # Cache for initialized stores
+    # Max. total size of stored chunk text, least recently used documents are evicted
+    MAX_TOTAL_BYTES = 64 * 1024 * 1024
+    # Documents without a fingerprint (no ETag etc.) are reused for this long
+    UNVALIDATED_TTL = 3600
+    # Stores are persisted here, one folder per embedding model, empty = memory only
+    PERSIST_FOLDER = "tmp/document_query"
+    # Changes are persisted in the background, at most once per this many seconds
+    SAVE_DELAY = 5.0
+
+    # Cache for initialized stores, one per embedding model
     _stores: dict[str, "DocumentQueryStore"] = {}
+    _stores_lock = threading.Lock()
 
     @staticmethod
     def get(agent: Agent):
-        """Create a DocumentQueryStore instance for the specified agent."""
+        """Get the process-wide DocumentQueryStore for the agent's embedding model."""
         if not agent or not agent.config:
             raise ValueError("Agent and agent config must be provided")
 
-        # Initialize store
-        store = DocumentQueryStore(agent)
-        return store
+        model = agent.config.embeddings_model
+        key = files.safe_file_name(f"{model.provider}_{model.name}")
+        with DocumentQueryStore._stores_lock:
+            if key not in DocumentQueryStore._stores:
+                persist_dir = (
+                    files.get_abs_path(DocumentQueryStore.PERSIST_FOLDER, key)
+                    if DocumentQueryStore.PERSIST_FOLDER
+                    else ""
+                )
+                DocumentQueryStore._stores[key] = DocumentQueryStore(agent, persist_dir)
+            return DocumentQueryStore._stores[key]
 
     def __init__(
         self,
         agent: Agent,
+        persist_dir: str = "",
     ):
-        """Initialize a DocumentQueryStore instance."""
-        self.agent = agent
+        """Initialize a DocumentQueryStore instance, the agent is only used to load it."""
         self.vector_db: VectorDB | None = None
+        self.persist_dir = persist_dir
+        # document_uri -> {fingerprint, content_hash, bytes, indexed_at}, in LRU order
+        self.documents: OrderedDict[str, dict] = OrderedDict()
+        self.total_bytes = 0
+        # guards documents and vector_db, the FAISS store has its own lock
+        self._lock = threading.RLock()
+        self._save_scheduled = False
+        self._load(agent)
+
+    def _load(self, agent: Agent):
+        """Load a persisted store from disk, if any."""
+        if not self.persist_dir:
+            return
+        meta_file = os.path.join(self.persist_dir, "documents.json")
+        if not os.path.exists(meta_file):
+            return
+        try:
+            vector_db = self.init_vector_db(agent)
+            if not vector_db.load(self.persist_dir):
+                return
+            with open(meta_file, "r", encoding="utf-8") as f:
+                self.documents = OrderedDict(json.load(f))
+            self.vector_db = vector_db
+            self.total_bytes = sum(d.get("bytes", 0) for d in self.documents.values())
+        except Exception as e:
+            PrintStyle.error(f"Failed to load document store: {errors.format_error(e)}")
+            self.documents = OrderedDict()
+            self.total_bytes = 0
+
+    def _save(self):
+        """Schedule persisting the store, changes within SAVE_DELAY are saved together."""
+        if not self.persist_dir or not self.vector_db:
+            return
+        with self._lock:
+            if self._save_scheduled:
+                return
+            self._save_scheduled = True
+        DeferredTask(thread_name="DocumentQueryStore").start_task(self._save_later)
+
+    async def _save_later(self):
+        # runs in a background thread, off the chat event loops
+        await asyncio.sleep(self.SAVE_DELAY)
+        try:
+            with self._lock:
+                self._save_scheduled = False
+                if not self.vector_db:
+                    return
+                write = self.vector_db.snapshot_writer()
+                documents = json.dumps(self.documents)
+            write(self.persist_dir)
+            meta_file = os.path.join(self.persist_dir, "documents.json")
+            files.write_file(meta_file, documents)
+        except Exception as e:
+            PrintStyle.error(f"Failed to save document store: {errors.format_error(e)}")
+
+    def is_current(self, document_uri: str, fingerprint: str | None) -> bool:
+        """Check if the stored version of a document matches the fingerprint."""
+        with self._lock:
+            info = self.documents.get(self.normalize_uri(document_uri))
+        if not info:
+            return False
+        if fingerprint:
+            return info.get("fingerprint") == fingerprint
+        # nothing to validate against, trust recent documents only
+        return time.time() - info.get("indexed_at", 0) < self.UNVALIDATED_TTL
+
+    def find_by_content_hash(self, content_hash: str) -> str | None:
+        """Find an already indexed document with the same content."""
+        with self._lock:
+            for uri, info in self.documents.items():
+                if info.get("content_hash") == content_hash:
+                    return uri
+        return None
+
+    def _touch(self, document_uri: str):
+        with self._lock:
+            if document_uri in self.documents:
+                self.documents.move_to_end(document_uri)
+
+    async def _evict(self):
+        # drop least recently used documents over the size limit, keep the newest one
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.MAX_TOTAL_BYTES or len(self.documents) <= 1:
+                    return
+                uri = next(iter(self.documents))
+            await self.delete_document(uri, save=False)
 
     @staticmethod
     def normalize_uri(uri: str) -> str:
@@ -94,19 +205,28 @@ class DocumentQueryStore:
 
         return normalized
 
-    def init_vector_db(self):
-        return VectorDB(self.agent, cache=True)
+    def init_vector_db(self, agent: Agent):
+        return VectorDB(agent, cache=True)
 
     async def add_document(
-        self, text: str, document_uri: str, metadata: dict | None = None
+        self,
+        agent: Agent,
+        text: str,
+        document_uri: str,
+        metadata: dict | None = None,
+        fingerprint: str | None = None,
+        content_hash: str | None = None,
     ) -> tuple[bool, list[str]]:
         """
         Add a document to the store with the given URI.
 
         Args:
+            agent: Agent providing the embedding model
             text: The document text content
             document_uri: The URI that uniquely identifies this document
             metadata: Optional metadata for the document
+            fingerprint: Optional version of the source (mtime/size, ETag)
+            content_hash: Optional hash of the source content
 
         Returns:
             True if successful, False otherwise
@@ -115,7 +235,7 @@ class DocumentQueryStore:
         document_uri = self.normalize_uri(document_uri)
 
         # Delete existing document if it exists to avoid duplicates
-        await self.delete_document(document_uri)
+        await self.delete_document(document_uri, save=False)
 
         # Initialize metadata
         doc_metadata = metadata or {}
@@ -142,10 +262,13 @@ class DocumentQueryStore:
 
         try:
             # Initialize vector db if not already initialized
-            if not self.vector_db:
-                self.vector_db = self.init_vector_db()
+            with self._lock:
+                if not self.vector_db:
+                    self.vector_db = self.init_vector_db(agent)
+                vector_db = self.vector_db
 
-            ids = await self.vector_db.insert_documents(docs)
+            ids = await vector_db.insert_documents(docs)
+            await self._added(document_uri, docs, fingerprint, content_hash)
             PrintStyle.standard(
                 f"Added document '{document_uri}' with {len(docs)} chunks"
             )
@@ -155,6 +278,70 @@ class DocumentQueryStore:
             PrintStyle.error(f"Error adding document '{document_uri}': {err_text}")
             return False, []
 
+    async def copy_document(
+        self,
+        source_uri: str,
+        document_uri: str,
+        fingerprint: str | None = None,
+        content_hash: str | None = None,
+    ) -> tuple[bool, list[str]]:
+        """
+        Add a document with the same content as an indexed one, its chunks and vectors are copied.
+
+        Args:
+            source_uri: The URI of the indexed document
+            document_uri: The URI of the new document
+            fingerprint: Optional version of the source (mtime/size, ETag)
+            content_hash: Optional hash of the source content
+
+        Returns:
+            True if successful, False otherwise
+        """
+        document_uri = self.normalize_uri(document_uri)
+        await self.delete_document(document_uri, save=False)
+
+        chunks = await self._get_document_chunks(source_uri)
+        if not chunks or not self.vector_db:
+            return False, []
+
+        try:
+            metadata = {
+                "document_uri": document_uri,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            ids = await self.vector_db.copy_documents(chunks, metadata)
+            if not ids:
+                return False, []
+            await self._added(document_uri, chunks, fingerprint, content_hash)
+            PrintStyle.standard(
+                f"Copied document '{source_uri}' to '{document_uri}' with {len(ids)} chunks"
+            )
+            return True, ids
+        except Exception as e:
+            err_text = errors.format_error(e)
+            PrintStyle.error(f"Error copying document '{source_uri}': {err_text}")
+            return False, []
+
+    async def _added(
+        self,
+        document_uri: str,
+        docs: List[Document],
+        fingerprint: str | None,
+        content_hash: str | None,
+    ):
+        # record a newly stored document, then keep the store within its size
+        size = sum(len(doc.page_content.encode("utf-8")) for doc in docs)
+        with self._lock:
+            self.documents[document_uri] = {
+                "fingerprint": fingerprint,
+                "content_hash": content_hash,
+                "bytes": size,
+                "indexed_at": time.time(),
+            }
+            self.total_bytes += size
+        await self._evict()
+        self._save()
+
     async def get_document(self, document_uri: str) -> Optional[Document]:
         """
         Retrieve a document by its URI.
@@ -178,6 +365,7 @@ class DocumentQueryStore:
         if not docs:
             PrintStyle.error(f"Document not found: {document_uri}")
             return None
+        self._touch(document_uri)
 
         # Combine chunks into a single document
         chunks = sorted(docs, key=lambda x: x.metadata.get("chunk_index", 0))
@@ -211,7 +399,7 @@ class DocumentQueryStore:
         # get docs from vector db
 
         chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
+            filter={"document_uri": document_uri},
         )
 
         PrintStyle.standard(f"Found {len(chunks)} chunks for document: {document_uri}")
@@ -238,12 +426,13 @@ class DocumentQueryStore:
         chunks = await self._get_document_chunks(document_uri)
         return len(chunks) > 0
 
-    async def delete_document(self, document_uri: str) -> bool:
+    async def delete_document(self, document_uri: str, save: bool = True) -> bool:
         """
         Delete a document from the store.
 
         Args:
             document_uri: The URI of the document to delete
+            save: Persist the store after deletion
 
         Returns:
             True if deleted, False if not found
@@ -256,8 +445,13 @@ class DocumentQueryStore:
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
+        with self._lock:
+            info = self.documents.pop(document_uri, None)
+            if info:
+                self.total_bytes -= info.get("bytes", 0)
+
         chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
+            filter={"document_uri": document_uri},
         )
         if not chunks:
             return False
@@ -268,6 +462,8 @@ class DocumentQueryStore:
         # Delete from vector store
         if ids_to_delete:
             dels = await self.vector_db.delete_documents_by_ids(ids_to_delete)
+            if save:
+                self._save()
             PrintStyle.standard(
                 f"Deleted document '{document_uri}' with {len(dels)} chunks"
             )
@@ -276,7 +472,11 @@ class DocumentQueryStore:
         return False
 
     async def search_documents(
-        self, query: str, limit: int = 10, threshold: float = 0.5, filter: str = ""
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: float = 0.5,
+        filter: str | MetadataFilter = "",
     ) -> List[Document]:
         """
         Search for documents similar to the query across the entire store.
@@ -326,7 +526,7 @@ class DocumentQueryStore:
             List of matching document chunks
         """
         return await self.search_documents(
-            query, limit, threshold, f"document_uri == '{document_uri}'"
+            query, limit, threshold, {"document_uri": document_uri}
         )
 
     async def list_documents(self) -> List[str]:
@@ -340,15 +540,10 @@ class DocumentQueryStore:
         if not self.vector_db:
             return []
 
-        # Extract unique URIs
-        uris = set()
-        for doc in self.vector_db.db.get_all_docs().values():
-            if isinstance(doc.metadata, dict):
-                uri = doc.metadata.get("document_uri")
-                if uri:
-                    uris.add(uri)
-
-        return sorted(list(uris))
+        # Unique URIs straight from the metadata index
+        with self.vector_db.db.lock:
+            uris = self.vector_db.db.get_metadata_index().values("document_uri")
+        return sorted(uri for uri in uris if uri)
 
 
 class DocumentQueryHelper:
@@ -392,9 +587,7 @@ class DocumentQueryHelper:
             self.progress_callback(f"Searching documents with query: {optimized_query}")
 
             normalized_uris = [self.store.normalize_uri(uri) for uri in document_uris]
-            doc_filter = " or ".join(
-                [f"document_uri == '{uri}'" for uri in normalized_uris]
-            )
+            doc_filter = {"document_uri": normalized_uris}
 
             chunks = await self.store.search_documents(
                 query=optimized_query,
@@ -449,9 +642,9 @@ class DocumentQueryHelper:
         mimetype, encoding = mimetypes.guess_type(document_uri)
         mimetype = mimetype or "application/octet-stream"
 
+        response: aiohttp.ClientResponse | None = None
         if mimetype == "application/octet-stream":
             if url.scheme in ["http", "https"]:
-                response: aiohttp.ClientResponse | None = None
                 retries = 0
                 last_error = ""
                 while not response and retries < 3:
@@ -508,9 +701,31 @@ class DocumentQueryHelper:
         document_uri_norm = self.store.normalize_uri(document_uri)
 
         await self.agent.handle_intervention()
-        exists = await self.store.document_exists(document_uri_norm)
+        fingerprint = await self.get_fingerprint(
+            document_uri, scheme, response.headers if response else None
+        )
+        exists = self.store.is_current(
+            document_uri_norm, fingerprint
+        ) and await self.store.document_exists(document_uri_norm)
         document_content = ""
-        if not exists:
+        content_hash = None
+        if not exists and scheme == "file":
+            # same content already indexed under another name, skip parsing and embedding
+            content_hash = self.get_content_hash(document_uri)
+            duplicate = self.store.find_by_content_hash(content_hash)
+            if duplicate and duplicate != document_uri_norm:
+                if add_to_db:
+                    exists, _ = await self.store.copy_document(
+                        duplicate,
+                        document_uri_norm,
+                        fingerprint=fingerprint,
+                        content_hash=content_hash,
+                    )
+                else:
+                    doc = await self.store.get_document(duplicate)
+                    if doc:
+                        document_content = doc.page_content
+        if not exists and not document_content:
             await self.agent.handle_intervention()
             if mimetype.startswith("image/"):
                 document_content = self.handle_image_document(document_uri, scheme)
@@ -524,11 +739,16 @@ class DocumentQueryHelper:
                 document_content = self.handle_unstructured_document(
                     document_uri, scheme
                 )
+        if not exists:
             if add_to_db:
                 self.progress_callback(f"Indexing document")
                 await self.agent.handle_intervention()
                 success, ids = await self.store.add_document(
-                    document_content, document_uri_norm
+                    self.agent,
+                    document_content,
+                    document_uri_norm,
+                    fingerprint=fingerprint,
+                    content_hash=content_hash,
                 )
                 if not success:
                     self.progress_callback(f"Failed to index document")
@@ -547,6 +767,41 @@ class DocumentQueryHelper:
                 )
         return document_content
 
+    async def get_fingerprint(
+        self, document: str, scheme: str, headers: Mapping[str, str] | None = None
+    ) -> str | None:
+        """Cheap version identifier of a document: size and mtime for files,
+        ETag / Last-Modified for web documents. None if unknown.
+        Headers of a HEAD request already made for the document are used instead of a new one."""
+        try:
+            if scheme == "file":
+                stat = os.stat(files.get_abs_path(document))
+                return f"{stat.st_size}:{stat.st_mtime_ns}"
+            if scheme in ["http", "https"]:
+                if headers is None:
+                    async with aiohttp.ClientSession() as session:
+                        async with session.head(
+                            document,
+                            timeout=aiohttp.ClientTimeout(total=2.0),
+                            allow_redirects=True,
+                        ) as response:
+                            if response.status > 399:
+                                return None
+                            headers = response.headers
+                validator = headers.get("etag") or headers.get("last-modified")
+                if validator:
+                    return f"{validator}:{headers.get('content-length', '')}"
+        except Exception:
+            pass
+        return None
+
+    def get_content_hash(self, document: str) -> str:
+        hasher = hashlib.sha256()
+        with open(files.get_abs_path(document), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
     def handle_image_document(self, document: str, scheme: str) -> str:
         return self.handle_unstructured_document(document, scheme)
 
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into micro-batches.
+
+    Requests from any thread or event loop are queued, a single worker thread
+    collects them for up to `max_wait` seconds and embeds them together in
+    batches of at most `max_batch` texts, so the calling event loop is never
+    blocked by the (synchronous) embedding call.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[list[str]], list[list[float]]],
+        name: str = "embeddings",
+        max_batch: int = 64,
+        max_wait: float = 0.005,
+    ):
+        self.embed_fn = embed_fn
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: list[tuple[list[str], Future]] = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"Embeddings-{name}"
+        )
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+
+    def submit(self, texts: list[str]) -> Future:
+        future: Future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        with self._lock:
+            self._queue.append((list(texts), future))
+            if not self._scheduled:
+                self._scheduled = True
+                self._executor.submit(self._drain)
+        return future
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return self.submit(texts).result()
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            queue_depth = sum(len(texts) for texts, _ in self._queue)
+        return {
+            "name": self.name,
+            "queue_depth": queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0,
+            "max_batch_size": self.max_batch_size,
+        }
+
+    def _take_batch(self) -> list[tuple[list[str], Future]]:
+        with self._lock:
+            batch: list[tuple[list[str], Future]] = []
+            size = 0
+            # always take at least one request, even if larger than max_batch
+            while self._queue and (
+                not batch or size + len(self._queue[0][0]) <= self.max_batch
+            ):
+                request = self._queue.pop(0)
+                batch.append(request)
+                size += len(request[0])
+            if not batch:
+                self._scheduled = False
+            return batch
+
+    def _drain(self):
+        # give concurrent callers a moment to join the batch
+        if self.max_wait > 0:
+            time.sleep(self.max_wait)
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                # a single large request is still sent in max_batch slices
+                vectors = []
+                for i in range(0, len(texts), self.max_batch):
+                    part = texts[i : i + self.max_batch]
+                    vectors += self.embed_fn(part)
+                    self.batches += 1
+                    self.items += len(part)
+                    self.max_batch_size = max(self.max_batch_size, len(part))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for request_texts, future in batch:
+                end = start + len(request_texts)
+                future.set_result(vectors[start:end])
+                start = end
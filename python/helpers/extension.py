@@ -1,4 +1,7 @@
 from abc import abstractmethod
+from dataclasses import dataclass
+import threading
+import time
 from typing import Any
 from python.helpers import extract_tools, files 
 from typing import TYPE_CHECKING
@@ -7,6 +10,14 @@ if TYPE_CHECKING:
 
 class Extension:
 
+    # reuse one instance per agent instead of creating one per call, for hot
+    # points like stream chunks; such extensions keep nothing in attributes
+    # between calls, state of a call belongs in loop_data or agent data
+    reuse_instance: bool = False
+
+    # agent data key of reused instances, "_" keeps them out of saved chats
+    DATA_NAME_INSTANCES = "_extension_instances"
+
     def __init__(self, agent: "Agent|None", **kwargs):
         self.agent: "Agent" = agent # type: ignore < here we ignore the type check as there are currently no extensions without an agent
         self.kwargs = kwargs
@@ -16,15 +27,67 @@ class Extension:
         pass
 
 
+@dataclass
+class _Timing:
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+
+@dataclass
+class _Entry:
+    cls: type[Extension]
+    name: str  # extension_point/file
+    timing: _Timing
+
+    def get_instance(self, agent: "Agent|None") -> Extension:
+        if not self.cls.reuse_instance or agent is None:
+            return self.cls(agent=agent)
+        # kept on the agent, instances reference it and go away with it
+        instances = agent.data.get(Extension.DATA_NAME_INSTANCES)
+        if instances is None:
+            instances = agent.data[Extension.DATA_NAME_INSTANCES] = {}
+        instance = instances.get(self.name)
+        if not isinstance(instance, self.cls):
+            instance = instances[self.name] = self.cls(agent=agent)
+        return instance
+
+
+# resolved extension lists by (extension_point, profile)
+_pipelines: dict[tuple[str, str], list[_Entry]] = {}
+# call counters by extension_point/file
+_timings: dict[str, _Timing] = {}
+_lock = threading.Lock()
+
+
 async def call_extensions(extension_point: str, agent: "Agent|None" = None, **kwargs) -> Any:
+    profile = agent.config.profile if agent else ""
+    pipeline = _pipelines.get((extension_point, profile))
+    if pipeline is None:
+        pipeline = await _build_pipeline(extension_point, profile)
 
+    # call extensions
+    for entry in pipeline:
+        start = time.perf_counter()
+        try:
+            await entry.get_instance(agent).execute(**kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            timing = entry.timing
+            timing.calls += 1
+            timing.total += elapsed
+            if elapsed > timing.max:
+                timing.max = elapsed
+
+
+async def _build_pipeline(extension_point: str, profile: str) -> list[_Entry]:
     # get default extensions
     defaults = await _get_extensions("python/extensions/" + extension_point)
     classes = defaults
 
     # get agent extensions
-    if agent and agent.config.profile:
-        agentics = await _get_extensions("agents/" + agent.config.profile + "/extensions/" + extension_point)
+    if profile:
+        agentics = await _get_extensions("agents/" + profile + "/extensions/" + extension_point)
         if agentics:
             # merge them, agentics overwrite defaults
             unique = {}
@@ -34,9 +97,39 @@ async def call_extensions(extension_point: str, agent: "Agent|None" = None, **kw
             # sort by name
             classes = sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__))
 
-    # call extensions
-    for cls in classes:
-        await cls(agent=agent).execute(**kwargs)
+    pipeline = []
+    with _lock:
+        for cls in classes:
+            name = extension_point + "/" + _get_file_from_module(cls.__module__)
+            timing = _timings.setdefault(name, _Timing())
+            pipeline.append(_Entry(cls=cls, name=name, timing=timing))
+        _pipelines[(extension_point, profile)] = pipeline
+    return pipeline
+
+
+def get_timings() -> list[dict]:
+    """Call counts and durations (seconds) of extensions called so far, slowest in total first."""
+    with _lock:
+        items = list(_timings.items())
+    result = [
+        {
+            "extension": name,
+            "calls": timing.calls,
+            "total": timing.total,
+            "average": timing.total / timing.calls if timing.calls else 0.0,
+            "max": timing.max,
+        }
+        for name, timing in items
+        if timing.calls
+    ]
+    result.sort(key=lambda item: item["total"], reverse=True)
+    return result
+
+
+def reset_timings():
+    with _lock:
+        for timing in _timings.values():
+            timing.calls, timing.total, timing.max = 0, 0.0, 0.0
 
 
 def _get_file_from_module(module_name: str) -> str:
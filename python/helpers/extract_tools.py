@@ -101,10 +101,23 @@ def load_classes_from_folder(folder: str, name_pattern: str, base_class: Type[T]
 
     return classes
 
+# loaded classes by file, reused until the file changes
+_file_classes: dict[tuple[str, type, bool], tuple[tuple[int, int], list[type]]] = {}
+# python file names by folder, refreshed when the folder changes
+_folder_files: dict[str, tuple[int, set[str]]] = {}
+
 def load_classes_from_file(file: str, base_class: type[T], one_per_file: bool = True) -> list[type[T]]:
+    abs_path = get_abs_path(file)
+    stat = os.stat(abs_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = (abs_path, base_class, one_per_file)
+    cached = _file_classes.get(key)
+    if cached and cached[0] == version:
+        return cached[1]  # type: ignore
+
     classes = []
     # Use the new import_module function
-    module = import_module(file)
+    module = import_module(abs_path)
     
     # Get all classes in the module
     class_list = inspect.getmembers(module, inspect.isclass)
@@ -116,5 +129,22 @@ def load_classes_from_file(file: str, base_class: type[T], one_per_file: bool =
             classes.append(cls[1])
             if one_per_file:
                 break
-                
+
+    _file_classes[key] = (version, classes)
     return classes
+
+def load_class_by_name(folder: str, name: str, base_class: type[T]) -> type[T] | None:
+    """Class from folder/<name>.py or None when there is no such file."""
+    abs_folder = get_abs_path(folder)
+    try:
+        mtime = os.stat(abs_folder).st_mtime_ns
+    except OSError:
+        return None
+    listing = _folder_files.get(abs_folder)
+    if not listing or listing[0] != mtime:
+        names = {f[:-3] for f in os.listdir(abs_folder) if f.endswith(".py")}
+        _folder_files[abs_folder] = listing = (mtime, names)
+    if name not in listing[1]:
+        return None
+    classes = load_classes_from_file(os.path.join(abs_folder, name + ".py"), base_class)
+    return classes[0] if classes else None
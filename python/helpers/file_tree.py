@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from collections import deque
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
 import os
-from typing import Any, Callable, Iterable, Literal, Optional, Sequence
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Literal, Optional, Sequence
 
 from pathspec import PathSpec
 
@@ -21,6 +23,11 @@ OUTPUT_MODE_STRING = "string"
 OUTPUT_MODE_FLAT = "flat"
 OUTPUT_MODE_NESTED = "nested"
 
+# how often indexed directories are checked for changes, in seconds
+INDEX_POLL_INTERVAL = 2.0
+# number of folder indexes kept by get_index
+INDEX_CACHE_SIZE = 16
+
 
 def file_tree(
     relative_path: str,
@@ -33,6 +40,7 @@ def file_tree(
     sort: tuple[Literal["name", "created", "modified"], Literal["asc", "desc"]] = ("modified", "desc"),
     ignore: str | None = None,
     output_mode: Literal["string", "flat", "nested"] = OUTPUT_MODE_STRING,
+    index: FileTreeIndex | None = None,
 ) -> str | list[dict]:
     """Render a directory tree relative to the repository base path.
 
@@ -60,6 +68,9 @@ def file_tree(
 
         output_mode: One of :data:`OUTPUT_MODE_STRING`, :data:`OUTPUT_MODE_FLAT`, or
             :data:`OUTPUT_MODE_NESTED`.
+        index: Optional :class:`FileTreeIndex` of the same folder and ``ignore`` value, its
+            directory listings are used instead of scanning and the result is cached until
+            a listing changes. See :func:`get_index`.
 
     Returns:
         ``OUTPUT_MODE_STRING`` → ``str``: multi-line ASCII tree.
@@ -100,7 +111,48 @@ def file_tree(
     if max_lines < 0:
         raise ValueError("max_lines must be >= 0")
 
-    ignore_spec = _resolve_ignore_patterns(ignore, abs_root)
+    if index is not None:
+        return index.file_tree(
+            relative_path,
+            max_depth=max_depth,
+            max_lines=max_lines,
+            folders_first=folders_first,
+            max_folders=max_folders,
+            max_files=max_files,
+            sort=sort,
+            output_mode=output_mode,
+        )
+
+    return _build_tree(
+        abs_root,
+        relative_path,
+        max_depth=max_depth,
+        max_lines=max_lines,
+        folders_first=folders_first,
+        max_folders=max_folders,
+        max_files=max_files,
+        sort=sort,
+        ignore_spec=_resolve_ignore_patterns(ignore, abs_root),
+        output_mode=output_mode,
+        scandir=_scandir,
+    )
+
+
+def _build_tree(
+    abs_root: str,
+    relative_path: str,
+    *,
+    max_depth: int,
+    max_lines: int,
+    folders_first: bool,
+    max_folders: int,
+    max_files: int,
+    sort: tuple[Literal["name", "created", "modified"], Literal["asc", "desc"]],
+    ignore_spec: Optional[PathSpec],
+    output_mode: Literal["string", "flat", "nested"],
+    scandir: Callable[[str], Iterable[Any]],
+    visibility_cache: dict[str, bool] | None = None,
+) -> str | list[dict]:
 
     root_stat = os.stat(abs_root, follow_symlinks=False)
     root_name = os.path.basename(os.path.normpath(abs_root)) or os.path.basename(abs_root)
@@ -119,12 +171,12 @@ def file_tree(
     nodes_in_order: list[_TreeEntry] = []
     rendered_count = 0
     limit_reached = False
-    visibility_cache: dict[str, bool] = {}
+    if visibility_cache is None:
+        visibility_cache = {}
 
     def make_entry(entry: os.DirEntry, parent: _TreeEntry, level: int, item_type: Literal["file", "folder"]) -> _TreeEntry:
         stat = entry.stat(follow_symlinks=False)
-        rel_path = os.path.relpath(entry.path, abs_root)
-        rel_posix = _normalize_relative_path(rel_path)
+        rel_posix = _relative_posix(entry.path, abs_root)
         return _TreeEntry(
             name=entry.name,
             level=level,
@@ -149,6 +201,7 @@ def file_tree(
             ignore_spec,
             max_depth_remaining=remaining_depth,
             cache=visibility_cache,
+            scandir=scandir,
         )
 
         folder_entries = [make_entry(folder, parent_node, level, "folder") for folder in folders]
@@ -214,6 +267,7 @@ def file_tree(
                 folder_path,
                 abs_root,
                 ignore_spec,
+                scandir,
             )
             if summary is None:
                 continue
@@ -248,6 +302,178 @@ def file_tree(
     return _to_nested_structure(root_node.items or [])
 
 
+class FileTreeIndex:
+    """Directory listings of one folder reused between :func:`file_tree` calls.
+
+    Listings are kept while the directory modification time is unchanged, stats
+    of rendered entries are refreshed with them, so edited files still reorder
+    the tree. Changes are polled at most every :data:`INDEX_POLL_INTERVAL` seconds,
+    in between string trees are returned from cache. A ``file:`` ignore reference
+    is read once, when the index is created.
+    """
+
+    def __init__(self, relative_path: str, ignore: str | None = None):
+        self.root = get_abs_path(relative_path)
+        self.ignore = ignore
+        spec = _resolve_ignore_patterns(ignore, self.root)
+        # gitignore matching is a pure function of the path, memoize it
+        self.ignore_spec: Any = _CachedSpec(spec) if spec else None
+        self._listings: dict[str, _Listing] = {}
+        self._trees: dict[tuple, str] = {}
+        # visibility of ignored folders per options, valid while no listing changes
+        self._visibility: dict[tuple, dict[str, bool]] = {}
+        self._generation = 0
+        self._polled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def file_tree(
+        self,
+        relative_path: str,
+        *,
+        output_mode: Literal["string", "flat", "nested"] = OUTPUT_MODE_STRING,
+        **options: Any,
+    ) -> str | list[dict]:
+        """Same as :func:`file_tree` for the indexed folder, ``ignore`` is given by the index."""
+        if get_abs_path(relative_path) != self.root:
+            raise ValueError(f"Index of {self.root!r} cannot render {relative_path!r}")
+        defaults = {
+            "max_depth": 0,
+            "max_lines": 0,
+            "folders_first": True,
+            "max_folders": 0,
+            "max_files": 0,
+            "sort": (SORT_BY_MODIFIED, SORT_DESC),
+        }
+        options = {**defaults, **options}
+        key = (relative_path, *sorted(options.items()))
+
+        with self._lock:
+            if time.monotonic() - self._polled_at >= INDEX_POLL_INTERVAL:
+                self._poll()
+            if output_mode == OUTPUT_MODE_STRING and key in self._trees:
+                return self._trees[key]
+            result = _build_tree(
+                self.root,
+                relative_path,
+                ignore_spec=self.ignore_spec,
+                output_mode=output_mode,
+                scandir=self._scandir,
+                visibility_cache=self._visibility.setdefault(key, {}),
+                **options,
+            )
+            # structured outputs are mutable, only strings are shared
+            if output_mode == OUTPUT_MODE_STRING:
+                self._trees[key] = result  # type: ignore[assignment]
+            return result
+
+    def _scandir(self, directory: str) -> list[_IndexedEntry]:
+        listing = self._listings.get(directory)
+        if listing is None:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as iterator:
+                entries = [_IndexedEntry(entry) for entry in iterator]
+            listing = self._listings[directory] = _Listing(mtime, entries)
+        listing.generation = self._generation
+        return listing.entries
+
+    def _poll(self) -> None:
+        self._polled_at = time.monotonic()
+        changed = False
+        for directory, listing in list(self._listings.items()):
+            # not used by any cached tree
+            if listing.generation != self._generation:
+                del self._listings[directory]
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != listing.mtime_ns:
+                del self._listings[directory]
+                changed = True
+                continue
+            for entry in listing.entries:
+                if entry.refresh():
+                    changed = True
+        if changed:
+            self._trees.clear()
+            self._visibility.clear()
+            self._generation += 1
+
+
+def get_index(relative_path: str, ignore: str | None = None) -> FileTreeIndex:
+    """Shared :class:`FileTreeIndex` for the folder and ignore patterns."""
+    key = (get_abs_path(relative_path), ignore)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = FileTreeIndex(relative_path, ignore)
+        _indexes.move_to_end(key)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+        return index
+
+
+_indexes: OrderedDict[tuple[str, str | None], FileTreeIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class _Listing:
+    __slots__ = ("mtime_ns", "entries", "generation")
+
+    def __init__(self, mtime_ns: int, entries: list[_IndexedEntry]):
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self.generation = 0
+
+
+class _IndexedEntry:
+    """Cached stand-in for :class:`os.DirEntry`, stat is read on first use."""
+
+    __slots__ = ("name", "path", "_is_dir", "_stat")
+
+    def __init__(self, entry: os.DirEntry):
+        self.name = entry.name
+        self.path = entry.path
+        self._is_dir = entry.is_dir(follow_symlinks=False)
+        self._stat: os.stat_result | None = None
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._is_dir
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if self._stat is None:
+            self._stat = os.stat(self.path, follow_symlinks=False)
+        return self._stat
+
+    def refresh(self) -> bool:
+        # True when a stat used for rendering is outdated
+        if self._stat is None:
+            return False
+        try:
+            stat = os.stat(self.path, follow_symlinks=False)
+        except OSError:
+            self._stat = None
+            return True
+        changed = (stat.st_mtime_ns, stat.st_ctime_ns) != (self._stat.st_mtime_ns, self._stat.st_ctime_ns)
+        self._stat = stat
+        return changed
+
+
+class _CachedSpec:
+    __slots__ = ("spec", "matches")
+
+    def __init__(self, spec: PathSpec):
+        self.spec = spec
+        self.matches: dict[str, bool] = {}
+
+    def match_file(self, file: str) -> bool:
+        matched = self.matches.get(file)
+        if matched is None:
+            matched = self.matches[file] = self.spec.match_file(file)
+        return matched
+
+
 @dataclass(slots=True)
 class _TreeEntry:
     name: str
@@ -282,12 +508,26 @@ def _normalize_relative_path(path: str) -> str:
     return normalized
 
 
+def _relative_posix(path: str, root_abs_path: str) -> str:
+    # entries are always below the root, slicing avoids the cost of os.path.relpath
+    prefix = root_abs_path.rstrip(os.sep) + os.sep
+    if path.startswith(prefix):
+        return _normalize_relative_path(path[len(prefix):])
+    return _normalize_relative_path(os.path.relpath(path, root_abs_path))
+
+
+def _scandir(directory: str) -> Iterator[os.DirEntry]:
+    with os.scandir(directory) as iterator:
+        yield from iterator
+
+
 def _directory_has_visible_entries(
     directory: str,
     root_abs_path: str,
     ignore_spec: PathSpec,
     cache: dict[str, bool],
     max_depth_remaining: int,
+    scandir: Callable[[str], Iterable[Any]] = _scandir,
 ) -> bool:
     if max_depth_remaining == 0:
         return False
@@ -297,34 +537,33 @@ def _directory_has_visible_entries(
         return cached
 
     try:
-        with os.scandir(directory) as iterator:
-            for entry in iterator:
-                rel_path = os.path.relpath(entry.path, root_abs_path)
-                rel_posix = _normalize_relative_path(rel_path)
-                is_dir = entry.is_dir(follow_symlinks=False)
-
-                if is_dir:
-                    ignored = ignore_spec.match_file(rel_posix) or ignore_spec.match_file(f"{rel_posix}/")
-                    if ignored:
-                        next_depth = max_depth_remaining - 1 if max_depth_remaining > 0 else -1
-                        if next_depth == 0:
-                            continue
-                        if _directory_has_visible_entries(
-                            entry.path,
-                            root_abs_path,
-                            ignore_spec,
-                            cache,
-                            next_depth,
-                        ):
-                            cache[directory] = True
-                            return True
-                        continue
-                else:
-                    if ignore_spec.match_file(rel_posix):
+        for entry in scandir(directory):
+            rel_posix = _relative_posix(entry.path, root_abs_path)
+            is_dir = entry.is_dir(follow_symlinks=False)
+
+            if is_dir:
+                ignored = ignore_spec.match_file(rel_posix) or ignore_spec.match_file(f"{rel_posix}/")
+                if ignored:
+                    next_depth = max_depth_remaining - 1 if max_depth_remaining > 0 else -1
+                    if next_depth == 0:
                         continue
+                    if _directory_has_visible_entries(
+                        entry.path,
+                        root_abs_path,
+                        ignore_spec,
+                        cache,
+                        next_depth,
+                        scandir,
+                    ):
+                        cache[directory] = True
+                        return True
+                    continue
+            else:
+                if ignore_spec.match_file(rel_posix):
+                    continue
 
-                cache[directory] = True
-                return True
+            cache[directory] = True
+            return True
     except FileNotFoundError:
         cache[directory] = False
         return False
@@ -383,6 +622,7 @@ def _create_folder_unprocessed_comment(
     folder_path: str,
     abs_root: str,
     ignore_spec: Optional[PathSpec],
+    scandir: Callable[[str], Iterable[Any]] = _scandir,
 ) -> Optional[_TreeEntry]:
     try:
         folders, files = _list_directory_children(
@@ -391,6 +631,7 @@ def _create_folder_unprocessed_comment(
             ignore_spec,
             max_depth_remaining=-1,
             cache={},
+            scandir=scandir,
         )
     except FileNotFoundError:
         return None
@@ -502,40 +743,40 @@ def _list_directory_children(
     *,
     max_depth_remaining: int,
     cache: dict[str, bool],
+    scandir: Callable[[str], Iterable[Any]] = _scandir,
 ) -> tuple[list[os.DirEntry], list[os.DirEntry]]:
     folders: list[os.DirEntry] = []
     files: list[os.DirEntry] = []
 
     try:
-        with os.scandir(directory) as iterator:
-            for entry in iterator:
-                if entry.name in (".", ".."):
-                    continue
-                rel_path = os.path.relpath(entry.path, root_abs_path)
-                rel_posix = _normalize_relative_path(rel_path)
-                is_directory = entry.is_dir(follow_symlinks=False)
-
-                if ignore_spec:
-                    if is_directory:
-                        ignored = ignore_spec.match_file(rel_posix) or ignore_spec.match_file(f"{rel_posix}/")
-                        if ignored:
-                            if _directory_has_visible_entries(
-                                entry.path,
-                                root_abs_path,
-                                ignore_spec,
-                                cache,
-                                max_depth_remaining - 1,
-                            ):
-                                folders.append(entry)
-                            continue
-                    else:
-                        if ignore_spec.match_file(rel_posix):
-                            continue
+        for entry in scandir(directory):
+            if entry.name in (".", ".."):
+                continue
+            is_directory = entry.is_dir(follow_symlinks=False)
 
+            if ignore_spec:
+                rel_posix = _relative_posix(entry.path, root_abs_path)
                 if is_directory:
-                    folders.append(entry)
+                    ignored = ignore_spec.match_file(rel_posix) or ignore_spec.match_file(f"{rel_posix}/")
+                    if ignored:
+                        if _directory_has_visible_entries(
+                            entry.path,
+                            root_abs_path,
+                            ignore_spec,
+                            cache,
+                            max_depth_remaining - 1,
+                            scandir,
+                        ):
+                            folders.append(entry)
+                        continue
                 else:
-                    files.append(entry)
+                    if ignore_spec.match_file(rel_posix):
+                        continue
+
+            if is_directory:
+                folders.append(entry)
+            else:
+                files.append(entry)
     except FileNotFoundError:
         return ([], [])
 
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
 from fnmatch import fnmatch
 import json
 from ntpath import isabs
@@ -26,93 +28,228 @@ class VariablesPlugin(ABC):
 def load_plugin_variables(
     file: str, backup_dirs: list[str] | None = None, **kwargs
 ) -> dict[str, Any]:
-    if not file.endswith(".md"):
-        return {}
-
     if backup_dirs is None:
         backup_dirs = []
+    plugin_file = _find_plugin_file(file, backup_dirs)
+    if plugin_file:
+        return _get_plugin_variables(plugin_file, file, backup_dirs, **kwargs)
+    return {}
 
+
+def _find_plugin_file(file: str, backup_dirs: list[str]) -> str | None:
+    if not file.endswith(".md"):
+        return None
     try:
         # Create filename and directories list
         plugin_filename = basename(file, ".md") + ".py"
         directories = [dirname(file)] + backup_dirs
         plugin_file = find_file_in_dirs(plugin_filename, directories)
     except FileNotFoundError:
-        plugin_file = None
+        return None
+    return plugin_file if exists(plugin_file) else None
 
-    if plugin_file and exists(plugin_file):
 
-        from python.helpers import extract_tools
+def _get_plugin_variables(
+    plugin_file: str, file: str, backup_dirs: list[str], **kwargs
+) -> dict[str, Any]:
+    from python.helpers import extract_tools
 
-        classes = extract_tools.load_classes_from_file(
-            plugin_file, VariablesPlugin, one_per_file=False
-        )
-        for cls in classes:
-            return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
-
-        # load python code and extract variables variables from it
-        # module = None
-        # module_name = dirname(plugin_file).replace("/", ".") + "." + basename(plugin_file, '.py')
-
-        # try:
-        #     spec = importlib.util.spec_from_file_location(module_name, plugin_file)
-        #     if not spec:
-        #         return {}
-        #     module = importlib.util.module_from_spec(spec)
-        #     sys.modules[spec.name] = module
-        #     spec.loader.exec_module(module)  # type: ignore
-        # except ImportError:
-        #     return {}
-
-        # if module is None:
-        #     return {}
-
-        # # Get all classes in the module
-        # class_list = inspect.getmembers(module, inspect.isclass)
-        # # Filter for classes that are subclasses of VariablesPlugin
-        # # iterate backwards to skip imported superclasses
-        # for cls in reversed(class_list):
-        #     if cls[1] is not VariablesPlugin and issubclass(cls[1], VariablesPlugin):
-        #         return cls[1]().get_variables()  # type: ignore
+    # classes are cached by file modification time
+    classes = extract_tools.load_classes_from_file(
+        plugin_file, VariablesPlugin, one_per_file=False
+    )
+    for cls in classes:
+        return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
     return {}
 
 
 from python.helpers.strings import sanitize_string
 
 
-def parse_file(
-    _filename: str, _directories: list[str] | None = None, _encoding="utf-8", **kwargs
-):
-    if _directories is None:
-        _directories = []
+# compiled prompt templates by file, directories and mode, see _get_prompt_template
+_prompt_templates: dict[tuple, "_PromptTemplate"] = {}
+_TEMPLATE_TOKEN = re.compile(r"{{(\w+)}}|{{\s*include\s*['\"](.*?)['\"]\s*}}")
+_TEXT, _VARIABLE, _INCLUDE = 0, 1, 2
+
+
+class _PromptTemplate:
+    """Prompt file split once into text, placeholders and includes.
+
+    Templates are valid while the file and the directories searched for it
+    and its variables plugin are unchanged, adding an override file to a
+    profile folder or editing the prompt compiles it again.
+    """
+
+    def __init__(
+        self,
+        content: str,
+        is_json: bool,
+        plugin_file: str | None,
+        plugin_for: str,
+        stamped: list[str],
+    ):
+        self.is_json = is_json
+        self.plugin_file = plugin_file
+        self.plugin_for = plugin_for
+        self.stamps = {path: get_stamp(path) for path in stamped}
+        # (kind, value, source text)
+        self.parts: list[tuple[int, str, str]] = []
+        pos = 0
+        for match in _TEMPLATE_TOKEN.finditer(content):
+            if match.start() > pos:
+                text = content[pos : match.start()]
+                self.parts.append((_TEXT, text, text))
+            if match.group(1) is not None:
+                self.parts.append((_VARIABLE, match.group(1), match.group(0)))
+            elif is_json:  # json templates do not process includes
+                self.parts.append((_TEXT, match.group(0), match.group(0)))
+            else:
+                self.parts.append((_INCLUDE, match.group(2), match.group(0)))
+            pos = match.end()
+        if pos < len(content):
+            self.parts.append((_TEXT, content[pos:], content[pos:]))
+
+    def is_current(self) -> bool:
+        return stamps_current(self.stamps)
+
+    def render(self, directories: list[str], **kwargs):
+        variables = {}
+        if self.plugin_file:
+            variables = _get_plugin_variables(self.plugin_file, self.plugin_for, directories, **kwargs) or {}
+        variables.update(kwargs)
+
+        if self.is_json:
+            content = "".join(
+                json.dumps(variables[value]) if kind == _VARIABLE and value in variables else source
+                for kind, value, source in self.parts
+            )
+            return json.loads(content)
+
+        result = []
+        for kind, value, source in self.parts:
+            if kind == _TEXT:
+                result.append(value)
+            elif kind == _VARIABLE:
+                if value not in variables:
+                    result.append(source)
+                    continue
+                text = str(variables[value])
+                # includes in values were processed too, tool prompts use them
+                if "{{" in text:
+                    text = process_includes(text, directories, **kwargs)
+                result.append(text)
+            elif os.path.isabs(value):
+                # if the path is absolute, do not process it
+                result.append(source)
+            else:
+                try:
+                    # here we use kwargs, the plugin variables are not inherited
+                    result.append(read_prompt_file(value, directories, **kwargs))
+                except FileNotFoundError:
+                    result.append(source)  # Return original if file not found
+        return "".join(result)
+
+
+# stamps collected by track_prompt_files for the current context
+_tracked_stamps: ContextVar[dict[str, Any] | None] = ContextVar("_tracked_stamps", default=None)
+
+
+@contextmanager
+def track_prompt_files():
+    """Collect stamps of the files and folders prompts are read from within the block.
+
+    Yields a dict of path to stamp covering found prompts, folders searched
+    for them and folders listed by variables plugins, stamps_current tells
+    if reading the same prompts now could give a different result.
+    """
+    stamps: dict[str, Any] = {}
+    token = _tracked_stamps.set(stamps)
+    try:
+        yield stamps
+    finally:
+        _tracked_stamps.reset(token)
+        outer = _tracked_stamps.get()
+        if outer is not None:
+            outer.update(stamps)
+
+
+def stamps_current(stamps: dict[str, Any]) -> bool:
+    return all(get_stamp(path) == stamp for path, stamp in stamps.items())
+
+
+def _track(*paths: str):
+    tracked = _tracked_stamps.get()
+    if tracked is not None:
+        for path in paths:
+            if path not in tracked:
+                tracked[path] = get_stamp(path)
+
+
+def get_stamp(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _get_prompt_template(
+    _file: str, _directories: list[str], _encoding: str, parse: bool
+) -> _PromptTemplate:
+    key = (_file, tuple(_directories), _encoding, parse)
+    template = _prompt_templates.get(key)
+    if template and template.is_current():
+        tracked = _tracked_stamps.get()
+        if tracked is not None:
+            tracked.update(template.stamps)
+        return template
 
     # Find the file in the directories
-    absolute_path = find_file_in_dirs(_filename, _directories)
+    try:
+        absolute_path = find_file_in_dirs(_file, _directories)
+    except FileNotFoundError:
+        # the file may be added later
+        _track(*(os.path.dirname(get_abs_path(d, _file)) for d in _directories))
+        raise
 
     # Read the file content
     with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
         content = f.read()
 
-    is_json = is_full_json_template(content)
-    content = remove_code_fences(content)
-    variables = load_plugin_variables(absolute_path, _directories, **kwargs) or {}  # type: ignore
-    variables.update(kwargs)
-    if is_json:
-        content = replace_placeholders_json(content, **variables)
-        obj = json.loads(content)
-        # obj = replace_placeholders_dict(obj, **variables)
-        return obj
-    else:
-        content = replace_placeholders_text(content, **variables)
-        # Process include statements
-        content = process_includes(
-            # here we use kwargs, the plugin variables are not inherited
-            content,
-            _directories,
-            **kwargs,
+    is_json = False
+    if parse:
+        is_json = is_full_json_template(content)
+        content = remove_code_fences(content)
+
+    # parse_file looks up the plugin next to the found file, read_prompt_file by the name
+    plugin_for = absolute_path if parse else _file
+    plugin_file = _find_plugin_file(plugin_for, _directories)
+
+    # folders whose listing decides which template and plugin are found
+    stamped = {os.path.dirname(get_abs_path(d, _file)) for d in _directories}
+    if plugin_for.endswith(".md"):
+        plugin_filename = basename(plugin_for, ".md") + ".py"
+        stamped.update(
+            os.path.dirname(get_abs_path(d, plugin_filename))
+            for d in [dirname(plugin_for)] + _directories
         )
-        return content
+    template = _PromptTemplate(
+        content, is_json, plugin_file, plugin_for, sorted(stamped) + [absolute_path]
+    )
+    _prompt_templates[key] = template
+    tracked = _tracked_stamps.get()
+    if tracked is not None:
+        tracked.update(template.stamps)
+    return template
+
+
+def parse_file(
+    _filename: str, _directories: list[str] | None = None, _encoding="utf-8", **kwargs
+):
+    if _directories is None:
+        _directories = []
+    template = _get_prompt_template(_filename, _directories, _encoding, parse=True)
+    return template.render(_directories, **kwargs)
 
 
 def read_prompt_file(
@@ -127,29 +264,8 @@ def read_prompt_file(
         _file = os.path.basename(_file)
         _directories = [folder_path] + _directories
 
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_file, _directories)
-
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
-        content = f.read()
-
-    variables = load_plugin_variables(_file, _directories, **kwargs) or {}  # type: ignore
-    variables.update(kwargs)
-
-    # Replace placeholders with values from kwargs
-    content = replace_placeholders_text(content, **variables)
-
-    # Process include statements
-    content = process_includes(
-        # here we use kwargs, the plugin variables are not inherited
-        content,
-        _directories,
-        **kwargs,
-    )
-
-    return content
+    template = _get_prompt_template(_file, _directories, _encoding, parse=False)
+    return template.render(_directories, **kwargs)
 
 
 def read_file(relative_path: str, encoding="utf-8"):
@@ -270,6 +386,7 @@ def get_unique_filenames_in_dirs(dir_paths: list[str], pattern: str = "*"):
     result = []
     for dir_path in dir_paths:
         full_dir = get_abs_path(dir_path)
+        _track(full_dir)
         for file_path in glob.glob(os.path.join(full_dir, pattern)):
             fname = os.path.basename(file_path)
             if fname not in seen and os.path.isfile(file_path):
@@ -281,17 +398,27 @@ def get_unique_filenames_in_dirs(dir_paths: list[str], pattern: str = "*"):
 
 
 def remove_code_fences(text):
-    # Pattern to match code fences with optional language specifier
-    pattern = r"(```|~~~)(.*?\n)(.*?)(\1)"
-
-    # Function to replace the code fences
-    def replacer(match):
-        return match.group(3)  # Return the code without fences
-
-    # Use re.DOTALL to make '.' match newlines
-    result = re.sub(pattern, replacer, text, flags=re.DOTALL)
-
-    return result
+    # same result as re.sub(r"(```|~~~)(.*?\n)(.*?)(\1)", r"\3", text, flags=re.DOTALL)
+    # (fence, rest of the opening line, content kept, closing fence), with str.find instead of regex backtracking
+    result = []
+    pos = search = 0
+    while True:
+        ticks, tildes = text.find("```", search), text.find("~~~", search)
+        start = min(ticks, tildes) if ticks != -1 and tildes != -1 else max(ticks, tildes)
+        if start == -1:
+            break
+        newline = text.find("\n", start + 3)
+        if newline == -1:
+            break
+        end = text.find(text[start : start + 3], newline + 1)
+        if end == -1:
+            search = start + 1  # not a fence, try from the next character
+            continue
+        result.append(text[pos:start])
+        result.append(text[newline + 1 : end])
+        pos = search = end + 3
+    result.append(text[pos:])
+    return "".join(result)
 
 
 def is_full_json_template(text):
@@ -467,6 +594,7 @@ def get_subdirectories(
     exclude: str | list[str] | None = None,
 ):
     abs_path = get_abs_path(relative_path)
+    _track(abs_path)
     if not os.path.exists(abs_path):
         return []
     if isinstance(include, str):
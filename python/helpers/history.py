@@ -81,6 +81,7 @@ class Message(Record):
         self.content = content
         self.summary: str = ""
         self.tokens: int = tokens or self.calculate_tokens()
+        self._langchain: list[BaseMessage] | None = None  # cached conversion
 
     def get_tokens(self) -> int:
         if not self.tokens:
@@ -94,6 +95,7 @@ class Message(Record):
     def set_summary(self, summary: str):
         self.summary = summary
         self.tokens = self.calculate_tokens()
+        self._langchain = None
 
     async def compress(self):
         return False
@@ -102,7 +104,9 @@ class Message(Record):
         return [OutputMessage(ai=self.ai, content=self.summary or self.content)]
 
     def output_langchain(self):
-        return output_langchain(self.output())
+        if self._langchain is None:
+            self._langchain = output_langchain(self.output())
+        return self._langchain
 
     def output_text(self, human_label="user", ai_label="ai"):
         return output_text(self.output(), ai_label, human_label)
@@ -130,20 +134,40 @@ class Topic(Record):
         self.history = history
         self.summary: str = ""
         self.messages: list[Message] = []
+        self._messages_tokens = 0  # running total of messages tokens
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    @summary.setter
+    def summary(self, value: str):
+        self._summary = value
+        self._summary_tokens = tokens.approximate_tokens(value) if value else 0
+        self._summary_langchain: list[BaseMessage] | None = None
 
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            return self._summary_tokens
         else:
-            return sum(msg.get_tokens() for msg in self.messages)
+            return self._messages_tokens
+
+    def recalculate_tokens(self):
+        self._messages_tokens = sum(msg.get_tokens() for msg in self.messages)
 
     def add_message(
         self, ai: bool, content: MessageContent, tokens: int = 0
     ) -> Message:
         msg = Message(ai=ai, content=content, tokens=tokens)
         self.messages.append(msg)
+        self._messages_tokens += msg.get_tokens()
         return msg
 
+    def set_message_summary(self, msg: Message, summary: str):
+        before = msg.get_tokens()
+        msg.set_summary(summary)
+        self._messages_tokens += msg.get_tokens() - before
+
     def output(self) -> list[OutputMessage]:
         if self.summary:
             return [OutputMessage(ai=False, content=self.summary)]
@@ -151,12 +175,21 @@ class Topic(Record):
             msgs = [m for r in self.messages for m in r.output()]
             return msgs
 
+    def output_langchain(self):
+        if self.summary:
+            if self._summary_langchain is None:
+                self._summary_langchain = output_langchain(self.output())
+            return self._summary_langchain
+        return group_messages_abab(
+            [m for r in self.messages for m in r.output_langchain()]
+        )
+
     async def summarize(self):
         self.summary = await self.summarize_messages(self.messages)
         return self.summary
 
     async def compress_large_messages(self) -> bool:
-        set = settings.get_settings()
+        set = settings.get_snapshot()
         msg_max_size = (
             set["chat_model_ctx_length"]
             * set["chat_model_ctx_history"]
@@ -177,8 +210,8 @@ class Topic(Record):
             trim_to_chars = leng * (msg_max_size / tok)
             # raw messages will be replaced as a whole, they would become invalid when truncated
             if _is_raw_message(out[0]["content"]):
-                msg.set_summary(
-                    "Message content replaced to save space in context window"
+                self.set_message_summary(
+                    msg, "Message content replaced to save space in context window"
                 )
 
             # regular messages will be truncated
@@ -189,7 +222,7 @@ class Topic(Record):
                     trim_to_chars * 1.15,
                     trim_to_chars * 0.85,
                 )
-                msg.set_summary(_json_dumps(trunc))
+                self.set_message_summary(msg, _json_dumps(trunc))
 
             return True
         return False
@@ -211,6 +244,9 @@ class Topic(Record):
             )
             sum_msg = Message(False, sum_msg_content)
             self.messages[1 : cnt_to_sum + 1] = [sum_msg]
+            self._messages_tokens += sum_msg.get_tokens() - sum(
+                m.get_tokens() for m in msg_to_sum
+            )
             return True
         return False
 
@@ -239,6 +275,7 @@ class Topic(Record):
         topic.messages = [
             Message.from_dict(m, history=history) for m in data.get("messages", [])
         ]
+        topic.recalculate_tokens()
         return topic
 
 
@@ -248,11 +285,38 @@ class Bulk(Record):
         self.summary: str = ""
         self.records: list[Record] = []
 
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    @summary.setter
+    def summary(self, value: str):
+        self._summary = value
+        self._summary_tokens = tokens.approximate_tokens(value) if value else 0
+        self._summary_langchain: list[BaseMessage] | None = None
+
+    @property
+    def records(self) -> list[Record]:
+        return self._records
+
+    @records.setter
+    def records(self, value: list[Record]):
+        self._records = value
+        # calculated on first use
+        self._records_tokens: int | None = None
+        self._records_langchain: list[BaseMessage] | None = None
+
+    def add_record(self, record: Record):
+        self._records.append(record)
+        self._records_tokens = None
+        self._records_langchain = None
+
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
-        else:
-            return sum([r.get_tokens() for r in self.records])
+            return self._summary_tokens
+        if self._records_tokens is None:
+            self._records_tokens = sum([r.get_tokens() for r in self.records])
+        return self._records_tokens
 
     def output(
         self, human_label: str = "user", ai_label: str = "ai"
@@ -263,6 +327,17 @@ class Bulk(Record):
             msgs = [m for r in self.records for m in r.output()]
             return msgs
 
+    def output_langchain(self):
+        if self.summary:
+            if self._summary_langchain is None:
+                self._summary_langchain = output_langchain(self.output())
+            return self._summary_langchain
+        if self._records_langchain is None:
+            self._records_langchain = group_messages_abab(
+                [m for r in self.records for m in r.output_langchain()]
+            )
+        return self._records_langchain
+
     async def compress(self):
         return False
 
@@ -300,6 +375,14 @@ class History(Record):
         self.topics: list[Topic] = []
         self.current = Topic(history=self)
         self.agent: Agent = agent
+        # running totals of bulks and topics tokens
+        self._bulks_tokens = 0
+        self._topics_tokens = 0
+        # outputs of bulks and topics, rebuilt after they change
+        self._output_prefix: list[OutputMessage] | None = None
+        self._langchain_prefix: list[BaseMessage] | None = None
+        # incremented on every change other than adding a message to the current topic
+        self.version = 0
 
     def get_tokens(self) -> int:
         return (
@@ -314,10 +397,20 @@ class History(Record):
         return total > limit
 
     def get_bulks_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.bulks)
+        return self._bulks_tokens
 
     def get_topics_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.topics)
+        return self._topics_tokens
+
+    def recalculate_tokens(self):
+        self._bulks_tokens = sum(record.get_tokens() for record in self.bulks)
+        self._topics_tokens = sum(record.get_tokens() for record in self.topics)
+        self._invalidate_output()
+
+    def _invalidate_output(self):
+        self._output_prefix = None
+        self._langchain_prefix = None
+        self.version += 1
 
     def get_current_topic_tokens(self) -> int:
         return self.current.get_tokens()
@@ -331,14 +424,29 @@ class History(Record):
     def new_topic(self):
         if self.current.messages:
             self.topics.append(self.current)
+            self._topics_tokens += self.current.get_tokens()
+            self._invalidate_output()
             self.current = Topic(history=self)
 
     def output(self) -> list[OutputMessage]:
-        result: list[OutputMessage] = []
-        result += [m for b in self.bulks for m in b.output()]
-        result += [m for t in self.topics for m in t.output()]
-        result += self.current.output()
-        return result
+        if self._output_prefix is None:
+            prefix: list[OutputMessage] = []
+            prefix += [m for b in self.bulks for m in b.output()]
+            prefix += [m for t in self.topics for m in t.output()]
+            self._output_prefix = prefix
+        # copies, so callers editing messages in place don't change the cache
+        return [
+            OutputMessage(ai=m["ai"], content=m["content"]) for m in self._output_prefix
+        ] + self.current.output()
+
+    def output_langchain(self):
+        if self._langchain_prefix is None:
+            self._langchain_prefix = group_messages_abab(
+                [m for r in [*self.bulks, *self.topics] for m in r.output_langchain()]
+            )
+        return join_messages_abab(
+            self._langchain_prefix, self.current.output_langchain()
+        )
 
     @staticmethod
     def from_dict(data: dict, history: "History"):
@@ -346,6 +454,7 @@ class History(Record):
         history.bulks = [Bulk.from_dict(b, history=history) for b in data["bulks"]]
         history.topics = [Topic.from_dict(t, history=history) for t in data["topics"]]
         history.current = Topic.from_dict(data["current"], history=history)
+        history.recalculate_tokens()
         return history
 
     def to_dict(self):
@@ -382,6 +491,7 @@ class History(Record):
                     over_part = ratio[2]
                     if over_part == "current_topic":
                         compressed_part = await self.current.compress()
+                        self.version += 1
                     elif over_part == "history_topic":
                         compressed_part = await self.compress_topics()
                     else:
@@ -399,19 +509,25 @@ class History(Record):
         # summarize topics one by one
         for topic in self.topics:
             if not topic.summary:
+                before = topic.get_tokens()
                 await topic.summarize()
+                self._topics_tokens += topic.get_tokens() - before
+                self._invalidate_output()
                 return True
 
         # move oldest topic to bulks and summarize
         for topic in self.topics:
             bulk = Bulk(history=self)
-            bulk.records.append(topic)
+            bulk.add_record(topic)
             if topic.summary:
                 bulk.summary = topic.summary
             else:
                 await bulk.summarize()
             self.bulks.append(bulk)
+            self._bulks_tokens += bulk.get_tokens()
             self.topics.remove(topic)
+            self._topics_tokens -= topic.get_tokens()
+            self._invalidate_output()
             return True
         return False
 
@@ -420,7 +536,9 @@ class History(Record):
         compressed = await self.merge_bulks_by(BULK_MERGE_COUNT)
         # remove oldest bulk if necessary
         if not compressed:
-            self.bulks.pop(0)
+            removed = self.bulks.pop(0)
+            self._bulks_tokens -= removed.get_tokens()
+            self._invalidate_output()
             return True
         return compressed
 
@@ -436,6 +554,8 @@ class History(Record):
             ]
         )
         self.bulks = bulks
+        self._bulks_tokens = sum(bulk.get_tokens() for bulk in self.bulks)
+        self._invalidate_output()
         return True
 
     async def merge_bulks(self, bulks: list[Bulk]) -> Bulk:
@@ -453,8 +573,8 @@ def deserialize_history(json_data: str, agent) -> History:
     return history
 
 
-def _get_ctx_size_for_history() -> int:
-    set = settings.get_settings()
+@settings.derived
+def _get_ctx_size_for_history(set: settings.Settings) -> int:
     return int(set["chat_model_ctx_length"] * set["chat_model_ctx_history"])
 
 
@@ -516,6 +636,30 @@ def group_messages_abab(messages: list[BaseMessage]) -> list[BaseMessage]:
     return result
 
 
+def join_messages_abab(
+    a: list[BaseMessage], b: list[BaseMessage]
+) -> list[BaseMessage]:
+    # join two already alternating lists, only the boundary may need merging
+    if a and b and isinstance(a[-1], type(b[0])):
+        return a[:-1] + group_messages_abab([a[-1], b[0]]) + b[1:]
+    return a + b
+
+
+def output_contents(messages: list[OutputMessage]) -> list[tuple[bool, MessageContent]]:
+    """Cheap version of an output, compare with output_unchanged to detect edits."""
+    return [(m["ai"], m["content"]) for m in messages]
+
+
+def output_unchanged(
+    messages: list[OutputMessage], contents: list[tuple[bool, MessageContent]]
+) -> bool:
+    # same messages with the very same content objects, nested edits are not detected
+    return len(messages) == len(contents) and all(
+        m["ai"] == ai and m["content"] is content
+        for m, (ai, content) in zip(messages, contents)
+    )
+
+
 def output_langchain(messages: list[OutputMessage]):
     result = []
     for m in messages:
@@ -1,7 +1,10 @@
 import glob
 import os
 import hashlib
-from typing import Any, Dict, Literal, TypedDict
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Literal, NotRequired, TypedDict
 from langchain_community.document_loaders import (
     CSVLoader,
     PyPDFLoader,
@@ -13,6 +16,22 @@ from python.helpers.print_style import PrintStyle
 
 text_loader_kwargs = {"autodetect_encoding": True}
 
+# Mapping file extensions to corresponding loader classes
+# Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
+file_types_loaders = {
+    "txt": TextLoader,
+    "pdf": PyPDFLoader,
+    "csv": CSVLoader,
+    "html": UnstructuredHTMLLoader,
+    "json": TextLoader,  # Use TextLoader for better consolidation compatibility
+    "md": TextLoader,    # Use TextLoader for better consolidation compatibility
+}
+
+# parse in a process pool only when there is enough work to pay for worker startup
+PARALLEL_MIN_FILES = 8
+CHECKSUM_BLOCK_SIZE = 1 << 20
+
+
 
 class KnowledgeImport(TypedDict):
     file: str
@@ -20,16 +39,132 @@ class KnowledgeImport(TypedDict):
     ids: list[str]
     state: Literal["changed", "original", "removed"]
     documents: list[Any]
+    mtime: NotRequired[float]
+    size: NotRequired[int]
 
 
 def calculate_checksum(file_path: str) -> str:
     hasher = hashlib.md5()
     with open(file_path, "rb") as f:
-        buf = f.read()
-        hasher.update(buf)
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK_SIZE), b""):
+            hasher.update(block)
     return hasher.hexdigest()
 
 
+def load_file_documents(file_path: str, ext: str, metadata: dict[str, Any]) -> list[Any]:
+    """Parse one knowledge file into documents, runs in a worker process."""
+    loader_cls = file_types_loaders[ext]
+    loader = loader_cls(
+        file_path,
+        **(
+            text_loader_kwargs
+            if ext in ["txt", "csv", "html", "md"]
+            else {}
+        ),
+    )
+    documents = loader.load_and_split()
+
+    # Enhanced metadata for better consolidation compatibility
+    enhanced_metadata = {
+        **metadata,
+        "source_file": os.path.basename(file_path),
+        "source_path": file_path,
+        "file_type": ext,
+        "knowledge_source": True,  # Flag to distinguish from conversation memories
+        "import_timestamp": None,  # Will be set when inserted into memory
+    }
+
+    # Apply metadata to all documents
+    for doc in documents:
+        doc.metadata = {**doc.metadata, **enhanced_metadata}
+    return documents
+
+
+class ImportRun:
+    """One knowledge import over several directories, shares the parsing
+    process pool between load_knowledge calls and adds up their stats."""
+
+    def __init__(self):
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_failed = False
+        self.stats: dict[str, Any] = {
+            "directories": 0,
+            "files_scanned": 0,
+            "files_skipped": 0,
+            "files_parsed": 0,
+            "documents": 0,
+            "bytes_parsed": 0,
+            "seconds": 0.0,
+            "files_per_second": 0.0,
+            "documents_per_second": 0.0,
+        }
+
+    def __enter__(self) -> "ImportRun":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_pool(self) -> ProcessPoolExecutor | None:
+        if self._pool is None and not self._pool_failed:
+            try:
+                workers = max(1, (os.cpu_count() or 2) - 1)
+                # spawn, forking a process with running threads and event loops is unsafe
+                context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            except Exception as e:
+                self.pool_failed(e)
+        return self._pool
+
+    def pool_failed(self, error: Exception):
+        # parse serially for the rest of the run
+        PrintStyle(font_color="yellow").print(f"Parallel knowledge parsing unavailable: {error}")
+        self._pool_failed = True
+        self.close()
+
+    def add_stats(self, **stats):
+        for key, value in stats.items():
+            self.stats[key] += value
+        elapsed = self.stats["seconds"]
+        self.stats["files_per_second"] = self.stats["files_parsed"] / elapsed if elapsed else 0
+        self.stats["documents_per_second"] = self.stats["documents"] / elapsed if elapsed else 0
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _parse_files(
+    jobs: list[tuple[str, str]], metadata: dict[str, Any], run: ImportRun
+) -> list[tuple[list[Any] | None, Exception | None]]:
+    def safe_load(job: tuple[str, str]):
+        try:
+            return load_file_documents(job[0], job[1], metadata), None
+        except Exception as e:
+            return None, e
+
+    pool = run.get_pool() if len(jobs) >= PARALLEL_MIN_FILES else None
+    if not pool:
+        return [safe_load(job) for job in jobs]
+
+    results: list[tuple[list[Any] | None, Exception | None]] = []
+    try:
+        futures = [
+            pool.submit(load_file_documents, path, ext, metadata) for path, ext in jobs
+        ]
+    except Exception as e:
+        # pool could not be started, fall back to serial parsing
+        run.pool_failed(e)
+        return [safe_load(job) for job in jobs]
+    for future in futures:
+        try:
+            results.append((future.result(), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
 def load_knowledge(
     log_item: LogItem | None,
     knowledge_dir: str,
@@ -37,24 +172,20 @@ def load_knowledge(
     metadata: dict[str, Any] = {},
     filename_pattern: str = "**/*",
     recursive: bool = True,
+    run: ImportRun | None = None,
 ) -> Dict[str, KnowledgeImport]:
     """
     Load knowledge files from a directory with change detection and metadata enhancement.
 
     This function now includes enhanced error handling and compatibility with the
-    intelligent memory consolidation system.
+    intelligent memory consolidation system. Pass the same run to import several
+    directories with one process pool, its stats include this directory.
     """
-
-    # Mapping file extensions to corresponding loader classes
-    # Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
-    file_types_loaders = {
-        "txt": TextLoader,
-        "pdf": PyPDFLoader,
-        "csv": CSVLoader,
-        "html": UnstructuredHTMLLoader,
-        "json": TextLoader,  # Use TextLoader for better consolidation compatibility
-        "md": TextLoader,    # Use TextLoader for better consolidation compatibility
-    }
+    if run is None:
+        with ImportRun() as run:
+            return load_knowledge(
+                log_item, knowledge_dir, index, metadata, filename_pattern, recursive, run
+            )
 
     cnt_files = 0
     cnt_docs = 0
@@ -114,6 +245,11 @@ def load_knowledge(
                 progress=f"\nFound {len(kn_files)} knowledge files in {knowledge_dir}, processing...",
             )
 
+    started = time.time()
+    cnt_skipped = 0
+    cnt_bytes = 0
+    to_parse: list[tuple[str, str]] = []
+
     for file_path in kn_files:
         try:
             # Get file extension safely
@@ -125,11 +261,8 @@ def load_knowledge(
             if ext not in file_types_loaders:
                 continue  # Skip unsupported file types
 
-            checksum = calculate_checksum(file_path)
-            if not checksum:
-                continue  # Skip files with checksum errors
-
             file_key = file_path
+            stat = os.stat(file_path)
 
             # Load existing data from the index or create a new entry
             file_data: KnowledgeImport = index.get(file_key, {
@@ -140,51 +273,33 @@ def load_knowledge(
                 "documents": []
             })
 
+            # Unchanged size and mtime, no need to read the file at all
+            if (
+                file_data.get("checksum")
+                and file_data.get("mtime") == stat.st_mtime
+                and file_data.get("size") == stat.st_size
+            ):
+                file_data["state"] = "original"
+                index[file_key] = file_data
+                cnt_skipped += 1
+                continue
+
+            checksum = calculate_checksum(file_path)
+            if not checksum:
+                continue  # Skip files with checksum errors
+
+            file_data["mtime"] = stat.st_mtime
+            file_data["size"] = stat.st_size
+
             # Check if file has changed
             if file_data.get("checksum") == checksum:
                 file_data["state"] = "original"
+                cnt_skipped += 1
             else:
                 file_data["state"] = "changed"
-
-            # Process changed files
-            if file_data["state"] == "changed":
                 file_data["checksum"] = checksum
-                loader_cls = file_types_loaders[ext]
-
-                try:
-                    loader = loader_cls(
-                        file_path,
-                        **(
-                            text_loader_kwargs
-                            if ext in ["txt", "csv", "html", "md"]
-                            else {}
-                        ),
-                    )
-                    documents = loader.load_and_split()
-
-                    # Enhanced metadata for better consolidation compatibility
-                    enhanced_metadata = {
-                        **metadata,
-                        "source_file": os.path.basename(file_path),
-                        "source_path": file_path,
-                        "file_type": ext,
-                        "knowledge_source": True,  # Flag to distinguish from conversation memories
-                        "import_timestamp": None,  # Will be set when inserted into memory
-                    }
-
-                    # Apply metadata to all documents
-                    for doc in documents:
-                        doc.metadata = {**doc.metadata, **enhanced_metadata}
-
-                    file_data["documents"] = documents
-                    cnt_files += 1
-                    cnt_docs += len(documents)
-
-                except Exception as e:
-                    PrintStyle(font_color="red").print(f"Error loading {file_path}: {e}")
-                    if log_item:
-                        log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {e}")
-                    continue
+                to_parse.append((file_path, ext))
+                cnt_bytes += stat.st_size
 
             # Update the index
             index[file_key] = file_data
@@ -193,18 +308,49 @@ def load_knowledge(
             PrintStyle(font_color="red").print(f"Error processing {file_path}: {e}")
             continue
 
+    # Process changed files
+    for (file_path, ext), (documents, error) in zip(
+        to_parse, _parse_files(to_parse, metadata, run)
+    ):
+        if error is not None or documents is None:
+            PrintStyle(font_color="red").print(f"Error loading {file_path}: {error}")
+            if log_item:
+                log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {error}")
+            # keep the previous version, force a retry on next import
+            index[file_path]["state"] = "original"
+            index[file_path]["checksum"] = ""
+            continue
+        index[file_path]["documents"] = documents
+        cnt_files += 1
+        cnt_docs += len(documents)
+
     # Mark removed files
     current_files = set(kn_files)
     for file_key, file_data in list(index.items()):
         if file_key not in current_files and not file_data.get("state"):
             index[file_key]["state"] = "removed"
 
+    # Throughput metrics
+    elapsed = time.time() - started
+    run.add_stats(
+        directories=1,
+        files_scanned=len(kn_files),
+        files_skipped=cnt_skipped,
+        files_parsed=cnt_files,
+        documents=cnt_docs,
+        bytes_parsed=cnt_bytes,
+        seconds=elapsed,
+    )
+
     # Log results
     if cnt_files > 0 or cnt_docs > 0:
-        PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
+        PrintStyle.standard(
+            f"Processed {cnt_docs} documents from {cnt_files} files in {elapsed:.1f}s "
+            f"({cnt_skipped} unchanged files skipped)."
+        )
         if log_item:
             log_item.stream(
-                progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files."
+                progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files in {elapsed:.1f}s."
             )
 
     return index
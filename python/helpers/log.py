@@ -1,5 +1,7 @@
 from dataclasses import dataclass, field
 import json
+import threading
+import time
 from typing import Any, Literal, Optional, Dict, TypeVar, TYPE_CHECKING
 
 T = TypeVar("T")
@@ -9,6 +11,7 @@ from python.helpers.strings import truncate_text_by_ratio
 import copy
 from typing import TypeVar
 from python.helpers.secrets import get_secrets_manager
+from python.helpers import push
 
 
 if TYPE_CHECKING:
@@ -41,6 +44,11 @@ RESPONSE_CONTENT_MAX_LEN: int = 250_000
 KEY_MAX_LEN: int = 60
 VALUE_MAX_LEN: int = 5000
 PROGRESS_MAX_LEN: int = 120
+# streamed updates of one item are applied at most once per interval (or when the item is read)
+STREAM_UPDATE_INTERVAL: float = 0.25
+
+# fields of LogItem.output() that are only sent to clients when changed
+OUTPUT_FIELDS = ("heading", "content", "temp", "kvps")
 
 
 def _truncate_heading(text: str | None) -> str:
@@ -131,6 +139,11 @@ class LogItem:
     kvps: Optional[OrderedDict] = None  # Use OrderedDict for kvps
     id: Optional[str] = None  # Add id field
     guid: str = ""
+    # output field -> log version of its last change
+    _versions: dict = field(default_factory=dict, init=False, repr=False)
+    # raw streamed update waiting to be applied
+    _pending: dict | None = field(default=None, init=False, repr=False)
+    _applied_at: float = field(default=0.0, init=False, repr=False)
 
     def __post_init__(self):
         self.guid = self.log.guid
@@ -157,12 +170,26 @@ class LogItem:
                 **kwargs,
             )
 
+    def update_throttled(
+        self,
+        heading: str | None = None,
+        content: str | None = None,
+        kvps: dict | None = None,
+        **kwargs,
+    ):
+        """Update for values replaced with every streamed chunk, masking and truncation are deferred until the item is read."""
+        if self.guid == self.log.guid:
+            self.log._stream_item(
+                self.no, heading=heading, content=content, kvps=kvps, **kwargs
+            )
+
     def stream(
         self,
         heading: str | None = None,
         content: str | None = None,
         **kwargs,
     ):
+        self.log._apply_pending(self)
         if heading is not None:
             self.update(heading=self.heading + heading)
         if content is not None:
@@ -172,8 +199,9 @@ class LogItem:
             prev = self.kvps.get(k, "") if self.kvps else ""
             self.update(**{k: prev + v})
 
-    def output(self):
-        return {
+    def output(self, since: int = 0):
+        self.log._apply_pending(self)
+        out = {
             "no": self.no,
             "id": self.id,  # Include id in output
             "type": self.type,
@@ -182,6 +210,12 @@ class LogItem:
             "temp": self.temp,
             "kvps": self.kvps,
         }
+        # leave out fields the client has already seen
+        if since:
+            for key in OUTPUT_FIELDS:
+                if self._versions.get(key, 0) <= since:
+                    del out[key]
+        return out
 
 
 class Log:
@@ -189,8 +223,12 @@ class Log:
     def __init__(self):
         self.context: "AgentContext|None" = None # set from outside
         self.guid: str = str(uuid.uuid4())
-        self.updates: list[int] = []
+        self.version: int = 0
+        # item no -> version of its last update, ordered by version
+        self.updates: OrderedDict[int, int] = OrderedDict()
         self.logs: list[LogItem] = []
+        self._streamed: set[int] = set()  # items with pending streamed updates
+        self._lock = threading.Lock()
         self.set_initial_progress()
 
     def log(
@@ -212,6 +250,7 @@ class Log:
             type=type,
         )
         self.logs.append(item)
+        self._touch(item, *OUTPUT_FIELDS)
 
         # and update it (to have just one implementation)
         self._update_item(
@@ -240,43 +279,135 @@ class Log:
         **kwargs,
     ):
         item = self.logs[no]
+        # streamed values are older than this update
+        self._apply_pending(item)
+
+        changed = self._apply(
+            item,
+            type=type,
+            heading=heading,
+            content=content,
+            kvps=kvps,
+            temp=temp,
+            update_progress=update_progress,
+            id=id,
+            **kwargs,
+        )
+        if changed:
+            self._touch(item, *changed)
+        self._update_progress_from_item(item)
 
-        if id is not None:
+    def _stream_item(
+        self,
+        no: int,
+        heading: str | None = None,
+        content: str | None = None,
+        kvps: dict | None = None,
+        **kwargs,
+    ):
+        item = self.logs[no]
+        with self._lock:
+            pending = item._pending
+            if pending is None:
+                pending = item._pending = {"kwargs": {}}
+                self._streamed.add(no)
+                # the version is bumped once, readers apply the pending values
+                self._touch(item)
+            if heading is not None:
+                pending["heading"] = heading
+            if content is not None:
+                pending["content"] = content
+            if kvps is not None:
+                pending["kvps"] = kvps
+                pending["kwargs"] = {}
+            pending["kwargs"].update(kwargs)
+            due = time.monotonic() - item._applied_at >= STREAM_UPDATE_INTERVAL
+        if due:
+            self._apply_pending(item)
+
+    def _apply_pending(self, item: LogItem):
+        if item._pending is None:
+            return
+        with self._lock:
+            pending, item._pending = item._pending, None
+            self._streamed.discard(item.no)
+            if pending is None:
+                return
+            version = self.updates.get(item.no, self.version)
+        kwargs = pending.pop("kwargs")
+        changed = self._apply(item, **pending, **kwargs)
+        item._applied_at = time.monotonic()
+        for key in changed:
+            item._versions[key] = version
+        self._update_progress_from_item(item)
+
+    def _apply(
+        self,
+        item: LogItem,
+        type: Type | None = None,
+        heading: str | None = None,
+        content: str | None = None,
+        kvps: dict | None = None,
+        temp: bool | None = None,
+        update_progress: ProgressUpdate | None = None,
+        id: Optional[str] = None,
+        **kwargs,
+    ) -> list[str]:
+        changed = []
+
+        if id is not None and id != item.id:
             item.id = id
+            changed.append("id")
 
-        if type is not None:
+        if type is not None and type != item.type:
             item.type = type
+            changed.append("type")
 
-        if temp is not None:
+        if temp is not None and temp != item.temp:
             item.temp = temp
+            changed.append("temp")
 
         if update_progress is not None:
             item.update_progress = update_progress
 
-
         # adjust all content before processing
         if heading is not None:
             heading = self._mask_recursive(heading)
             heading = _truncate_heading(heading)
-            item.heading = heading
+            if heading != item.heading:
+                item.heading = heading
+                changed.append("heading")
         if content is not None:
             content = self._mask_recursive(content)
             content = _truncate_content(content, item.type)
-            item.content = content
+            if content != item.content:
+                item.content = content
+                changed.append("content")
         if kvps is not None:
             kvps = OrderedDict(copy.deepcopy(kvps))
             kvps = self._mask_recursive(kvps)
             kvps = _truncate_value(kvps)
-            item.kvps = kvps
+            if kvps != item.kvps:
+                item.kvps = kvps
+                changed.append("kvps")
         elif item.kvps is None:
             item.kvps = OrderedDict()
         if kwargs:
             kwargs = copy.deepcopy(kwargs)
             kwargs = self._mask_recursive(kwargs)
-            item.kvps.update(kwargs)
+            if any(k not in item.kvps or item.kvps[k] != v for k, v in kwargs.items()):
+                item.kvps.update(kwargs)
+                changed.append("kvps")
 
-        self.updates += [item.no]
-        self._update_progress_from_item(item)
+        return changed
+
+    def _touch(self, item: LogItem, *keys: str):
+        self.version += 1
+        self.updates[item.no] = self.version
+        self.updates.move_to_end(item.no)
+        for key in keys:
+            item._versions[key] = self.version
+        push.notify()
 
     def set_progress(self, progress: str, no: int = 0, active: bool = True):
         progress = self._mask_recursive(progress)
@@ -290,26 +421,37 @@ class Log:
     def set_initial_progress(self):
         self.set_progress("Waiting for input", 0, False)
 
-    def output(self, start=None, end=None):
+    def output(self, start=None, end=None, changed_only: bool = False):
+        """Items updated after version start (up to end), with changed_only only their fields changed since start."""
         if start is None:
             start = 0
         if end is None:
-            end = len(self.updates)
+            end = self.version
 
+        self.flush()
         out = []
-        seen = set()
-        for update in self.updates[start:end]:
-            if update not in seen:
-                out.append(self.logs[update].output())
-                seen.add(update)
-
+        for no, version in reversed(self.updates.items()):
+            if version <= start:
+                break
+            if version <= end:
+                out.append(self.logs[no].output(since=start if changed_only else 0))
+        out.sort(key=lambda item: item["no"])
         return out
 
+    def flush(self):
+        """Apply all pending streamed updates."""
+        for no in list(self._streamed):
+            if no < len(self.logs):
+                self._apply_pending(self.logs[no])
+
     def reset(self):
         self.guid = str(uuid.uuid4())
-        self.updates = []
+        self.version = 0
+        self.updates = OrderedDict()
         self.logs = []
+        self._streamed = set()
         self.set_initial_progress()
+        push.notify()
 
     def _update_progress_from_item(self, item: LogItem):
         if item.heading and item.update_progress != "none":
@@ -332,14 +474,7 @@ class Log:
             # if self_id != current_id:
             #     print(f"Context ID mismatch: {self_id} != {current_id}")
 
-            if isinstance(obj, str):
-                return secrets_mgr.mask_values(obj)
-            elif isinstance(obj, dict):
-                return {k: self._mask_recursive(v) for k, v in obj.items()}  # type: ignore
-            elif isinstance(obj, list):
-                return [self._mask_recursive(item) for item in obj]  # type: ignore
-            else:
-                return obj
+            return secrets_mgr.mask_recursive(obj)
         except Exception as _e:
             # If masking fails, return original object
             return obj
\ No newline at end of file
@@ -17,6 +17,8 @@ from typing import (
 )
 import threading
 import asyncio
+import concurrent.futures
+import time
 from contextlib import AsyncExitStack
 from shutil import which
 from datetime import timedelta
@@ -31,7 +33,12 @@ from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 from mcp.client.streamable_http import streamablehttp_client
 from mcp.shared.message import SessionMessage
-from mcp.types import CallToolResult, ListToolsResult
+from mcp.types import (
+    CallToolResult,
+    ListToolsResult,
+    ServerNotification,
+    ToolListChangedNotification,
+)
 from anyio.streams.memory import (
     MemoryObjectReceiveStream,
     MemoryObjectSendStream,
@@ -43,6 +50,59 @@ from python.helpers.print_style import PrintStyle
 from python.helpers.tool import Tool, Response
 
 
+T = TypeVar("T")
+
+# increased whenever servers or their tools change, for caching tool prompts
+_tools_version = 0
+
+
+def get_tools_version() -> int:
+    return _tools_version
+
+
+def _tools_changed():
+    global _tools_version
+    _tools_version += 1
+
+
+# sessions idle for this many seconds, or after a failed request, are pinged before use
+SESSION_HEALTH_CHECK_INTERVAL = 30
+# cached tool lists are refreshed after this many seconds, or when the server notifies a change
+TOOLS_REFRESH_INTERVAL = 300
+# requests sent concurrently over one server session
+MAX_CONCURRENT_REQUESTS = 8
+
+# persistent sessions live on one event loop thread, agents call them from their own loops
+_session_loop: asyncio.AbstractEventLoop | None = None
+_session_loop_lock = threading.Lock()
+
+
+def _get_session_loop() -> asyncio.AbstractEventLoop:
+    global _session_loop
+    with _session_loop_lock:
+        if _session_loop is None:
+            _session_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_session_loop.run_forever, name="mcp-sessions", daemon=True
+            ).start()
+        return _session_loop
+
+
+def _submit_to_session_loop(coro: Awaitable[T]) -> concurrent.futures.Future[T]:
+    return asyncio.run_coroutine_threadsafe(coro, _get_session_loop())  # type: ignore
+
+
+async def _run_in_session_loop(coro: Awaitable[T]) -> T:
+    return await asyncio.wrap_future(_submit_to_session_loop(coro))
+
+
+def _unwrap_exception(e: BaseException) -> BaseException:
+    # anyio task groups wrap errors in exception groups
+    while excs := getattr(e, "exceptions", None):
+        e = excs[0]
+    return e
+
+
 def normalize_name(name: str) -> str:
     # Lowercase and strip whitespace
     name = name.strip().lower()
@@ -247,13 +307,23 @@ class MCPServerRemote(BaseModel):
         with self.__lock:
             return self.__client.has_tool(tool_name)  # type: ignore
 
+    def get_stats(self) -> dict[str, Any]:
+        with self.__lock:
+            return self.__client.get_stats()  # type: ignore
+
     async def call_tool(
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # not holding the lock while waiting, calls run concurrently over the session
+        return await client.call_tool(tool_name, input_data)  # type: ignore
+
+    def close(self):
+        """Close the persistent session of this server"""
+        with self.__lock:
+            self.__client.close()  # type: ignore
 
     def update(self, config: dict[str, Any]) -> "MCPServerRemote":
         with self.__lock:
@@ -280,6 +350,7 @@ class MCPServerRemote(BaseModel):
             return asyncio.run(self.__on_update())
 
     async def __on_update(self) -> "MCPServerRemote":
+        self.__client.close()  # type: ignore # reconnect with the new config
         await self.__client.update_tools()  # type: ignore
         return self
 
@@ -326,13 +397,23 @@ class MCPServerLocal(BaseModel):
         with self.__lock:
             return self.__client.has_tool(tool_name)  # type: ignore
 
+    def get_stats(self) -> dict[str, Any]:
+        with self.__lock:
+            return self.__client.get_stats()  # type: ignore
+
     async def call_tool(
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # not holding the lock while waiting, calls run concurrently over the session
+        return await client.call_tool(tool_name, input_data)  # type: ignore
+
+    def close(self):
+        """Close the persistent session of this server"""
+        with self.__lock:
+            self.__client.close()  # type: ignore
 
     def update(self, config: dict[str, Any]) -> "MCPServerLocal":
         with self.__lock:
@@ -357,6 +438,7 @@ class MCPServerLocal(BaseModel):
             return asyncio.run(self.__on_update())
 
     async def __on_update(self) -> "MCPServerLocal":
+        self.__client.close()  # type: ignore # reconnect with the new config
         await self.__client.update_tools()  # type: ignore
         return self
 
@@ -520,6 +602,9 @@ class MCPConfig(BaseModel):
         # If servers is a field like `servers: List[MCPServer] = Field(default_factory=list)`,
         # then super().__init__() might try to initialize it.
         # We are re-assigning self.servers later in this __init__.
+        # Close persistent sessions of the servers being replaced first.
+        for old_server in getattr(self, "__dict__", {}).get("servers", []):
+            old_server.close()
         super().__init__()
 
         # Clear any servers potentially initialized by super().__init__() before we populate based on servers_list
@@ -614,6 +699,7 @@ class MCPConfig(BaseModel):
                 self.disconnected_servers.append(
                     {"config": server_item, "error": error_msg, "name": server_name}
                 )
+        _tools_changed()
 
     def get_server_log(self, server_name: str) -> str:
         with self.__lock:
@@ -647,6 +733,7 @@ class MCPConfig(BaseModel):
                         "error": error,
                         "tool_count": tool_count,
                         "has_log": has_log,
+                        **server.get_stats(),
                     }
                 )
 
@@ -773,19 +860,20 @@ class MCPConfig(BaseModel):
             raise ValueError(f"Tool {tool_name} not found")
         server_name_part, tool_name_part = tool_name.split(".")
         with self.__lock:
+            found = None
             for server in self.servers:
                 if server.name == server_name_part and server.has_tool(tool_name_part):
-                    return await server.call_tool(tool_name_part, input_data)
+                    found = server
+                    break
+        if not found:
             raise ValueError(f"Tool {tool_name} not found")
-
-
-T = TypeVar("T")
+        return await found.call_tool(tool_name_part, input_data)
 
 
 class MCPClientBase(ABC):
     # server: Union[MCPServerLocal, MCPServerRemote] # Defined in __init__
     # tools: List[dict[str, Any]] # Defined in __init__
-    # No self.session, self.exit_stack, self.stdio, self.write as persistent instance fields
+    # The session is kept open between operations, owned by a task on the session loop
 
     __lock: ClassVar[threading.Lock] = threading.Lock()
 
@@ -795,6 +883,19 @@ class MCPClientBase(ABC):
         self.error: str = ""
         self.log: List[str] = []
         self.log_file: Optional[TextIO] = None
+        # persistent session, only used on the session loop
+        self._session: Optional[ClientSession] = None
+        self._session_task: Optional[asyncio.Task] = None
+        self._session_closing: Optional[asyncio.Event] = None
+        self._session_lock: Optional[asyncio.Lock] = None
+        self._requests: Optional[asyncio.Semaphore] = None
+        self._checked_at = 0.0
+        # tool list refresh
+        self._tools_updated_at = 0.0
+        self._tools_stale = False
+        self._tools_refreshing = False
+        # call statistics for get_servers_status
+        self.stats = {"calls": 0, "errors": 0, "latency": 0.0, "cpu": 0.0, "connects": 0}
 
     # Protected method
     @abstractmethod
@@ -813,83 +914,167 @@ class MCPClientBase(ABC):
         read_timeout_seconds=60,
     ) -> T:
         """
-        Manages the lifecycle of an MCP session for a single operation.
-        Creates a temporary session, executes coro_func with it, and ensures cleanup.
+        Executes coro_func with the persistent MCP session of this server.
+        Connects on first use and reconnects when the session is found broken.
         """
+        return await _run_in_session_loop(
+            self.__execute(coro_func, read_timeout_seconds)
+        )
+
+    async def __execute(
+        self,
+        coro_func: Callable[[ClientSession], Awaitable[T]],
+        read_timeout_seconds: int,
+    ) -> T:
         operation_name = coro_func.__name__  # For logging
-        # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Creating new session for operation '{operation_name}'...")
-        # Store the original exception outside the async block
-        original_exception = None
         try:
-            async with AsyncExitStack() as temp_stack:
-                try:
-
-                    stdio, write = await self._create_stdio_transport(temp_stack)
-                    # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name} - {operation_name}): Transport created. Initializing session...")
-                    session = await temp_stack.enter_async_context(
-                        ClientSession(
-                            stdio,  # type: ignore
-                            write,  # type: ignore
-                            read_timeout_seconds=timedelta(
-                                seconds=read_timeout_seconds
-                            ),
-                        )
-                    )
-                    await session.initialize()
-
-                    result = await coro_func(session)
-
-                    return result
-                except Exception as e:
-                    # Store the original exception and raise a dummy exception
-                    excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
-                    if excs:
-                        original_exception = excs[0]
-                    else:
-                        original_exception = e
-                    # Create a dummy exception to break out of the async block
-                    raise RuntimeError("Dummy exception to break out of async block")
+            session = await self.__get_session(read_timeout_seconds)
+            async with self._requests:  # type: ignore
+                return await coro_func(session)
         except Exception as e:
-            # Check if this is our dummy exception
-            if original_exception is not None:
-                e = original_exception
-            # We have the original exception stored
+            e = _unwrap_exception(e)  # type: ignore
+            # check the connection before the next operation
+            self._checked_at = 0.0
             PrintStyle(
                 background_color="#AA4455", font_color="white", padding=False
             ).print(
                 f"MCPClientBase ({self.server.name} - {operation_name}): Error during operation: {type(e).__name__}: {e}"
             )
-            raise e  # Re-raise the original exception
-        # finally:
-        #     PrintStyle(font_color="cyan").print(
-        #         f"MCPClientBase ({self.server.name} - {operation_name}): Session and transport will be closed by AsyncExitStack."
-        #     )
-        # This line should ideally be unreachable if the try/except/finally logic within the 'async with' is exhaustive.
-        # Adding it to satisfy linters that might not fully trace the raise/return paths through async context managers.
-        raise RuntimeError(
-            f"MCPClientBase ({self.server.name} - {operation_name}): _execute_with_session exited 'async with' block unexpectedly."
+            raise e
+
+    async def __get_session(self, read_timeout_seconds: int) -> ClientSession:
+        if self._session_lock is None:
+            self._session_lock = asyncio.Lock()
+            self._requests = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        async with self._session_lock:
+            now = time.monotonic()
+            if self._session and now - self._checked_at > SESSION_HEALTH_CHECK_INTERVAL:
+                try:
+                    await self._session.send_ping()
+                except Exception as e:
+                    PrintStyle(font_color="orange").print(
+                        f"MCPClientBase ({self.server.name}): Session lost, reconnecting: {type(_unwrap_exception(e)).__name__}"
+                    )
+                    await self.__close_session()
+            if self._session is None:
+                await self.__open_session(read_timeout_seconds)
+            self._checked_at = time.monotonic()
+            return self._session  # type: ignore
+
+    async def __open_session(self, read_timeout_seconds: int):
+        ready: asyncio.Future[ClientSession] = asyncio.get_running_loop().create_future()
+        closing = asyncio.Event()
+        task = asyncio.create_task(self.__run_session(ready, closing, read_timeout_seconds))
+        try:
+            self._session = await ready
+        except BaseException:
+            closing.set()
+            raise
+        self._session_task, self._session_closing = task, closing
+        self.stats["connects"] += 1
+
+    async def __run_session(
+        self,
+        ready: asyncio.Future[ClientSession],
+        closing: asyncio.Event,
+        read_timeout_seconds: int,
+    ):
+        # transports are entered and exited by this one task, as anyio requires
+        try:
+            async with AsyncExitStack() as stack:
+                stdio, write = await self._create_stdio_transport(stack)
+                session = await stack.enter_async_context(
+                    ClientSession(
+                        stdio,  # type: ignore
+                        write,  # type: ignore
+                        read_timeout_seconds=timedelta(seconds=read_timeout_seconds),
+                        message_handler=self.__on_message,
+                    )
+                )
+                await session.initialize()
+                ready.set_result(session)
+                await closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(_unwrap_exception(e))
+        finally:
+            if not ready.done():
+                ready.set_exception(ConnectionError("MCP session closed"))
+
+    async def __close_session(self):
+        task, closing = self._session_task, self._session_closing
+        self._session = self._session_task = self._session_closing = None
+        if task and closing:
+            closing.set()
+            await task
+
+    async def __on_message(self, message: Any):
+        # servers announce tool list changes, refresh the cached list in the background
+        if isinstance(message, ServerNotification) and isinstance(
+            message.root, ToolListChangedNotification
+        ):
+            self._tools_stale = True
+            self.__refresh_tools_if_due()
+
+    def __refresh_tools_if_due(self):
+        # only refreshes lists fetched before, failed servers are retried on config update
+        expired = (
+            self._tools_updated_at
+            and time.monotonic() - self._tools_updated_at > TOOLS_REFRESH_INTERVAL
         )
+        if (self._tools_stale or expired) and not self._tools_refreshing:
+            self._tools_refreshing = True
+            _submit_to_session_loop(self.__refresh_tools())
+
+    async def __refresh_tools(self):
+        try:
+            await self.update_tools()
+        finally:
+            self._tools_refreshing = False
+
+    def close(self):
+        """Close the persistent session, the next operation connects again."""
+        if self._session_task:
+            _submit_to_session_loop(self.__close_session())
+
+    def get_stats(self) -> dict[str, Any]:
+        calls = self.stats["calls"]
+        return {
+            "session": self._session is not None,
+            "connects": self.stats["connects"],
+            "calls": calls,
+            "call_errors": self.stats["errors"],
+            "avg_latency_ms": round(self.stats["latency"] / calls * 1000, 1) if calls else 0,
+            "avg_cpu_ms": round(self.stats["cpu"] / calls * 1000, 1) if calls else 0,
+        }
 
     async def update_tools(self) -> "MCPClientBase":
         # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Starting 'update_tools' operation...")
 
         async def list_tools_op(current_session: ClientSession):
+            self._tools_stale = False
             response: ListToolsResult = await current_session.list_tools()
+            tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.inputSchema,
+                }
+                for tool in response.tools
+            ]
             with self.__lock:
-                self.tools = [
-                    {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "input_schema": tool.inputSchema,
-                    }
-                    for tool in response.tools
-                ]
+                changed = tools != self.tools or self.error
+                self.tools = tools
+                self.error = ""
+                self._tools_updated_at = time.monotonic()
+            if changed:
+                _tools_changed()
             PrintStyle(font_color="green").print(
                 f"MCPClientBase ({self.server.name}): Tools updated. Found {len(self.tools)} tools."
             )
 
         try:
-            set = settings.get_settings()
+            set = settings.get_snapshot()
             await self._execute_with_session(
                 list_tools_op,
                 read_timeout_seconds=self.server.init_timeout
@@ -907,10 +1092,12 @@ class MCPClientBase(ABC):
             with self.__lock:
                 self.tools = []  # Ensure tools are cleared on failure
                 self.error = f"Failed to initialize. {error_text[:200]}{'...' if len(error_text) > 200 else ''}"  # store error from tools fetch
+            _tools_changed()
         return self
 
     def has_tool(self, tool_name: str) -> bool:
         """Check if a tool is available (uses cached tools)"""
+        self.__refresh_tools_if_due()
         with self.__lock:
             for tool in self.tools:
                 if tool["name"] == tool_name:
@@ -919,6 +1106,7 @@ class MCPClientBase(ABC):
 
     def get_tools(self) -> List[dict[str, Any]]:
         """Get all tools from the server (uses cached tools)"""
+        self.__refresh_tools_if_due()
         with self.__lock:
             return self.tools
 
@@ -943,13 +1131,23 @@ class MCPClientBase(ABC):
             )
 
         async def call_tool_op(current_session: ClientSession):
-            set = settings.get_settings()
+            set = settings.get_snapshot()
             # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Executing 'call_tool' for '{tool_name}' via MCP session...")
-            response: CallToolResult = await current_session.call_tool(
-                tool_name,
-                input_data,
-                read_timeout_seconds=timedelta(seconds=set["mcp_client_tool_timeout"]),
-            )
+            # cpu is the session loop's thread time, other calls running meanwhile included
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            try:
+                response: CallToolResult = await current_session.call_tool(
+                    tool_name,
+                    input_data,
+                    read_timeout_seconds=timedelta(seconds=set["mcp_client_tool_timeout"]),
+                )
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["calls"] += 1
+                self.stats["latency"] += time.perf_counter() - started
+                self.stats["cpu"] += time.thread_time() - started_cpu
             # PrintStyle(font_color="green").print(f"MCPClientBase ({self.server.name}): Tool '{tool_name}' call successful via session.")
             return response
 
@@ -1069,7 +1267,7 @@ class MCPClientRemote(MCPClientBase):
     ]:
         """Connect to an MCP server, init client and save stdio/write streams"""
         server: MCPServerRemote = cast(MCPServerRemote, self.server)
-        set = settings.get_settings()
+        set = settings.get_snapshot()
 
         # Use lower timeouts for faster failure detection
         init_timeout = min(server.init_timeout or set["mcp_client_init_timeout"], 5)
@@ -1,5 +1,8 @@
+import asyncio
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Any, List, Sequence
+from typing import Any, Awaitable, Callable, List, Sequence
 from langchain.storage import InMemoryByteStore, LocalFileStore
 from langchain.embeddings import CacheBackedEmbeddings
 from python.helpers import guids
@@ -18,7 +21,7 @@ from langchain_community.vectorstores.utils import (
 )
 from langchain_core.embeddings import Embeddings
 
-import os, json
+import os, json, pickle
 
 import numpy as np
 
@@ -26,6 +29,10 @@ from python.helpers.print_style import PrintStyle
 from . import files
 from langchain_core.documents import Document
 from python.helpers import knowledge_import
+from python.helpers.memory_wal import MemoryWal, decode_embedding, has_snapshot
+from python.helpers.memory_index import ANN_FILE, AnnManager, IndexConfig
+from python.helpers.metadata_index import MetadataFilter, MetadataIndexMixin
+from python.helpers.defer import DeferredTask
 from python.helpers.log import Log, LogItem
 from enum import Enum
 from agent import Agent, AgentContext
@@ -38,7 +45,21 @@ from simpleeval import simple_eval
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
 
-class MyFaiss(FAISS):
+class MyFaiss(MetadataIndexMixin, FAISS):
+    # optional approximate index kept in sync with the exact flat index
+    ann: AnnManager | None = None
+    _lock: threading.RLock | None = None
+    _lock_guard = threading.Lock()
+
+    @property
+    def lock(self) -> threading.RLock:
+        # chats on different event loops change and search the same index
+        if self._lock is None:
+            with MyFaiss._lock_guard:
+                if self._lock is None:
+                    self._lock = threading.RLock()
+        return self._lock
+
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -50,6 +71,83 @@ class MyFaiss(FAISS):
     def get_all_docs(self):
         return self.docstore._dict  # type: ignore
 
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._aembed_documents(texts)
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        with self.lock:
+            start = self.index.ntotal
+            ids = super().add_embeddings(text_embeddings, metadatas, ids, **kwargs)
+            self._ann_added(start, ids)
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        with self.lock:
+            start = self.index.ntotal
+            ids = super().add_texts(texts, metadatas, ids, **kwargs)
+            self._ann_added(start, ids)
+        return ids
+
+    async def aadd_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        # embed without holding the lock, then add like add_embeddings
+        texts = list(texts)
+        embeddings = await self._aembed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas, ids, **kwargs)
+
+    def delete(self, ids=None, **kwargs):
+        with self.lock:
+            result = super().delete(ids, **kwargs)
+            if self.ann and ids:
+                self.ann.on_delete(list(ids))
+        return result
+
+    def _ann_added(self, start: int, ids: list[str]):
+        if self.ann and ids:
+            self.ann.on_add(list(ids), self.index.reconstruct_n(start, len(ids)))
+
+    def similarity_search_with_score_by_vector(
+        self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs
+    ):
+        with self.lock:
+            return self._search_with_score_by_vector(
+                embedding, k, filter, fetch_k, **kwargs
+            )
+
+    def _search_with_score_by_vector(
+        self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs
+    ):
+        candidate_ids = kwargs.get("candidate_ids")
+        found = None
+        # small candidate sets are searched exactly, large ones through the ANN index
+        if self.ann and (
+            candidate_ids is None or len(candidate_ids) * 2 > self.index.ntotal
+        ):
+            vector = np.array([embedding], dtype=np.float32)
+            unfiltered = filter is None and candidate_ids is None
+            found = self.ann.search(vector, k if unfiltered else max(k * 2, fetch_k))
+        # no approximate index yet, exact search
+        if found is None:
+            return super().similarity_search_with_score_by_vector(
+                embedding, k, filter, fetch_k, **kwargs
+            )
+        candidates = set(candidate_ids) if candidate_ids is not None else None
+
+        filter_func = None
+        if filter is not None:
+            filter_func = (
+                filter if callable(filter) else self._create_filter_func(filter)
+            )
+        docs = []
+        for doc_id, score in found:
+            if candidates is not None and doc_id not in candidates:
+                continue
+            doc = self.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                continue
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, score))
+        return self.apply_score_threshold(docs, kwargs.get("score_threshold"))[:k]
+
 
 class Memory:
 
@@ -60,11 +158,16 @@ class Memory:
         INSTRUMENTS = "instruments"
 
     index: dict[str, "MyFaiss"] = {}
+    wal: dict[str, MemoryWal] = {}
+    # indexes being initialized, chats on other event loops wait for them
+    _initializing: dict[str, Future] = {}
+    _init_lock = threading.Lock()
 
     @staticmethod
     async def get(agent: Agent):
         memory_subdir = get_agent_memory_subdir(agent)
-        if Memory.index.get(memory_subdir) is None:
+
+        async def init():
             log_item = agent.context.log.log(
                 type="util",
                 heading=f"Initializing VectorDB in '/{memory_subdir}'",
@@ -82,12 +185,36 @@ class Memory:
             )
             if knowledge_subdirs:
                 await wrap.preload_knowledge(log_item, knowledge_subdirs, memory_subdir)
-            return wrap
-        else:
-            return Memory(
-                db=Memory.index[memory_subdir],
-                memory_subdir=memory_subdir,
-            )
+            return db
+
+        db = await Memory._get_or_initialize(memory_subdir, init)
+        return Memory(db=db, memory_subdir=memory_subdir)
+
+    @staticmethod
+    async def _get_or_initialize(
+        memory_subdir: str, init: Callable[[], Awaitable["MyFaiss"]]
+    ) -> "MyFaiss":
+        with Memory._init_lock:
+            db = Memory.index.get(memory_subdir)
+            if db is not None:
+                return db
+            future = Memory._initializing.get(memory_subdir)
+            initializing = future is None
+            if initializing:
+                future = Memory._initializing[memory_subdir] = Future()
+        if not initializing:
+            return await asyncio.wrap_future(future)  # type: ignore
+
+        try:
+            db = await init()
+            future.set_result(db)  # type: ignore
+            return db
+        except BaseException as e:
+            future.set_exception(e)  # type: ignore
+            raise
+        finally:
+            with Memory._init_lock:
+                Memory._initializing.pop(memory_subdir, None)
 
     @staticmethod
     async def get_by_subdir(
@@ -95,7 +222,7 @@ class Memory:
         log_item: LogItem | None = None,
         preload_knowledge: bool = True,
     ):
-        if not Memory.index.get(memory_subdir):
+        async def init():
             import initialize
 
             agent_config = initialize.initialize_agent()
@@ -116,7 +243,10 @@ class Memory:
                         log_item, knowledge_subdirs, memory_subdir
                     )
             Memory.index[memory_subdir] = db
-        return Memory(db=Memory.index[memory_subdir], memory_subdir=memory_subdir)
+            return db
+
+        db = await Memory._get_or_initialize(memory_subdir, init)
+        return Memory(db=db, memory_subdir=memory_subdir)
 
     @staticmethod
     async def reload(agent: Agent):
@@ -172,16 +302,30 @@ class Memory:
 
         created = False
 
+        # write-ahead log of changes made since the last snapshot
+        wal = MemoryWal(db_dir)
+        Memory.wal[memory_subdir] = wal
+
         # if db folder exists and is not empty:
-        if os.path.exists(db_dir) and files.exists(db_dir, "index.faiss"):
-            db = MyFaiss.load_local(
-                folder_path=db_dir,
-                embeddings=embedder,
-                allow_dangerous_deserialization=True,
-                distance_strategy=DistanceStrategy.COSINE,
-                # normalize_L2=True,
-                relevance_score_fn=Memory._cosine_normalizer,
-            )  # type: ignore
+        if wal.has_snapshot():
+            with wal.lock:
+                db = MyFaiss.load_local(
+                    folder_path=wal.snapshot_dir,
+                    embeddings=embedder,
+                    allow_dangerous_deserialization=True,
+                    distance_strategy=DistanceStrategy.COSINE,
+                    # normalize_L2=True,
+                    relevance_score_fn=Memory._cosine_normalizer,
+                )  # type: ignore
+                # saved approximate index, kept in sync by the replay below
+                db.ann = AnnManager(IndexConfig.load(db_dir))
+                db.ann.load(
+                    os.path.join(wal.snapshot_dir, ANN_FILE),
+                    wal.checkpoint,
+                    db.index.ntotal,
+                )
+                # apply changes logged after the snapshot
+                Memory._replay_wal(db, wal)
 
             # if there is a mismatch in embeddings used, re-index the whole DB
             emb_ok = False
@@ -202,7 +346,7 @@ class Memory:
 
         # DB not loaded, create one
         if not db:
-            index = faiss.IndexFlatIP(len(embedder.embed_query("example")))
+            index = faiss.IndexFlatIP(models.get_embedding_dimension(embeddings_model))
 
             db = MyFaiss(
                 embedding_function=embedder,
@@ -221,8 +365,9 @@ class Memory:
                     log_item.stream(progress="\nIndexing memories")
                 db.add_documents(documents=list(docs.values()), ids=list(docs.keys()))
 
-            # save DB
-            Memory._save_db_file(db, memory_subdir)
+            # save DB, full snapshot makes the log obsolete
+            seq, segments = wal.rotate()
+            wal.write_snapshot(seq, segments, Memory._snapshot_writer(db, seq))
             # save meta file
             meta_file_path = files.get_abs_path(db_dir, "embedding.json")
             files.write_file(
@@ -237,6 +382,11 @@ class Memory:
 
             created = True
 
+        # approximate index, built in the background once the store is large enough
+        if not db.ann:
+            db.ann = AnnManager(IndexConfig.load(db_dir))
+        Memory._build_index(db, wal)
+
         return db, created
 
     def __init__(
@@ -249,7 +399,8 @@ class Memory:
 
     async def preload_knowledge(
         self, log_item: LogItem | None, kn_dirs: list[str], memory_subdir: str
-    ):
+    ) -> dict[str, Any]:
+        """Import changed knowledge files, returns the import stats."""
         if log_item:
             log_item.update(heading="Preloading knowledge...")
 
@@ -268,20 +419,43 @@ class Memory:
             with open(index_path, "r") as f:
                 index = json.load(f)
 
-        # preload knowledge folders
-        index = self._preload_knowledge_folders(log_item, kn_dirs, index)
+        # preload knowledge folders, all parsed with one process pool
+        with knowledge_import.ImportRun() as run:
+            index = self._preload_knowledge_folders(log_item, kn_dirs, index, run)
+        if log_item:
+            log_item.update(knowledge_import=run.stats)
 
+        # collect all changes and commit them at once, embeddings are batched
+        remove_ids: list[str] = []
+        changed_files: list[str] = []
         for file in index:
             if index[file]["state"] in ["changed", "removed"] and index[file].get(
                 "ids", []
             ):  # for knowledge files that have been changed or removed and have IDs
-                await self.delete_documents_by_ids(
-                    index[file]["ids"]
-                )  # remove original version
+                remove_ids += index[file]["ids"]  # remove original version
             if index[file]["state"] == "changed":
-                index[file]["ids"] = await self.insert_documents(
-                    index[file]["documents"]
-                )  # insert new version
+                changed_files.append(file)
+
+        if remove_ids:
+            await self.delete_documents_by_ids(remove_ids)
+
+        new_docs = [doc for file in changed_files for doc in index[file]["documents"]]
+        if new_docs:
+            started = datetime.now()
+            new_ids = await self.insert_documents(new_docs)  # insert new versions
+            elapsed = (datetime.now() - started).total_seconds()
+            PrintStyle.standard(
+                f"Embedded {len(new_docs)} knowledge documents in {elapsed:.1f}s"
+            )
+            if log_item:
+                log_item.stream(
+                    progress=f"\nEmbedded {len(new_docs)} knowledge documents in {elapsed:.1f}s"
+                )
+            pos = 0
+            for file in changed_files:
+                count = len(index[file]["documents"])
+                index[file]["ids"] = new_ids[pos : pos + count]
+                pos += count
 
         # remove index where state="removed"
         index = {k: v for k, v in index.items() if v["state"] != "removed"}
@@ -294,12 +468,14 @@ class Memory:
                 del index[file]["state"]  # type: ignore
         with open(index_path, "w") as f:
             json.dump(index, f)
+        return run.stats
 
     def _preload_knowledge_folders(
         self,
         log_item: LogItem | None,
         kn_dirs: list[str],
         index: dict[str, knowledge_import.KnowledgeImport],
+        run: knowledge_import.ImportRun | None = None,
     ):
         # load knowledge folders, subfolders by area
         for kn_dir in kn_dirs:
@@ -311,6 +487,7 @@ class Memory:
                 {"area": Memory.Area.MAIN},
                 filename_pattern="*",
                 recursive=False,
+                run=run,
             )
             # subdirectories go to their folders
             for area in Memory.Area:
@@ -321,6 +498,7 @@ class Memory:
                     index,
                     {"area": area.value},
                     recursive=True,
+                    run=run,
                 )
 
         # load instruments descriptions
@@ -331,6 +509,7 @@ class Memory:
             {"area": Memory.Area.INSTRUMENTS.value},
             filename_pattern="**/*.md",
             recursive=True,
+            run=run,
         )
 
         return index
@@ -339,9 +518,18 @@ class Memory:
         return self.db.get_by_ids(id)[0]
 
     async def search_similarity_threshold(
-        self, query: str, limit: int, threshold: float, filter: str = ""
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        filter: str | MetadataFilter = "",
     ):
-        comparator = Memory._get_comparator(filter) if filter else None
+        with self.db.lock:
+            comparator, candidate_ids = self.db.resolve_filter(
+                filter, Memory._get_comparator
+            )
+        if candidate_ids is not None and not candidate_ids:
+            return []  # nothing matches the filter
 
         return await self.db.asearch(
             query,
@@ -349,10 +537,17 @@ class Memory:
             k=limit,
             score_threshold=threshold,
             filter=comparator,
+            candidate_ids=candidate_ids,
         )
 
+    async def search_by_metadata(
+        self, filter: str | MetadataFilter, limit: int = 0
+    ) -> list[Document]:
+        with self.db.lock:
+            return self.db.get_docs_by_filter(filter, Memory._get_comparator, limit)
+
     async def delete_documents_by_query(
-        self, query: str, threshold: float, filter: str = ""
+        self, query: str, threshold: float, filter: str | MetadataFilter = ""
     ):
         k = 100
         tot = 0
@@ -375,6 +570,7 @@ class Memory:
                 # if fnd["ids"]: self.db.delete(ids=fnd["ids"])
                 # tot += len(fnd["ids"])
                 await self.db.adelete(ids=document_ids)
+                self._get_wal().log_delete(document_ids)
                 tot += len(document_ids)
 
             # If fewer than K document IDs, break the loop
@@ -393,6 +589,7 @@ class Memory:
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
             await self.db.adelete(ids=rem_ids)
+            self._get_wal().log_delete(rem_ids)
 
         if rem_docs:
             self._save_db()  # persist
@@ -414,19 +611,51 @@ class Memory:
                 if not doc.metadata.get("area", ""):
                     doc.metadata["area"] = Memory.Area.MAIN.value
 
-            await self.db.aadd_documents(documents=docs, ids=ids)
+            await self._add_documents(docs, ids)
             self._save_db()  # persist
         return ids
 
     async def update_documents(self, docs: list[Document]):
         ids = [doc.metadata["id"] for doc in docs]
         await self.db.adelete(ids=ids)  # delete originals
-        ins = await self.db.aadd_documents(documents=docs, ids=ids)  # add updated
+        self._get_wal().log_delete(ids)
+        ins = await self._add_documents(docs, ids)  # add updated
         self._save_db()  # persist
         return ins
 
+    async def _add_documents(self, docs: list[Document], ids: list[str]):
+        # embed here so the vectors can be logged and replayed without the model
+        texts = [doc.page_content for doc in docs]
+        metadatas = [doc.metadata for doc in docs]
+        embeddings = await self.db.aembed_documents(texts)
+        added = self.db.add_embeddings(
+            zip(texts, embeddings), metadatas=metadatas, ids=ids
+        )
+        self._get_wal().log_add(ids, texts, metadatas, embeddings)
+        return added
+
+    def _get_wal(self) -> MemoryWal:
+        if self.memory_subdir not in Memory.wal:
+            Memory.wal[self.memory_subdir] = MemoryWal(abs_db_dir(self.memory_subdir))
+        return Memory.wal[self.memory_subdir]
+
     def _save_db(self):
-        Memory._save_db_file(self.db, self.memory_subdir)
+        # changes are already in the write-ahead log, only compact it from time to time
+        wal = self._get_wal()
+        if wal.should_compact():
+            Memory._compact_db(self.db, wal)
+        Memory._build_index(self.db, wal)
+
+    def get_index_info(self) -> dict:
+        return {
+            "size": self.db.index.ntotal,
+            **(self.db.ann.info() if self.db.ann else {}),
+        }
+
+    def set_index_config(self, config: IndexConfig):
+        config.save(abs_db_dir(self.memory_subdir))
+        self.db.ann = AnnManager(config)
+        Memory._build_index(self.db, self._get_wal())
 
     def _generate_doc_id(self):
         while True:
@@ -435,9 +664,99 @@ class Memory:
                 return doc_id
 
     @staticmethod
-    def _save_db_file(db: MyFaiss, memory_subdir: str):
-        abs_dir = abs_db_dir(memory_subdir)
-        db.save_local(folder_path=abs_dir)
+    def _replay_wal(db: MyFaiss, wal: MemoryWal):
+        for entry in wal.entries():
+            if entry["op"] == "add":
+                if db.get_by_ids(entry["id"]):
+                    continue  # already in snapshot
+                db.add_embeddings(
+                    [(entry["text"], decode_embedding(entry["embedding"]))],
+                    metadatas=[entry["metadata"]],
+                    ids=[entry["id"]],
+                )
+            elif entry["op"] == "delete":
+                ids = [doc.metadata["id"] for doc in db.get_by_ids(entry["ids"])]
+                if ids:
+                    db.delete(ids=ids)
+
+    @staticmethod
+    def _build_index(db: MyFaiss, wal: MemoryWal):
+        ann = db.ann
+        if not ann or not ann.should_build(db.index.ntotal):
+            return
+        # copy vectors synchronously, train and fill the ANN index off the event loop
+        with db.lock:
+            doc_ids, vectors = ann.snapshot(db.index, db.index_to_docstore_id)
+
+        def exact_search(queries: np.ndarray, k: int) -> list[list[str]]:
+            # recall is measured against the live flat index
+            with db.lock:
+                _, positions = db.index.search(queries, k)  # type: ignore
+                return [
+                    [db.index_to_docstore_id[p] for p in row.tolist() if p != -1]
+                    for row in positions
+                ]
+
+        async def build():
+            try:
+                ann.build(doc_ids, vectors, exact_search)
+                Memory._save_ann(ann, wal)
+            except Exception as e:
+                PrintStyle.error(f"Memory index build failed: {e}")
+
+        DeferredTask(thread_name="MemoryIndex").start_task(build)
+
+    @staticmethod
+    def _save_ann(ann: AnnManager, wal: MemoryWal):
+        # the log is written after the index changes, so every op up to seq is included
+        with ann.lock:
+            data = ann.dump()
+            seq = wal.seq
+        if data is None:
+            return
+
+        def write(path: str):
+            with open(path, "wb") as f:
+                pickle.dump({**data, "seq": seq}, f)
+
+        wal.write_snapshot_file(ANN_FILE, seq, write)
+
+    @staticmethod
+    def _compact_db(db: MyFaiss, wal: MemoryWal):
+        # copy the current state synchronously so the db can keep changing meanwhile
+        with db.lock:
+            seq, segments = wal.rotate()
+            write = Memory._snapshot_writer(db, seq)
+        wal.compacting = True
+
+        async def write_snapshot():
+            try:
+                wal.write_snapshot(seq, segments, write)
+            except Exception as e:
+                PrintStyle.error(f"Memory compaction failed: {e}")
+            finally:
+                wal.compacting = False
+
+        DeferredTask(thread_name="MemoryCompaction").start_task(write_snapshot)
+
+    @staticmethod
+    def _snapshot_writer(db: MyFaiss, seq: int) -> Callable[[str], None]:
+        # same files as FAISS.save_local plus the ANN index, from a copy of the current state
+        with db.lock:
+            index_data = faiss.serialize_index(db.index)
+            docstore = InMemoryDocstore(dict(db.get_all_docs()))
+            index_to_docstore_id = dict(db.index_to_docstore_id)
+            ann_data = db.ann.dump() if db.ann else None
+
+        def write(folder: str):
+            index_data.tofile(os.path.join(folder, "index.faiss"))
+            with open(os.path.join(folder, "index.pkl"), "wb") as f:
+                pickle.dump((docstore, index_to_docstore_id), f)
+            if ann_data is not None:
+                with open(os.path.join(folder, ANN_FILE), "wb") as f:
+                    pickle.dump({**ann_data, "seq": seq}, f)
+
+        return write
 
     @staticmethod
     def _get_comparator(condition: str):
@@ -490,6 +809,7 @@ def get_custom_knowledge_subdir_abs(agent: Agent) -> str:
 def reload():
     # clear the memory index, this will force all DBs to reload
     Memory.index = {}
+    Memory.wal = {}
 
 
 def abs_db_dir(memory_subdir: str) -> str:
@@ -550,9 +870,7 @@ def get_existing_memory_subdirs() -> list[str]:
 
         project_subdirs = files.get_subdirectories(get_projects_parent_folder())
         for project_subdir in project_subdirs:
-            if files.exists(
-                get_project_meta_folder(project_subdir), "memory", "index.faiss"
-            ):
+            if has_snapshot(get_project_meta_folder(project_subdir, "memory")):
                 subdirs.append(f"projects/{project_subdir}")
 
         # Ensure 'default' is always available
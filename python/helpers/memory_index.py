@@ -0,0 +1,348 @@
+import json
+import math
+import os
+import pickle
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import Callable
+
+import numpy as np
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from python.helpers import faiss_monkey_patch
+import faiss
+
+from python.helpers.print_style import PrintStyle
+
+INDEX_CONFIG_FILE = "index.json"
+# ANN index saved next to index.faiss in the snapshot folder
+ANN_FILE = "index.ann"
+
+# exact top-k docstore ids for a batch of query vectors
+ExactSearch = Callable[[np.ndarray, int], list[list[str]]]
+
+
+@dataclass
+class IndexConfig:
+    """Per memory subdir index configuration, stored in index.json next to the DB.
+
+    type: "flat" (exact only), "ivf", "hnsw" or "auto" (flat until promote_at
+    vectors, then hnsw).
+    """
+
+    type: str = "auto"
+    promote_at: int = 20000
+    # IVF-Flat
+    nlist: int = 0  # 0 = derive from size
+    nprobe: int = 16
+    # HNSW
+    hnsw_m: int = 32
+    ef_construction: int = 80
+    ef_search: int = 64
+    # rebuild once this share of the ANN index is deleted entries
+    rebuild_deleted_ratio: float = 0.2
+    # recall measurement after each build
+    recall_sample: int = 100
+    recall_k: int = 10
+
+    @staticmethod
+    def load(db_dir: str) -> "IndexConfig":
+        path = os.path.join(db_dir, INDEX_CONFIG_FILE)
+        if not os.path.exists(path):
+            return IndexConfig()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (ValueError, OSError) as e:
+            PrintStyle.error(f"Invalid memory index config '{path}': {e}")
+            return IndexConfig()
+        known = {f.name for f in fields(IndexConfig)}
+        return IndexConfig(**{k: v for k, v in data.items() if k in known})
+
+    def save(self, db_dir: str):
+        path = os.path.join(db_dir, INDEX_CONFIG_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    def target_type(self, size: int) -> str:
+        if self.type == "auto":
+            return "hnsw" if size >= self.promote_at else "flat"
+        return self.type
+
+
+@dataclass
+class AnnIndex:
+    """Approximate index built next to the exact flat index.
+
+    Vectors get stable labels so the exact index can keep compacting positions
+    on delete; deletes only drop the label here and are cleaned up by rebuild.
+    """
+
+    type: str
+    index: "faiss.Index"
+    labels: dict[int, str] = field(default_factory=dict)  # label -> docstore id
+    by_doc: dict[str, int] = field(default_factory=dict)  # docstore id -> label
+    next_label: int = 0
+    deleted: int = 0
+    recall: float | None = None
+    build_time: float = 0.0
+
+    def add(self, doc_ids: list[str], vectors: np.ndarray):
+        # re-added ids (updates, log replay) must not keep their old label
+        self.remove(doc_ids)
+        labels = np.arange(self.next_label, self.next_label + len(doc_ids), dtype=np.int64)
+        self.next_label += len(doc_ids)
+        self.index.add_with_ids(vectors, labels)  # type: ignore
+        for label, doc_id in zip(labels.tolist(), doc_ids):
+            self.labels[label] = doc_id
+            self.by_doc[doc_id] = label
+
+    def remove(self, doc_ids: list[str]):
+        for doc_id in doc_ids:
+            label = self.by_doc.pop(doc_id, None)
+            if label is not None:
+                del self.labels[label]
+                self.deleted += 1
+
+    def search(self, vector: np.ndarray, k: int) -> list[tuple[str, float]]:
+        # over-fetch to make up for deleted entries still in the index
+        total = self.index.ntotal
+        fetch = min(total, k + int(k * self.deleted / max(1, total)) + k)
+        if fetch <= 0:
+            return []
+        scores, labels = self.index.search(vector, fetch)  # type: ignore
+        result = []
+        for score, label in zip(scores[0].tolist(), labels[0].tolist()):
+            doc_id = self.labels.get(label)
+            if doc_id is not None:
+                result.append((doc_id, score))
+        return result
+
+    def needs_rebuild(self, config: IndexConfig) -> bool:
+        total = self.index.ntotal
+        return total > 0 and self.deleted / total > config.rebuild_deleted_ratio
+
+    def dump(self) -> dict:
+        return {
+            "type": self.type,
+            "index": faiss.serialize_index(self.index),
+            "labels": dict(self.labels),
+            "next_label": self.next_label,
+            "deleted": self.deleted,
+            "recall": self.recall,
+            "build_time": self.build_time,
+        }
+
+    @staticmethod
+    def restore(data: dict) -> "AnnIndex":
+        labels = data["labels"]
+        return AnnIndex(
+            type=data["type"],
+            index=faiss.deserialize_index(data["index"]),
+            labels=labels,
+            by_doc={doc_id: label for label, doc_id in labels.items()},
+            next_label=data["next_label"],
+            deleted=data["deleted"],
+            recall=data["recall"],
+            build_time=data["build_time"],
+        )
+
+    def info(self) -> dict:
+        return {
+            "type": self.type,
+            "size": len(self.labels),
+            "deleted": self.deleted,
+            "recall": self.recall,
+            "build_time": self.build_time,
+        }
+
+
+def build_ann_index(
+    index_type: str, config: IndexConfig, doc_ids: list[str], vectors: np.ndarray
+) -> AnnIndex:
+    start = time.time()
+    dim = vectors.shape[1]
+    if index_type == "ivf":
+        nlist = config.nlist or max(1, min(65536, int(4 * math.sqrt(len(doc_ids)))))
+        # faiss needs at least nlist training points
+        nlist = max(1, min(nlist, len(doc_ids)))
+        quantizer = faiss.IndexFlatIP(dim)
+        base = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        train = vectors
+        if len(vectors) > nlist * 256:
+            sample = np.random.default_rng(0).choice(
+                len(vectors), nlist * 256, replace=False
+            )
+            train = vectors[sample]
+        base.train(train)  # type: ignore
+        base.nprobe = config.nprobe
+        index = faiss.IndexIDMap2(base)
+    elif index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = config.ef_construction
+        base.hnsw.efSearch = config.ef_search
+        index = faiss.IndexIDMap2(base)
+    else:
+        raise ValueError(f"Unknown ANN index type: {index_type}")
+
+    ann = AnnIndex(type=index_type, index=index)
+    if doc_ids:
+        ann.add(doc_ids, vectors)
+    ann.build_time = time.time() - start
+    return ann
+
+
+def measure_recall(
+    search: Callable[[np.ndarray, int], list[tuple[str, float]]],
+    exact_search: ExactSearch,
+    doc_ids: list[str],
+    vectors: np.ndarray,
+    config: IndexConfig,
+) -> float | None:
+    """Recall@k of the ANN index against exact search on the flat index.
+
+    Sampled stored vectors are the queries, each one held out of its own results
+    so it can't count as a trivial hit.
+    """
+    total = len(doc_ids)
+    if total < 2:
+        return None
+    k = min(config.recall_k, total - 1)
+    sample = np.random.default_rng().choice(
+        total, min(config.recall_sample, total), replace=False
+    )
+    queries = vectors[sample]
+    hits = 0
+    expected = 0
+    for position, query, exact_ids in zip(
+        sample.tolist(), queries, exact_search(queries, k + 1)
+    ):
+        own = doc_ids[position]
+        truth = [doc_id for doc_id in exact_ids if doc_id != own][:k]
+        found = [doc_id for doc_id, _ in search(query.reshape(1, -1), k + 1)]
+        found = [doc_id for doc_id in found if doc_id != own][:k]
+        hits += len(set(truth) & set(found))
+        expected += len(truth)
+    return hits / expected if expected else None
+
+
+class AnnManager:
+    """Keeps an AnnIndex in sync with a flat FAISS index and rebuilds it in the background."""
+
+    def __init__(self, config: IndexConfig | None = None):
+        self.config = config or IndexConfig()
+        self.ann: AnnIndex | None = None
+        self.lock = threading.RLock()
+        self.building = False
+        # changes made while a build is running, applied when it is swapped in
+        self.pending: list[tuple[str, list[str], np.ndarray | None]] = []
+
+    def on_add(self, doc_ids: list[str], vectors: np.ndarray):
+        with self.lock:
+            if self.building:
+                self.pending.append(("add", doc_ids, vectors))
+            if self.ann:
+                self.ann.add(doc_ids, vectors)
+
+    def on_delete(self, doc_ids: list[str]):
+        with self.lock:
+            if self.building:
+                self.pending.append(("delete", doc_ids, None))
+            if self.ann:
+                self.ann.remove(doc_ids)
+
+    def search(self, vector: np.ndarray, k: int) -> list[tuple[str, float]] | None:
+        with self.lock:
+            if not self.ann:
+                return None
+            return self.ann.search(vector, k)
+
+    def dump(self) -> dict | None:
+        with self.lock:
+            return self.ann.dump() if self.ann else None
+
+    def load(self, path: str, checkpoint: int, size: int):
+        """Restore a saved ANN index unless it is older than the flat snapshot
+        (log entries it is missing are gone) or no longer the configured type."""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            PrintStyle.error(f"Invalid memory index '{path}': {e}")
+            return
+        if data["seq"] < checkpoint or data["type"] != self.config.target_type(size):
+            return
+        with self.lock:
+            self.ann = AnnIndex.restore(data)
+
+    def should_build(self, size: int) -> bool:
+        if self.building:
+            return False
+        target = self.config.target_type(size)
+        if target == "flat":
+            return False
+        if not self.ann or self.ann.type != target:
+            return True
+        return self.ann.needs_rebuild(self.config)
+
+    def snapshot(self, exact: "faiss.Index", index_to_docstore_id: dict[int, str]):
+        """Copy the data for a build, must be called while the flat index is not changing."""
+        with self.lock:
+            self.building = True
+            self.pending = []
+            total = exact.ntotal
+            vectors = (
+                exact.reconstruct_n(0, total).astype(np.float32)
+                if total
+                else np.zeros((0, exact.d), dtype=np.float32)
+            )
+            doc_ids = [index_to_docstore_id[i] for i in range(total)]
+            return doc_ids, vectors
+
+    def build(
+        self,
+        doc_ids: list[str],
+        vectors: np.ndarray,
+        exact_search: ExactSearch | None = None,
+    ):
+        """Build a new ANN index from a snapshot, thread safe, swaps it in when done."""
+        try:
+            index_type = self.config.target_type(len(doc_ids))
+            if index_type == "flat":
+                with self.lock:
+                    self.ann = None
+                return
+            ann = build_ann_index(index_type, self.config, doc_ids, vectors)
+            with self.lock:
+                for op, ids, op_vectors in self.pending:
+                    if op == "add" and op_vectors is not None:
+                        ann.add(ids, op_vectors)
+                    elif op == "delete":
+                        ann.remove(ids)
+                self.pending = []
+                self.ann = ann
+            if exact_search:
+                try:
+                    ann.recall = measure_recall(
+                        self.search, exact_search, doc_ids, vectors, self.config  # type: ignore
+                    )
+                except Exception as e:
+                    PrintStyle.error(f"Memory index recall check failed: {e}")
+            PrintStyle.standard(
+                f"Memory index built: {index_type}, {len(ann.labels)} vectors in "
+                f"{ann.build_time:.2f}s, recall@{self.config.recall_k}: {ann.recall}"
+            )
+        finally:
+            with self.lock:
+                self.building = False
+
+    def info(self) -> dict:
+        with self.lock:
+            return {
+                "config": asdict(self.config),
+                "building": self.building,
+                "ann": self.ann.info() if self.ann else None,
+            }
@@ -0,0 +1,270 @@
+import base64
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+# write-ahead log of memory changes, replayed on top of the last FAISS snapshot
+WAL_FILE = "memory.wal"
+WAL_SEGMENT_PATTERN = "memory.wal.*"
+CHECKPOINT_FILE = "memory.wal.json"
+# each snapshot is written to its own generation folder, the checkpoint points to it
+SNAPSHOT_PREFIX = "snapshot."
+SNAPSHOT_FILES = ("index.faiss", "index.pkl", "index.ann")  # index.ann is optional
+
+# compact the log into the snapshot after this many logged operations
+COMPACT_AFTER_OPS = 500
+# fsync every append so a logged change survives power loss, not only a crash
+# of the process; off trades that for faster writes on slow disks
+FSYNC_APPEND = True
+
+
+class MemoryWal:
+    """Append-only log of add/delete operations for one memory subdir.
+
+    Every operation gets an increasing sequence number. A snapshot (index.faiss +
+    index.pkl) is written to a new generation folder; the checkpoint file names
+    that folder and the sequence it includes, so on load only newer operations
+    are replayed. Snapshots written before generations existed live in db_dir.
+    """
+
+    _locks: dict[str, threading.RLock] = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, db_dir: str):
+        self.db_dir = db_dir
+        self.path = os.path.join(db_dir, WAL_FILE)
+        self.checkpoint, self.generation = _read_checkpoint(db_dir)
+        self.seq = self.checkpoint
+        self.pending = 0  # ops logged since last compaction
+        self.compacting = False
+        for entry in self._read_entries(skip_checkpoint=False):
+            self.seq = max(self.seq, entry.get("seq", 0))
+            if entry.get("seq", 0) > self.checkpoint:
+                self.pending += 1
+
+    @property
+    def lock(self) -> threading.RLock:
+        # one lock per directory, shared by all instances, guards snapshot files
+        with MemoryWal._locks_lock:
+            if self.db_dir not in MemoryWal._locks:
+                MemoryWal._locks[self.db_dir] = threading.RLock()
+            return MemoryWal._locks[self.db_dir]
+
+    @property
+    def snapshot_dir(self) -> str:
+        return _snapshot_dir(self.db_dir, self.generation)
+
+    def has_snapshot(self) -> bool:
+        return os.path.exists(os.path.join(self.snapshot_dir, SNAPSHOT_FILES[0]))
+
+    def log_add(
+        self, ids: list[str], texts: list[str], metadatas: list[dict], embeddings: list
+    ):
+        entries = []
+        for id, text, metadata, embedding in zip(ids, texts, metadatas, embeddings):
+            entries.append(
+                {
+                    "op": "add",
+                    "id": id,
+                    "text": text,
+                    "metadata": metadata,
+                    "embedding": encode_embedding(embedding),
+                }
+            )
+        self._append(entries)
+
+    def log_delete(self, ids: list[str]):
+        if ids:
+            self._append([{"op": "delete", "ids": list(ids)}])
+
+    def entries(self) -> Iterator[dict[str, Any]]:
+        return self._read_entries(skip_checkpoint=True)
+
+    def should_compact(self) -> bool:
+        return not self.compacting and self.pending >= COMPACT_AFTER_OPS
+
+    def rotate(self) -> tuple[int, list[str]]:
+        """Close the current log so new operations go to a fresh file.
+        Returns the sequence covered by the rotated segments and their paths."""
+        with self.lock:
+            if os.path.exists(self.path):
+                os.replace(self.path, self.path + f".{self.seq:012d}")
+            self.pending = 0
+            return self.seq, self._segments()
+
+    def write_snapshot(
+        self, seq: int, segments: list[str], write: Callable[[str], None]
+    ):
+        """Write a snapshot containing all operations up to seq, then drop covered segments.
+
+        write(folder) saves the snapshot files into folder. They are fsynced and the
+        folder is renamed into place before the checkpoint is switched to it, so a
+        crash at any point leaves either the old or the new snapshot with its log.
+        """
+        generation = self.generation + 1
+        target = os.path.join(self.db_dir, _generation_name(generation))
+        tmp = target + ".tmp"
+        for path in (tmp, target):  # leftovers of an interrupted write
+            shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(tmp)
+        write(tmp)
+        for name in os.listdir(tmp):
+            _fsync_file(os.path.join(tmp, name))
+        _fsync_dir(tmp)
+        with self.lock:
+            os.replace(tmp, target)
+            _fsync_dir(self.db_dir)
+            self._write_checkpoint(seq, generation)
+            for segment in segments:
+                if os.path.exists(segment):
+                    os.remove(segment)
+            self._remove_old_snapshots()
+
+    def write_snapshot_file(
+        self, name: str, seq: int, write: Callable[[str], None]
+    ) -> bool:
+        """Add or replace one file of the current snapshot with data up to seq.
+
+        write(path) saves the file. Skipped if a newer snapshot already covers seq.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.db_dir, prefix=name + ".")
+        os.close(fd)
+        try:
+            write(tmp)
+            _fsync_file(tmp)
+            with self.lock:
+                if seq < self.checkpoint:
+                    return False
+                os.replace(tmp, os.path.join(self.snapshot_dir, name))
+                _fsync_dir(self.snapshot_dir)
+                return True
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _remove_old_snapshots(self):
+        current = _generation_name(self.generation)
+        for path in glob.glob(os.path.join(self.db_dir, SNAPSHOT_PREFIX + "*")):
+            if os.path.basename(path) != current:
+                shutil.rmtree(path, ignore_errors=True)
+        for name in SNAPSHOT_FILES:  # snapshot from before generations
+            path = os.path.join(self.db_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _append(self, entries: list[dict]):
+        # chats on different event loops may append at the same time
+        with self.lock:
+            lines = []
+            for entry in entries:
+                self.seq += 1
+                entry["seq"] = self.seq
+                lines.append(json.dumps(entry, ensure_ascii=False, default=str))
+            created = not os.path.exists(self.path)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                if FSYNC_APPEND:
+                    os.fsync(f.fileno())
+            if created and FSYNC_APPEND:
+                _fsync_dir(self.db_dir)
+            self.pending += len(entries)
+
+    def _segments(self) -> list[str]:
+        return sorted(
+            p
+            for p in glob.glob(os.path.join(self.db_dir, WAL_SEGMENT_PATTERN))
+            if p.rsplit(".", 1)[-1].isdigit()
+        )
+
+    def _read_entries(self, skip_checkpoint: bool) -> Iterator[dict[str, Any]]:
+        paths = self._segments()
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # torn write at the end of the log, ignore the rest
+                        break
+                    if skip_checkpoint and entry.get("seq", 0) <= self.checkpoint:
+                        continue
+                    yield entry
+
+    def _write_checkpoint(self, seq: int, generation: int):
+        path = os.path.join(self.db_dir, CHECKPOINT_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.db_dir)
+        self.checkpoint = seq
+        self.generation = generation
+
+
+def has_snapshot(db_dir: str) -> bool:
+    _seq, generation = _read_checkpoint(db_dir)
+    return os.path.exists(
+        os.path.join(_snapshot_dir(db_dir, generation), SNAPSHOT_FILES[0])
+    )
+
+
+def _read_checkpoint(db_dir: str) -> tuple[int, int]:
+    path = os.path.join(db_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return 0, 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return int(data.get("seq", 0)), int(data.get("generation", 0))
+    except (ValueError, OSError):
+        return 0, 0
+
+
+def _snapshot_dir(db_dir: str, generation: int) -> str:
+    if generation:
+        return os.path.join(db_dir, _generation_name(generation))
+    return db_dir
+
+
+def _generation_name(generation: int) -> str:
+    return f"{SNAPSHOT_PREFIX}{generation:06d}"
+
+
+def _fsync_file(path: str):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: str):
+    # directories can't be opened for fsync on windows, renames are durable there
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def encode_embedding(embedding) -> str:
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode(
+        "ascii"
+    )
+
+
+def decode_embedding(data: str) -> list[float]:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).tolist()
@@ -3,14 +3,15 @@
 import json
 
 
-def truncate_text(agent, output, threshold=1000):
+def truncate_text(agent, output, threshold=1000, omitted=0):
+    # omitted: characters already dropped from the middle of output
     threshold = int(threshold)
-    if not threshold or len(output) <= threshold:
+    if not threshold or len(output) + omitted <= threshold:
         return output
 
     # Adjust the file path as needed
     placeholder = agent.read_prompt(
-        "fw.msg_truncated.md", length=(len(output) - threshold)
+        "fw.msg_truncated.md", length=(len(output) + omitted - threshold)
     )
     # placeholder = files.read_file("./prompts/default/fw.msg_truncated.md", length=(len(output) - threshold))
 
@@ -0,0 +1,291 @@
+import ast
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from python.helpers import faiss_monkey_patch
+import faiss
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+# metadata fields with an inverted index
+INDEXED_FIELDS = ("area", "document_uri", "knowledge_source", "source_file")
+
+# structured filter: {field: value or list of accepted values}, fields are AND-ed
+MetadataFilter = dict[str, Any]
+Comparator = Callable[[dict[str, Any]], bool]
+
+
+def normalize_filter(filter: MetadataFilter) -> dict[str, list]:
+    return {
+        field: list(value) if isinstance(value, (list, tuple, set)) else [value]
+        for field, value in filter.items()
+    }
+
+
+def match_filter(metadata: dict[str, Any], filter: dict[str, list]) -> bool:
+    for field, values in filter.items():
+        if field not in metadata or metadata[field] not in values:
+            return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def _parse_filter_cached(condition: str) -> tuple | None:
+    try:
+        node = ast.parse(condition.strip(), mode="eval").body
+    except SyntaxError:
+        return None
+    parsed = _parse_node(node)
+    return tuple((k, tuple(v)) for k, v in parsed.items()) if parsed else None
+
+
+def parse_filter(condition: str) -> dict[str, list] | None:
+    """Translate simple string conditions like "area == 'main' or area == 'fragments'"
+    into a structured filter. Returns None for anything that needs full evaluation."""
+    parsed = _parse_filter_cached(condition)
+    return {k: list(v) for k, v in parsed} if parsed else None
+
+
+def _parse_node(node: ast.AST) -> dict[str, list] | None:
+    if isinstance(node, ast.Compare):
+        if len(node.ops) != 1 or not isinstance(node.left, ast.Name):
+            return None
+        op, right = node.ops[0], node.comparators[0]
+        if isinstance(op, ast.Eq) and isinstance(right, ast.Constant):
+            return {node.left.id: [right.value]}
+        if (
+            isinstance(op, ast.In)
+            and isinstance(right, (ast.List, ast.Tuple, ast.Set))
+            and all(isinstance(e, ast.Constant) for e in right.elts)
+        ):
+            return {node.left.id: [e.value for e in right.elts]}  # type: ignore
+        return None
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_parse_node(value) for value in node.values]
+        if any(part is None for part in parts):
+            return None
+        if isinstance(node.op, ast.And):
+            result: dict[str, list] = {}
+            for part in parts:
+                for field, values in part.items():  # type: ignore
+                    if field in result:
+                        result[field] = [v for v in result[field] if v in values]
+                    else:
+                        result[field] = values
+            return result
+        if isinstance(node.op, ast.Or):
+            # only alternatives of the same single field can be expressed
+            fields = {field for part in parts for field in part}  # type: ignore
+            if len(fields) != 1 or any(len(part) != 1 for part in parts):  # type: ignore
+                return None
+            field = fields.pop()
+            values = []
+            for part in parts:
+                values += part[field]  # type: ignore
+            return {field: values}
+    return None
+
+
+def _key(value: Any) -> Any:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class MetadataIndex:
+    """Inverted index field -> value -> doc ids (insertion ordered)."""
+
+    def __init__(self, fields: Iterable[str] = INDEXED_FIELDS):
+        self.fields = tuple(fields)
+        self.index: dict[str, dict[Any, dict[str, None]]] = {f: {} for f in self.fields}
+
+    def add(self, doc_id: str, metadata: dict[str, Any]):
+        for field in self.fields:
+            if field in metadata:
+                ids = self.index[field].setdefault(_key(metadata[field]), {})
+                ids[doc_id] = None
+
+    def remove(self, doc_id: str, metadata: dict[str, Any]):
+        for field in self.fields:
+            if field in metadata:
+                key = _key(metadata[field])
+                ids = self.index[field].get(key)
+                if ids is not None:
+                    ids.pop(doc_id, None)
+                    if not ids:
+                        del self.index[field][key]
+
+    def values(self, field: str) -> list:
+        return list(self.index.get(field, {}).keys())
+
+    def candidates(self, filter: dict[str, list]) -> list[str] | None:
+        """Doc ids matching all indexed fields of the filter, None if no field is indexed."""
+        groups: list[dict[str, None]] = []
+        for field, values in filter.items():
+            if field not in self.index:
+                continue
+            group: dict[str, None] = {}
+            for value in values:
+                group.update(self.index[field].get(_key(value), {}))
+            groups.append(group)
+        if not groups:
+            return None
+        groups.sort(key=len)
+        smallest, rest = groups[0], groups[1:]
+        return [id for id in smallest if all(id in group for group in rest)]
+
+
+class MetadataIndexMixin:
+    """FAISS vector store mixin keeping a MetadataIndex in sync with the docstore
+    and using it to pre-filter candidates before the vector search."""
+
+    def get_metadata_index(self) -> MetadataIndex:
+        index: MetadataIndex | None = getattr(self, "_metadata_index", None)
+        if index is None:
+            index = MetadataIndex()
+            for doc_id, doc in self.docstore._dict.items():  # type: ignore
+                index.add(doc_id, doc.metadata)
+            self._metadata_index = index
+        return index
+
+    def resolve_filter(
+        self, filter: str | MetadataFilter | None, comparator: Callable[[str], Comparator]
+    ) -> tuple[Comparator | None, list[str] | None]:
+        """Split a filter into candidate ids from the index and a comparator for the rest.
+        String conditions that cannot be translated are evaluated by comparator(condition)."""
+        if not filter:
+            return None, None
+        structured = (
+            normalize_filter(filter) if isinstance(filter, dict) else parse_filter(filter)
+        )
+        if structured is None:
+            return comparator(filter), None  # type: ignore
+        index = self.get_metadata_index()
+        candidate_ids = index.candidates(structured)
+        rest = {f: v for f, v in structured.items() if f not in index.fields}
+        if rest:
+            return (lambda metadata: match_filter(metadata, rest)), candidate_ids
+        return None, candidate_ids
+
+    def get_docs_by_filter(
+        self,
+        filter: str | MetadataFilter,
+        comparator: Callable[[str], Comparator],
+        limit: int = 0,
+    ) -> list[Document]:
+        filter_func, candidate_ids = self.resolve_filter(filter, comparator)
+        all_docs = self.docstore._dict  # type: ignore
+        ids = candidate_ids if candidate_ids is not None else all_docs.keys()
+        result = []
+        for id in ids:
+            doc = all_docs.get(id)
+            if doc is None or (filter_func and not filter_func(doc.metadata)):
+                continue
+            result.append(doc)
+            # stop if limit reached and limit > 0
+            if limit > 0 and len(result) >= limit:
+                break
+        return result
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        ids = super().add_embeddings(text_embeddings, metadatas, ids, **kwargs)  # type: ignore
+        self._metadata_added(ids)
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        ids = super().add_texts(texts, metadatas, ids, **kwargs)  # type: ignore
+        self._metadata_added(ids)
+        return ids
+
+    async def aadd_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        ids = await super().aadd_texts(texts, metadatas, ids, **kwargs)  # type: ignore
+        self._metadata_added(ids)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        index: MetadataIndex | None = getattr(self, "_metadata_index", None)
+        removed = []
+        if index is not None and ids:
+            removed = [
+                (id, self.docstore._dict[id].metadata)  # type: ignore
+                for id in ids
+                if id in self.docstore._dict  # type: ignore
+            ]
+        result = super().delete(ids, **kwargs)  # type: ignore
+        for id, metadata in removed:
+            index.remove(id, metadata)  # type: ignore
+        return result
+
+    def _metadata_added(self, ids: list[str]):
+        index: MetadataIndex | None = getattr(self, "_metadata_index", None)
+        if index is not None:
+            for id in ids:
+                doc = self.docstore._dict.get(id)  # type: ignore
+                if doc is not None:
+                    index.add(id, doc.metadata)
+
+    def _get_positions(self, doc_ids: Iterable[str]) -> list[int]:
+        # reverse of index_to_docstore_id, rebuilt only after the mapping changes
+        mapping: dict[int, str] = self.index_to_docstore_id  # type: ignore
+        cache = getattr(self, "_reverse_mapping", None)
+        if cache is None or cache[0] is not mapping or cache[1] != len(mapping):
+            cache = (mapping, len(mapping), {v: k for k, v in mapping.items()})
+            self._reverse_mapping = cache
+        reverse = cache[2]
+        return [reverse[id] for id in doc_ids if id in reverse]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs
+    ):
+        candidate_ids = kwargs.pop("candidate_ids", None)
+        if candidate_ids is None:
+            return super().similarity_search_with_score_by_vector(  # type: ignore
+                embedding, k, filter, fetch_k, **kwargs
+            )
+
+        # search only within the pre-filtered candidates
+        positions = self._get_positions(candidate_ids)
+        if not positions:
+            return []
+        n = min(len(positions), k if filter is None else max(k, fetch_k))
+        params = faiss.SearchParameters(
+            sel=faiss.IDSelectorBatch(np.array(positions, dtype=np.int64))
+        )
+        vector = np.array([embedding], dtype=np.float32)
+        scores, indices = self.index.search(vector, n, params=params)  # type: ignore
+
+        filter_func = None
+        if filter is not None:
+            filter_func = filter if callable(filter) else self._create_filter_func(filter)  # type: ignore
+        docs = []
+        for score, i in zip(scores[0].tolist(), indices[0].tolist()):
+            if i == -1:
+                continue
+            doc = self.docstore.search(self.index_to_docstore_id[i])  # type: ignore
+            if not isinstance(doc, Document):
+                continue
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, score))
+        return self.apply_score_threshold(docs, kwargs.get("score_threshold"))[:k]
+
+    def apply_score_threshold(
+        self, docs: list[tuple[Document, float]], score_threshold: float | None
+    ) -> list[tuple[Document, float]]:
+        # same semantics as FAISS.similarity_search_with_score_by_vector
+        if score_threshold is None:
+            return docs
+        cmp = (
+            operator.ge
+            if self.distance_strategy  # type: ignore
+            in (DistanceStrategy.MAX_INNER_PRODUCT, DistanceStrategy.JACCARD)
+            else operator.le
+        )
+        return [(doc, score) for doc, score in docs if cmp(score, score_threshold)]
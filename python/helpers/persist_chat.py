@@ -1,5 +1,11 @@
+import atexit
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+import os
+import threading
+import time
 from typing import Any
 import uuid
 from agent import Agent, AgentConfig, AgentContext, AgentContextType
@@ -7,11 +13,58 @@ from python.helpers import files, history
 import json
 from initialize import initialize_agent
 
-from python.helpers.log import Log, LogItem
+from python.helpers.log import Log, LogItem, OUTPUT_FIELDS
+from python.helpers.print_style import PrintStyle
+from python.helpers.strings import sanitize_string
 
 CHATS_FOLDER = "tmp/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+# history and log are stored as append-only json lines next to chat.json
+HISTORY_FILE_NAME = "history_{}.jsonl"
+LOG_FILE_NAME = "log.jsonl"
+# rewrite the log segment once it has this many lines
+LOG_COMPACT_LINES = LOG_SIZE * 2
+# seconds to coalesce saves of dirty chats
+SAVE_DELAY = 2.0
+
+
+@dataclass
+class _Segment:
+    reset: bool = False  # rewrite the file instead of appending
+    lines: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _PendingSave:
+    chat: str = ""
+    segments: dict[str, _Segment] = field(default_factory=dict)
+
+    def add(self, name: str, reset: bool, lines: list[str]):
+        segment = self.segments.get(name)
+        if reset or segment is None:
+            self.segments[name] = _Segment(reset=reset, lines=lines)
+        else:
+            segment.lines += lines
+
+
+@dataclass
+class _SaveState:
+    # what has been collected for writing so far, to only add changes next time
+    log: Log | None = None
+    log_guid: str = ""
+    log_updates: int = 0
+    log_lines: int = 0
+    # agent number -> (history, version, current topic, messages in current topic)
+    histories: dict[int, tuple] = field(default_factory=dict)
+
+
+_saved: dict[str, _SaveState] = {}
+_pending: dict[str, _PendingSave] = {}
+_lock = threading.RLock()  # guards _saved and _pending
+_write_lock = threading.Lock()  # keeps writes in order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ChatPersistence")
+_flush_scheduled = False
 
 
 def get_chat_folder_path(ctxid: str):
@@ -35,11 +88,23 @@ def save_tmp_chat(context: AgentContext):
     if context.type == AgentContextType.BACKGROUND:
         return
 
-    path = _get_chat_file_path(context.id)
-    files.make_dirs(path)
-    data = _serialize_context(context)
-    js = _safe_json_serialize(data, ensure_ascii=False)
-    files.write_file(path, js)
+    _collect_changes(context)
+    _flush(context.id)
+
+
+def mark_chat_dirty(context: AgentContext):
+    """Save context to the chats folder soon, coalescing saves and writing in the background"""
+    # Skip saving BACKGROUND contexts as they should be ephemeral
+    if context.type == AgentContextType.BACKGROUND:
+        return
+
+    global _flush_scheduled
+    _collect_changes(context)
+    with _lock:
+        if _flush_scheduled:
+            return
+        _flush_scheduled = True
+    _writer.submit(_flush_delayed)
 
 
 def save_tmp_chats():
@@ -49,6 +114,136 @@ def save_tmp_chats():
         if context.type == AgentContextType.BACKGROUND:
             continue
         save_tmp_chat(context)
+    flush_chats()
+
+
+def flush_chats():
+    """Write all pending changes of dirty chats"""
+    with _lock:
+        ctxids = list(_pending.keys())
+    for ctxid in ctxids:
+        _flush(ctxid)
+
+
+def _flush_delayed():
+    global _flush_scheduled
+    time.sleep(SAVE_DELAY)
+    with _lock:
+        _flush_scheduled = False
+    flush_chats()
+
+
+def _collect_changes(context: AgentContext):
+    with _lock:
+        state = _saved.setdefault(context.id, _SaveState())
+        pending = _pending.setdefault(context.id, _PendingSave())
+
+        agents = []
+        agent = context.agent0
+        while agent:
+            name = HISTORY_FILE_NAME.format(agent.number)
+            reset, lines = _collect_history_changes(state, agent)
+            pending.add(name, reset, lines)
+            agents.append(
+                {
+                    "number": agent.number,
+                    "data": {k: v for k, v in agent.data.items() if not k.startswith("_")},
+                    "history_file": name,
+                }
+            )
+            agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+
+        reset, lines = _collect_log_changes(state, context.log)
+        pending.add(LOG_FILE_NAME, reset, lines)
+
+        data = _serialize_context(context, agents=agents)
+        data["log"] = {
+            "guid": context.log.guid,
+            "progress": context.log.progress,
+            "progress_no": context.log.progress_no,
+            "log_file": LOG_FILE_NAME,
+        }
+        pending.chat = _safe_json_serialize(data, ensure_ascii=False)
+
+
+def _collect_history_changes(state: _SaveState, agent: Agent) -> tuple[bool, list[str]]:
+    hist = agent.history
+    current = hist.current
+    saved = state.histories.get(agent.number)
+    if (
+        saved
+        and saved[0] is hist
+        and saved[1] == hist.version
+        and saved[2] is current
+        and saved[3] <= len(current.messages)
+    ):
+        # only messages were added to the current topic
+        reset = False
+        lines = [
+            _json_line({"message": msg.to_dict()}) for msg in current.messages[saved[3] :]
+        ]
+    else:
+        reset = True
+        lines = [_json_line({"history": hist.to_dict()})]
+    state.histories[agent.number] = (hist, hist.version, current, len(current.messages))
+    return reset, lines
+
+
+def _collect_log_changes(state: _SaveState, log: Log) -> tuple[bool, list[str]]:
+    version = log.version
+    if (
+        state.log is log
+        and state.log_guid == log.guid
+        and state.log_lines < LOG_COMPACT_LINES
+    ):
+        reset = False
+        items = log.output(start=state.log_updates, end=version)
+    else:
+        reset = True
+        items = [item.output() for item in log.logs[-LOG_SIZE:]]
+        state.log, state.log_guid, state.log_lines = log, log.guid, 0
+    state.log_updates = version
+    state.log_lines += len(items)
+    return reset, [_json_line(item) for item in items]
+
+
+def _flush(ctxid: str):
+    with _write_lock:
+        with _lock:
+            pending = _pending.pop(ctxid, None)
+        if pending is None:
+            return
+        try:
+            folder = get_chat_folder_path(ctxid)
+            os.makedirs(folder, exist_ok=True)
+            for name, segment in pending.segments.items():
+                path = os.path.join(folder, name)
+                if segment.reset:
+                    _write_atomic(path, "".join(segment.lines))
+                elif segment.lines:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(sanitize_string("".join(segment.lines)))
+            # chat.json last, it refers to the segments
+            _write_atomic(os.path.join(folder, CHAT_FILE_NAME), pending.chat)
+        except Exception as e:
+            PrintStyle.error(f"Error saving chat {ctxid}: {e}")
+            # start over with full segments next time
+            with _lock:
+                _saved.pop(ctxid, None)
+
+
+def _write_atomic(path: str, content: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(sanitize_string(content))
+    os.replace(tmp, path)
+
+
+def _json_line(obj) -> str:
+    return _safe_json_serialize(obj, ensure_ascii=False) + "\n"
+
+
+atexit.register(flush_chats)
 
 
 def load_tmp_chats():
@@ -64,6 +259,7 @@ def load_tmp_chats():
         try:
             js = files.read_file(file)
             data = json.loads(js)
+            _read_segments(data, os.path.dirname(file))
             ctx = _deserialize_context(data)
             ctxids.append(ctx.id)
         except Exception as e:
@@ -75,6 +271,46 @@ def _get_chat_file_path(ctxid: str):
     return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_FILE_NAME)
 
 
+def _read_segments(data: dict, folder: str):
+    # fill history and log from their segment files, older chats have them inline
+    for ag in data.get("agents", []):
+        if "history_file" in ag:
+            ag["history"] = _read_history_segment(os.path.join(folder, ag["history_file"]))
+    log = data.get("log") or {}
+    if "log_file" in log:
+        log["logs"] = _read_log_segment(os.path.join(folder, log["log_file"]))
+
+
+def _read_history_segment(path: str) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    result = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "history" in entry:
+                result = entry["history"]
+            elif "message" in entry and result is not None:
+                # same as History.add_message
+                result["current"]["messages"].append(entry["message"])
+                result["counter"] = result.get("counter", 0) + 1
+    return result
+
+
+def _read_log_segment(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    items: dict[int, dict] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                items[item["no"]] = item  # later updates replace earlier ones
+    return [items[no] for no in sorted(items)][-LOG_SIZE:]
+
+
 def _convert_v080_chats():
     json_files = files.list_files(CHATS_FOLDER, "*.json")
     for file in json_files:
@@ -105,8 +341,12 @@ def export_json_chat(context: AgentContext):
 
 def remove_chat(ctxid):
     """Remove a chat or task context"""
-    path = get_chat_folder_path(ctxid)
-    files.delete_dir(path)
+    with _write_lock:
+        with _lock:
+            _pending.pop(ctxid, None)
+            _saved.pop(ctxid, None)
+        path = get_chat_folder_path(ctxid)
+        files.delete_dir(path)
 
 
 def remove_msg_files(ctxid):
@@ -115,13 +355,17 @@ def remove_msg_files(ctxid):
     files.delete_dir(path)
 
 
-def _serialize_context(context: AgentContext):
+def _serialize_context(context: AgentContext, agents: list[dict] | None = None):
+    # history and log are stored separately when agents are serialized by the caller
+    full = agents is None
+
     # serialize agents
-    agents = []
-    agent = context.agent0
-    while agent:
-        agents.append(_serialize_agent(agent))
-        agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    if agents is None:
+        agents = []
+        agent = context.agent0
+        while agent:
+            agents.append(_serialize_agent(agent))
+            agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
 
 
     data = {k: v for k, v in context.data.items() if not k.startswith("_")}
@@ -145,7 +389,7 @@ def _serialize_context(context: AgentContext):
         "streaming_agent": (
             context.streaming_agent.number if context.streaming_agent else 0
         ),
-        "log": _serialize_log(context.log),
+        "log": _serialize_log(context.log) if full else None,
         "data": data,
         "output_data": output_data,
     }
@@ -227,9 +471,13 @@ def _deserialize_agents(
             context=context,
         )
         current.data = ag.get("data", {})
-        current.history = history.deserialize_history(
-            ag.get("history", ""), agent=current
-        )
+        hist = ag.get("history", "")
+        if isinstance(hist, dict):
+            current.history = history.History.from_dict(
+                hist, history=history.History(agent=current)
+            )
+        else:
+            current.history = history.deserialize_history(hist or "", agent=current)
         if not zero:
             zero = current
 
@@ -262,18 +510,17 @@ def _deserialize_log(data: dict[str, Any]) -> "Log":
     # Deserialize the list of LogItem objects
     i = 0
     for item_data in data.get("logs", []):
-        log.logs.append(
-            LogItem(
-                log=log,  # restore the log reference
-                no=i,  # item_data["no"],
-                type=item_data["type"],
-                heading=item_data.get("heading", ""),
-                content=item_data.get("content", ""),
-                kvps=OrderedDict(item_data["kvps"]) if item_data["kvps"] else None,
-                temp=item_data.get("temp", False),
-            )
+        item = LogItem(
+            log=log,  # restore the log reference
+            no=i,  # item_data["no"],
+            type=item_data["type"],
+            heading=item_data.get("heading", ""),
+            content=item_data.get("content", ""),
+            kvps=OrderedDict(item_data["kvps"]) if item_data["kvps"] else None,
+            temp=item_data.get("temp", False),
         )
-        log.updates.append(i)
+        log.logs.append(item)
+        log._touch(item, *OUTPUT_FIELDS)
         i += 1
 
     return log
@@ -290,6 +290,18 @@ def build_system_prompt_vars(name: str):
     }
 
 
+def get_system_prompt_vars_stamp(name: str):
+    """Changes whenever build_system_prompt_vars may return different values."""
+    meta_folder = get_project_meta_folder(name)
+    instructions_folder = files.get_abs_path(meta_folder, PROJECT_INSTRUCTIONS_DIR)
+    paths = [files.get_abs_path(meta_folder, PROJECT_HEADER_FILE), instructions_folder]
+    if os.path.isdir(instructions_folder):
+        paths += sorted(
+            os.path.join(instructions_folder, f) for f in os.listdir(instructions_folder)
+        )
+    return tuple(files.get_stamp(path) for path in paths)
+
+
 def get_additional_instructions_files(name: str):
     instructions_folder = files.get_abs_path(
         get_project_folder(name), PROJECT_META_DIR, PROJECT_INSTRUCTIONS_DIR
@@ -363,14 +375,16 @@ def get_file_structure(name: str, basic_data: BasicProjectData|None=None) -> str
     if basic_data is None:
         basic_data = load_basic_project_data(name)
     
+    # listings are indexed per project and gitignore, unchanged trees come from cache
+    index = file_tree.get_index(project_folder, basic_data["file_structure"]["gitignore"])
     tree = str(file_tree.file_tree(
         project_folder,
         max_depth=basic_data["file_structure"]["max_depth"],
         max_files=basic_data["file_structure"]["max_files"],
         max_folders=basic_data["file_structure"]["max_folders"],
         max_lines=basic_data["file_structure"]["max_lines"],
-        ignore=basic_data["file_structure"]["gitignore"],
-        output_mode=file_tree.OUTPUT_MODE_STRING
+        output_mode=file_tree.OUTPUT_MODE_STRING,
+        index=index,
     ))
 
     # empty?
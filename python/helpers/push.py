@@ -0,0 +1,25 @@
+import threading
+
+# signals state changes shown in the web UI (logs, notifications, contexts) to push streams
+_condition = threading.Condition()
+_version = 0
+
+
+def notify():
+    """Signal that state visible to the web UI has changed."""
+    global _version
+    with _condition:
+        _version += 1
+        _condition.notify_all()
+
+
+def get_version() -> int:
+    return _version
+
+
+def wait(version: int, timeout: float) -> int:
+    """Wait until the state changes after version or the timeout passes, returns the current version."""
+    with _condition:
+        if _version == version:
+            _condition.wait(timeout)
+        return _version
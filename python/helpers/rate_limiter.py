@@ -1,57 +1,263 @@
 import asyncio
+import sqlite3
+import threading
 import time
-from typing import Callable, Awaitable
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Awaitable, Iterable
+
+# usage added within this many seconds is merged into one window entry
+BUCKET_SECONDS = 1.0
+# shared limiters write usage from add() at most this often
+FLUSH_SECONDS = BUCKET_SECONDS
 
 
 class RateLimiter:
+    """Sliding window limiter with running sums per key.
+
+    Usage is kept in time buckets, so adding and totals are O(1) and the
+    window holds at most seconds / BUCKET_SECONDS entries per key. wait()
+    serves callers in FIFO order, also across event loops, and sleeps until
+    enough of the window expires instead of polling.
+    """
+
     def __init__(self, seconds: int = 60, **limits: int):
         self.timeframe = seconds
         self.limits = {key: value if isinstance(value, (int, float)) else 0 for key, value in (limits or {}).items()}
-        self.values = {key: [] for key in self.limits.keys()}
-        self._lock = asyncio.Lock()
+        self.values: dict[str, deque[tuple[float, float]]] = {key: deque() for key in self.limits.keys()}
+        self.totals: dict[str, float] = {key: 0 for key in self.limits.keys()}
+        # shared by chats running on different event loops
+        self._lock = threading.RLock()
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
 
     def add(self, **kwargs: int):
-        now = time.time()
-        for key, value in kwargs.items():
-            if not key in self.values:
-                self.values[key] = []
-            self.values[key].append((now, value))
+        with self._transaction():
+            self._record(time.time(), kwargs)
 
     async def cleanup(self):
-        async with self._lock:
-            now = time.time()
-            cutoff = now - self.timeframe
-            for key in self.values:
-                self.values[key] = [(t, v) for t, v in self.values[key] if t > cutoff]
+        await self._run(self._cleanup_now)
 
     async def get_total(self, key: str) -> int:
-        async with self._lock:
-            if not key in self.values:
-                return 0
-            return sum(value for _, value in self.values[key])
+        return await self._run(self._get_total_now, key)
 
     async def wait(
         self,
         callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
+        fifo: bool = True,
+        **costs: int,
     ):
-        while True:
-            await self.cleanup()
-            should_wait = False
-
-            for key, limit in self.limits.items():
-                if limit <= 0:  # Skip if no limit set
-                    continue
-
-                total = await self.get_total(key)
-                if total > limit:
-                    if callback:
-                        msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
-                        should_wait = not await callback(msg, key, total, limit)
-                    else:
-                        should_wait = True
+        """Wait until the costs fit into the limits and record them.
+
+        Without costs only waits for the current usage to get within the limits.
+        The callback is called with a message while waiting, returning True
+        skips the wait. With fifo=False the caller does not queue behind other
+        waiters, for nested event loops that would block the queue head.
+        """
+        turn = None
+        if fifo:
+            loop = asyncio.get_running_loop()
+            turn = loop.create_future()
+            with self._lock:
+                self._waiters.append((loop, turn))
+                if self._waiters[0][1] is turn:
+                    turn.set_result(None)
+        try:
+            if turn:
+                await turn
+            while True:
+                exceeded = await self._run(self._acquire, costs)
+                if not exceeded:
+                    return
+                key, total, limit, delay = exceeded
+                if callback:
+                    msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
+                    if await callback(msg, key, total, limit):
+                        self.add(**costs)
+                        return
+                await asyncio.sleep(delay)
+        finally:
+            if turn:
+                with self._lock:
+                    self._waiters.remove((loop, turn))  # type: ignore
+                    if self._waiters:
+                        next_loop, next_turn = self._waiters[0]
+                        next_loop.call_soon_threadsafe(_resolve, next_turn)
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        # in-memory state is quick to update, shared limiters move this off the loop
+        return func(*args)
+
+    def _acquire(self, costs: dict) -> tuple[str, int, int, float] | None:
+        with self._transaction():
+            exceeded = self._check(costs, time.time())
+            if not exceeded:
+                self._record(time.time(), costs)
+            return exceeded
+
+    def _cleanup_now(self):
+        with self._transaction():
+            self._cleanup(time.time())
+
+    def _get_total_now(self, key: str) -> int:
+        with self._transaction():
+            return int(self._total(key, time.time()))
+
+    def _check(self, costs: dict, now: float) -> tuple[str, int, int, float] | None:
+        # first limit the costs do not fit into, with the time until they do
+        for key, limit in self.limits.items():
+            if limit <= 0:  # Skip if no limit set
+                continue
+            cost = costs.get(key, 0)
+            total = self._total(key, now) + cost
+            # a cost larger than the limit goes through on an empty window
+            if total <= limit or total == cost:
+                continue
+            excess = total - limit
+            freed_at = now
+            for t, value in self._entries(key, now):
+                freed_at = t + self.timeframe
+                excess -= value
+                if excess <= 0:
                     break
+            return key, int(total), int(limit), max(freed_at - now, 0.01)
+        return None
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            yield
+
+    def _record(self, now: float, costs: dict):
+        for key, value in costs.items():
+            if not value:
+                continue
+            entries = self.values.setdefault(key, deque())
+            if entries and now < entries[-1][0]:
+                end, merged = entries.pop()
+                entries.append((end, merged + value))
+            else:
+                # timed by the bucket end, usage counts up to one bucket longer, never shorter
+                entries.append((now + BUCKET_SECONDS, value))
+            self.totals[key] = self.totals.get(key, 0) + value
+
+    def _cleanup(self, now: float):
+        cutoff = now - self.timeframe
+        for key, entries in self.values.items():
+            while entries and entries[0][0] <= cutoff:
+                self.totals[key] -= entries.popleft()[1]
+            if not entries:
+                self.totals[key] = 0  # drop float drift
+
+    def _total(self, key: str, now: float) -> float:
+        self._cleanup(now)
+        return self.totals.get(key, 0)
+
+    def _entries(self, key: str, now: float) -> Iterable[tuple[float, float]]:
+        return self.values.get(key, ())
+
+
+class SharedRateLimiter(RateLimiter):
+    """Rate limiter with the window stored in a SQLite file shared by processes.
+
+    Limiters with the same name and file count the same usage. Waiting is
+    FIFO within a process, between processes the first to find free capacity
+    goes first. SQLite is only used from worker threads: add() buffers usage
+    and a timer writes it within FLUSH_SECONDS, other calls run in a thread.
+    """
+
+    def __init__(self, path: str, name: str, seconds: int = 60, **limits: int):
+        super().__init__(seconds, **limits)
+        self.name = name
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS usage (limiter TEXT, key TEXT, t REAL, value REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS usage_window ON usage (limiter, key, t)")
+        # usage from add() not written yet, own lock so add() never waits for SQLite
+        self._pending_lock = threading.Lock()
+        self._pending: dict[str, float] = {}
+        self._pending_since = 0.0
+        self._flush_timer: threading.Timer | None = None
+
+    def add(self, **kwargs: int):
+        with self._pending_lock:
+            for key, value in kwargs.items():
+                if value:
+                    self._pending[key] = self._pending.get(key, 0) + value
+            if self._pending and not self._flush_timer:
+                self._pending_since = time.time()
+                self._flush_timer = threading.Timer(FLUSH_SECONDS, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write usage buffered by add()."""
+        with self._transaction():
+            pass  # the transaction writes pending usage
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        return await asyncio.to_thread(func, *args)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            if self._db.in_transaction:  # nested call within the same transaction
+                yield
+                return
+            with self._pending_lock:
+                pending, since = self._pending, self._pending_since
+                self._pending = {}
+                if self._flush_timer:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    if pending:
+                        self._record(since, pending)
+                    yield
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+            except BaseException:
+                self.add(**pending)  # not written, keep for the next flush
+                raise
+
+    def _record(self, now: float, costs: dict):
+        for key, value in costs.items():
+            if not value:
+                continue
+            updated = self._db.execute(
+                "UPDATE usage SET value = value + ? WHERE rowid = "
+                "(SELECT max(rowid) FROM usage WHERE limiter = ? AND key = ? AND t > ?)",
+                (value, self.name, key, now),
+            ).rowcount
+            if not updated:
+                self._db.execute(
+                    "INSERT INTO usage VALUES (?, ?, ?, ?)",
+                    (self.name, key, now + BUCKET_SECONDS, value),
+                )
+
+    def _cleanup(self, now: float):
+        self._db.execute(
+            "DELETE FROM usage WHERE limiter = ? AND t <= ?",
+            (self.name, now - self.timeframe),
+        )
+
+    def _total(self, key: str, now: float) -> float:
+        self._cleanup(now)
+        return self._db.execute(
+            "SELECT COALESCE(SUM(value), 0) FROM usage WHERE limiter = ? AND key = ?",
+            (self.name, key),
+        ).fetchone()[0]
+
+    def _entries(self, key: str, now: float) -> Iterable[tuple[float, float]]:
+        return self._db.execute(
+            "SELECT t, value FROM usage WHERE limiter = ? AND key = ? AND t > ? ORDER BY t",
+            (self.name, key, now - self.timeframe),
+        ).fetchall()
 
-            if not should_wait:
-                break
 
-            await asyncio.sleep(1)
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
@@ -4,10 +4,11 @@ import time
 import os
 from io import StringIO
 from dataclasses import dataclass
-from typing import Dict, Optional, List, Literal, Set, Callable, Tuple, TYPE_CHECKING
+from typing import Any, Dict, Optional, List, Literal, Set, Callable, Tuple, TypeVar, TYPE_CHECKING
 from dotenv.parser import parse_stream
 from python.helpers.errors import RepairableException
 from python.helpers import files
+from python.helpers.pattern_matcher import PatternMatcher
 
 if TYPE_CHECKING:
     from agent import AgentContext
@@ -17,6 +18,8 @@ if TYPE_CHECKING:
 ALIAS_PATTERN = r"§§secret\(([A-Za-z_][A-Za-z0-9_]*)\)"
 DEFAULT_SECRETS_FILE = "tmp/secrets.env"
 
+T = TypeVar("T")
+
 
 def alias_for_key(key: str, placeholder: str = "§§secret({key})") -> str:
     # Return alias string for given key in upper-case
@@ -40,11 +43,17 @@ class StreamingSecretsFilter:
 
     - Replaces full secret values with placeholders §§secret(KEY) when detected.
     - Holds the longest suffix of the current buffer that matches any secret prefix
-      (with minimum trigger length of 3) to avoid leaking partial secrets across chunks.
-    - On finalize(), any unresolved partial is masked with '***'.
+      to avoid leaking partial secrets across chunks.
+    - On finalize(), any unresolved partial (with minimum trigger length of 3) is masked with '***'.
+    - masked_text holds everything emitted so far, so the full stream never needs re-masking.
     """
 
-    def __init__(self, key_to_value: Dict[str, str], min_trigger: int = 3):
+    def __init__(
+        self,
+        key_to_value: Dict[str, str],
+        min_trigger: int = 3,
+        matcher: PatternMatcher | None = None,
+    ):
         self.min_trigger = max(1, int(min_trigger))
         # Map value -> key for placeholder construction
         self.value_to_key: Dict[str, str] = {
@@ -52,57 +61,48 @@ class StreamingSecretsFilter:
         }
         # Only keep non-empty values
         self.secret_values: List[str] = [v for v in self.value_to_key.keys() if v]
-        # Precompute all prefixes for quick suffix matching
-        self.prefixes: Set[str] = set()
-        for v in self.secret_values:
-            for i in range(self.min_trigger, len(v) + 1):
-                self.prefixes.add(v[:i])
-        self.max_len: int = max((len(v) for v in self.secret_values), default=0)
+        # Shared matcher compiled for the same values, or a new one
+        self.matcher = matcher if matcher is not None else PatternMatcher(self.secret_values)
+        self.max_len: int = self.matcher.max_len
 
         # Internal buffer of pending text that is not safe to flush yet
         self.pending: str = ""
+        self.masked_text: str = ""
 
     def _replace_full_values(self, text: str) -> str:
         """Replace all full secret values with placeholders in the given text."""
-        # Sort by length desc to avoid partial overlaps
-        for val in sorted(self.secret_values, key=len, reverse=True):
-            if not val:
-                continue
-            key = self.value_to_key.get(val, "")
-            if key:
-                text = text.replace(val, alias_for_key(key))
-        return text
+        return self.matcher.sub(
+            text, lambda value: alias_for_key(self.value_to_key[value])
+        )
 
     def _longest_suffix_prefix(self, text: str) -> int:
         """Return length of longest suffix of text that is a known secret prefix.
-        Returns 0 if none found (or only shorter than min_trigger)."""
-        max_check = min(len(text), self.max_len)
-        for length in range(max_check, self.min_trigger - 1, -1):
-            suffix = text[-length:]
-            if suffix in self.prefixes:
-                return length
-        return 0
+        Returns 0 if none found."""
+        return self.matcher.longest_partial_suffix(text)
+
+    def _split(self, text: str) -> Tuple[str, str]:
+        """Mask text and split it into the part safe to emit and the suffix to hold."""
+        # hold the partial secret at the end, unless a full secret already reaches into it
+        hold_from = len(text) - self._longest_suffix_prefix(text)
+        parts = []
+        pos = 0
+        for start, end in self.matcher.finditer(text):
+            if start >= hold_from:
+                break
+            parts.append(text[pos:start])
+            parts.append(alias_for_key(self.value_to_key[text[start:end]]))
+            pos = end
+        hold_from = max(hold_from, pos)
+        parts.append(text[pos:hold_from])
+        return "".join(parts), text[hold_from:]
 
     def process_chunk(self, chunk: str) -> str:
         if not chunk:
             return ""
 
-        self.pending += chunk
-
-        # Replace any full secret occurrences first
-        self.pending = self._replace_full_values(self.pending)
-
-        # Determine the longest suffix that could still form a secret
-        hold_len = self._longest_suffix_prefix(self.pending)
-        if hold_len > 0:
-            # Flush everything except the hold suffix
-            emit = self.pending[:-hold_len]
-            self.pending = self.pending[-hold_len:]
-        else:
-            # Safe to flush everything
-            emit = self.pending
-            self.pending = ""
-
+        # only the held suffix and the new chunk are scanned
+        emit, self.pending = self._split(self.pending + chunk)
+        self.masked_text += emit
         return emit
 
     def finalize(self) -> str:
@@ -111,14 +111,11 @@ class StreamingSecretsFilter:
         if not self.pending:
             return ""
 
-        hold_len = self._longest_suffix_prefix(self.pending)
-        if hold_len > 0:
-            safe = self.pending[:-hold_len]
-            # Mask unresolved partial
-            result = safe + "***"
-        else:
-            result = self.pending
+        safe, partial = self._split(self.pending)
+        # Mask unresolved partial
+        result = safe + ("***" if len(partial) >= self.min_trigger else partial)
         self.pending = ""
+        self.masked_text += result
         return result
 
 
@@ -146,6 +143,8 @@ class SecretsManager:
         self._raw_snapshots: Dict[str, str] = {}
         self._secrets_cache = None
         self._last_raw_text = None
+        # matchers compiled for the cached secrets, by min_length
+        self._matchers: Dict[int, Tuple[PatternMatcher, Dict[str, str]]] = {}
 
     def read_secrets_raw(self) -> str:
         """Read raw secrets file content from local filesystem (same system)."""
@@ -254,9 +253,34 @@ class SecretsManager:
             key_formatter=alias_for_key,
         )
 
+    def get_files(self) -> Tuple[str, ...]:
+        """Secrets files merged by this manager"""
+        return self._files
+
+    def get_files_stamp(self) -> Tuple:
+        """Changes whenever the secrets files change, for caching text built from them"""
+        return tuple(files.get_stamp(files.get_abs_path(path)) for path in self._files)
+
     def create_streaming_filter(self) -> "StreamingSecretsFilter":
         """Create a streaming-aware secrets filter snapshotting current secret values."""
-        return StreamingSecretsFilter(self.load_secrets())
+        return StreamingSecretsFilter(
+            self.load_secrets(), matcher=self.get_matcher(0)[0]
+        )
+
+    def get_matcher(self, min_length: int = 4) -> Tuple[PatternMatcher, Dict[str, str]]:
+        """Matcher for secret values of at least min_length and the value -> key map,
+        compiled once per loaded secrets."""
+        with self._lock:
+            secrets = self.load_secrets()
+            cached = self._matchers.get(min_length)
+            if cached is None:
+                value_to_key: Dict[str, str] = {}
+                for key, value in secrets.items():
+                    if value and len(value.strip()) >= min_length:
+                        value_to_key.setdefault(value, key)
+                cached = (PatternMatcher(value_to_key.keys()), value_to_key)
+                self._matchers[min_length] = cached
+            return cached
 
     def replace_placeholders(self, text: str) -> str:
         """Replace secret placeholders with actual values"""
@@ -302,17 +326,30 @@ class SecretsManager:
         if not text:
             return text
 
-        secrets = self.load_secrets()
-        result = text
+        matcher, value_to_key = self.get_matcher(min_length)
+        return matcher.sub(
+            text, lambda value: alias_for_key(value_to_key[value], placeholder)
+        )
 
-        # Sort by length (longest first) to avoid partial replacements
-        for key, value in sorted(
-            secrets.items(), key=lambda x: len(x[1]), reverse=True
-        ):
-            if value and len(value.strip()) >= min_length:
-                result = result.replace(value, alias_for_key(key, placeholder))
+    def mask_recursive(self, obj: T, min_length: int = 4) -> T:
+        """Replace actual secret values with placeholders in strings of nested dicts and lists"""
+        matcher, value_to_key = self.get_matcher(min_length)
+        if not matcher:
+            return obj
 
-        return result
+        def replacement(value: str) -> str:
+            return alias_for_key(value_to_key[value])
+
+        def mask(obj: Any) -> Any:
+            if isinstance(obj, str):
+                return matcher.sub(obj, replacement)
+            elif isinstance(obj, dict):
+                return {k: mask(v) for k, v in obj.items()}
+            elif isinstance(obj, list):
+                return [mask(item) for item in obj]
+            return obj
+
+        return mask(obj)
 
     def get_masked_secrets(self) -> str:
         """Get content with values masked for frontend display (preserves comments and unrecognized lines)"""
@@ -351,6 +388,7 @@ class SecretsManager:
             self._secrets_cache = None
             self._raw_snapshots = {}
             self._last_raw_text = None
+            self._matchers = {}
 
     @classmethod
     def _invalidate_all_caches(cls):
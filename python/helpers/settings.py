@@ -4,7 +4,9 @@ import json
 import os
 import re
 import subprocess
-from typing import Any, Literal, TypedDict, cast
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Literal, TypedDict, TypeVar, cast
 
 import models
 from python.helpers import runtime, whisper, defer, git
@@ -163,6 +165,12 @@ API_KEY_PLACEHOLDER = "************"
 
 SETTINGS_FILE = files.get_abs_path("tmp/settings.json")
 _settings: Settings | None = None
+# normalized read-only copy of _settings, rebuilt only when settings are set
+_snapshot: Settings | None = None
+_snapshot_version = 0
+_snapshot_lock = threading.Lock()
+
+T = TypeVar("T")
 
 
 def convert_out(settings: Settings) -> SettingsOutput:
@@ -1334,13 +1342,72 @@ def convert_in(settings: dict) -> Settings:
     return current
 
 def get_settings() -> Settings:
+    """Copy of the current settings that can be modified, read-only code should use get_snapshot."""
+    return cast(Settings, thaw(get_snapshot()))
+
+
+def get_snapshot() -> Settings:
+    """Current settings, read-only and shared by all callers.
+
+    The snapshot is normalized once and replaced as a whole by set_settings,
+    so hot paths can read it without copying. Nested dicts are read-only
+    mappings and nested lists are tuples, thaw gives modifiable copies.
+    """
     global _settings
-    if not _settings:
-        _settings = _read_settings_file()
-    if not _settings:
-        _settings = get_default_settings()
-    norm = normalize_settings(_settings)
-    return norm
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                if not _settings:
+                    _settings = _read_settings_file()
+                if not _settings:
+                    _settings = get_default_settings()
+                _update_snapshot()
+    return cast(Settings, _snapshot)
+
+
+def get_settings_version() -> int:
+    """Number increased on every settings change, for caching values derived from settings."""
+    get_snapshot()
+    return _snapshot_version
+
+
+def derived(func: Callable[[Settings], T]) -> Callable[[], T]:
+    """Decorator caching a value computed from the settings snapshot until the settings change."""
+    cache: tuple[int, T] | None = None
+
+    def wrapper() -> T:
+        nonlocal cache
+        version = get_settings_version()
+        if cache is None or cache[0] != version:
+            cache = (version, func(get_snapshot()))
+        return cache[1]
+
+    return wrapper
+
+
+def thaw(value: Any) -> Any:
+    """Modifiable deep copy of a snapshot value, read-only mappings become dicts and tuples lists."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _update_snapshot():
+    global _snapshot, _snapshot_version
+    # normalized again after sensitive values were saved to .env, they affect the mcp token
+    norm = normalize_settings(cast(Settings, _settings))
+    _snapshot = cast(Settings, _freeze(norm))
+    _snapshot_version += 1
 
 
 def set_settings(settings: Settings, apply: bool = True):
@@ -1348,6 +1415,8 @@ def set_settings(settings: Settings, apply: bool = True):
     previous = _settings
     _settings = normalize_settings(settings)
     _write_settings_file(_settings)
+    with _snapshot_lock:
+        _update_snapshot()
     if apply:
         _apply_settings(previous)
 
@@ -1542,6 +1611,8 @@ def _apply_settings(previous: Settings | None):
         from agent import AgentContext
         from initialize import initialize_agent
 
+        # model wrappers are cached per config, drop them with the old config
+        models.clear_model_cache()
         config = initialize_agent()
         for ctx in AgentContext._contexts.values():
             ctx.config = config  # reinitialize context config with new settings
@@ -5,12 +5,12 @@ import time
 import sys
 from typing import Optional, Tuple
 from python.helpers import tty_session, runtime
-from python.helpers.shell_ssh import clean_string
+from python.helpers.shell_ssh import TerminalOutput, clean_string
 
 class LocalInteractiveSession:
     def __init__(self, cwd: str|None = None):
         self.session: tty_session.TTYSession|None = None
-        self.full_output = ''
+        self.output = TerminalOutput()
         self.cwd = cwd
 
     async def connect(self):
@@ -26,23 +26,25 @@ class LocalInteractiveSession:
     async def send_command(self, command: str):
         if not self.session:
             raise Exception("Shell not connected")
-        self.full_output = ""
+        self.output.reset()
         await self.session.sendline(command)
  
-    async def read_output(self, timeout: float = 0, reset_full_output: bool = False) -> Tuple[str, Optional[str]]:
+    async def read_output(self, timeout: float = 0, reset_full_output: bool = False, wait: float = 0.01) -> Tuple[str, Optional[str]]:
         if not self.session:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = ""
+            self.output.reset()
 
-        # get output from terminal
-        partial_output = await self.session.read_full_until_idle(idle_timeout=0.01, total_timeout=timeout)
-        self.full_output += partial_output
+        # wake up on the first output or after wait seconds, then read until idle
+        partial_output = await self.session.read(timeout=wait) or ""
+        if partial_output:
+            partial_output += await self.session.read_full_until_idle(idle_timeout=0.01, total_timeout=timeout)
+        self.output.feed(partial_output)
 
-        # clean output
+        # clean output, only the new part is processed
         partial_output = clean_string(partial_output)
-        clean_full_output = clean_string(self.full_output)
+        clean_full_output = self.output.text()
 
         if not partial_output:
             return clean_full_output, None
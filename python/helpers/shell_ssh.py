@@ -1,7 +1,9 @@
 import asyncio
+import codecs
 import paramiko
 import time
 import re
+from collections import deque
 from typing import Tuple
 from python.helpers.log import Log
 from python.helpers.print_style import PrintStyle
@@ -24,7 +26,8 @@ class SSHInteractiveSession:
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.shell = None
-        self.full_output = b""
+        self.output = TerminalOutput()
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
         self.last_command = b""
         self.trimmed_command_length = 0  # Initialize trimmed_command_length
         self.cwd = cwd
@@ -97,7 +100,8 @@ class SSHInteractiveSession:
     async def send_command(self, command: str):
         if not self.shell:
             raise Exception("Shell not connected")
-        self.full_output = b""
+        self.output.reset()
+        self.decoder.reset()
         # if len(command) > 10: # if command is long, add end_comment to split output
         #     command = (command + " \\\n" +SSHInteractiveSession.end_comment + "\n")
         # else:
@@ -107,15 +111,21 @@ class SSHInteractiveSession:
         self.shell.send(self.last_command)
         
     async def read_output(
-        self, timeout: float = 0, reset_full_output: bool = False
+        self, timeout: float = 0, reset_full_output: bool = False, wait: float = 0
     ) -> Tuple[str, str]:
         if not self.shell:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = b""
+            self.output.reset()
+            self.decoder.reset()
         partial_output = b""
         leftover = b""
+
+        # paramiko channels cannot be awaited, poll for the first output up to wait seconds
+        deadline = time.time() + wait
+        while not self.shell.recv_ready() and time.time() < deadline:
+            await asyncio.sleep(0.05)
         start_time = time.time()
 
         while self.shell.recv_ready() and (
@@ -153,15 +163,14 @@ class SSHInteractiveSession:
             #         self.trimmed_command_length += trim_com
 
             partial_output += data
-            self.full_output += data
             await asyncio.sleep(0.1)  # Prevent busy waiting
 
-        # Decode once at the end
+        # Decode once at the end, full output is cleaned incrementally
         decoded_partial_output = partial_output.decode("utf-8", errors="replace")
-        decoded_full_output = self.full_output.decode("utf-8", errors="replace")
+        self.output.feed(self.decoder.decode(partial_output))
+        decoded_full_output = self.output.text()
 
         decoded_partial_output = clean_string(decoded_partial_output)
-        decoded_full_output = clean_string(decoded_full_output)
 
         return decoded_full_output, decoded_partial_output
 
@@ -244,3 +253,130 @@ def clean_string(input_string):
             ].rstrip()  # Overwrite with the last part after the last '\r'
 
     return "\n".join(lines)
+
+
+# ANSI escape codes, same as in clean_string
+_ANSI_ESCAPE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+# escape code that may still be completed by the next chunk
+_ANSI_INCOMPLETE = re.compile(r"\x1B(?:\[[0-?]*[ -/]*)?")
+# leading ipython continuation prompts, see clean_string
+_OUTPUT_START = re.compile(r"^[ \r]*(?:\r*\n>[ \r]*)*")
+_OUTPUT_START_PROMPTS = re.compile(r"^(>\s*)+")
+# escaped single bytes (\xXX) printed by programs, removed from the output
+_BYTE_ESCAPE = re.compile(r"(?<!\\)\\x[0-9A-Fa-f]{2}")
+
+
+class TerminalOutput:
+    """Terminal output cleaned incrementally, same result as clean_string over all
+    of it with escaped single bytes removed.
+
+    Finished lines are cleaned once when their newline arrives, only the last
+    line is cleaned again on reads. Long outputs keep the first and the last
+    keep_chars characters, the count of dropped ones is in omitted. The default
+    matches the ~1M characters the code execution tool returns.
+    """
+
+    def __init__(self, keep_chars: int = 500_000):
+        self.keep_chars = keep_chars
+        self.reset()
+
+    def reset(self):
+        self.omitted = 0
+        self._escape = ""  # incomplete escape code held back
+        self._start = ""  # output before the first visible character
+        self._started = False
+        self._line = ""  # unfinished last line
+        self._head: list[str] = []
+        self._head_chars = 0
+        self._tail: deque[str] = deque()
+        self._tail_chars = 0
+        self._text: str | None = ""
+
+    def feed(self, data: str):
+        data = self._escape + data
+        self._escape = ""
+        esc = data.rfind("\x1b")
+        if esc >= 0 and _ANSI_INCOMPLETE.fullmatch(data, esc):
+            data, self._escape = data[:esc], data[esc:]
+        data = _ANSI_ESCAPE.sub("", data).replace("\x00", "")
+        if not data:
+            return
+        self._text = None
+
+        if not self._started:
+            self._start += data
+            if not self._start.replace(">", "").strip():
+                return  # start can still be trimmed by later chunks
+            data = _OUTPUT_START_PROMPTS.sub("", _OUTPUT_START.sub("", self._start))
+            self._start = ""
+            self._started = True
+
+        lines = (self._line + data).split("\n")
+        for line in lines[:-1]:
+            if line.endswith("\r"):
+                line = line[:-1]
+            self._commit(_clean_line(line) + "\n")
+        self._line = _compact_line(lines[-1])
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._head) + "".join(self._tail)
+        pending = self._escape
+        if self._started:
+            return self._text + _clean_line(self._line + pending)
+        if self._start or pending:
+            return _BYTE_ESCAPE.sub("", clean_string(self._start + pending))
+        return self._text
+
+    def tail(self, chars: int) -> str:
+        # end of text() without joining all of it
+        if not self._started or self._tail_chars + self._head_chars <= chars:
+            return self.text()[-chars:]
+        parts = [_clean_line(self._line + self._escape)]
+        size = len(parts[0])
+        for piece in reversed(self._tail):
+            if size >= chars:
+                break
+            parts.append(piece)
+            size += len(piece)
+        if size < chars:
+            parts.extend(reversed(self._head))
+        return "".join(reversed(parts))[-chars:]
+
+    def _commit(self, piece: str):
+        room = self.keep_chars - self._head_chars
+        if room > 0:
+            self._head.append(piece[:room])
+            self._head_chars += len(self._head[-1])
+            piece = piece[room:]
+            if not piece:
+                return
+        self._tail.append(piece)
+        self._tail_chars += len(piece)
+        excess = self._tail_chars - self.keep_chars
+        while excess > 0:
+            first = self._tail[0]
+            if len(first) <= excess:
+                self._tail.popleft()
+                dropped = len(first)
+            else:
+                self._tail[0] = first[excess:]
+                dropped = excess
+            self._tail_chars -= dropped
+            self.omitted += dropped
+            excess -= dropped
+
+
+def _clean_line(line: str) -> str:
+    # last non-empty part after carriage returns, as in clean_string
+    parts = [part for part in line.split("\r") if part.strip()]
+    return _BYTE_ESCAPE.sub("", parts[-1].rstrip() if parts else line)
+
+
+def _compact_line(line: str) -> str:
+    # progress bars rewrite the line with \r, keep only what _clean_line can still return
+    head, sep, last = line.rpartition("\r")
+    if not sep:
+        return line
+    parts = [part for part in head.split("\r") if part.strip()]
+    return parts[-1] + "\r" + last if parts else line
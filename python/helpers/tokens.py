@@ -1,30 +1,65 @@
+from functools import lru_cache
 from typing import Literal
 import tiktoken
 
 APPROX_BUFFER = 1.1
 TRIM_BUFFER = 0.8
+DEFAULT_ENCODING = "cl100k_base"
 
+# estimator calibration against cl100k_base (see tests/tokens_benchmark.py)
+# ascii text (english, code, json) averages ~3.5-4 chars per token, lower value to stay on the safe side
+ESTIMATE_CHARS_PER_TOKEN = 3.5
+# non-ascii characters (accents, cyrillic, cjk, emoji) are mostly 1 token each or less
+ESTIMATE_TOKENS_PER_NON_ASCII_CHAR = 1.0
 
-def count_tokens(text: str, encoding_name="cl100k_base") -> int:
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    # keep encoders resident, loading one is expensive
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str, encoding_name=DEFAULT_ENCODING) -> int:
     if not text:
         return 0
 
-    # Get the encoding
-    encoding = tiktoken.get_encoding(encoding_name)
-
     # Encode the text and count the tokens
-    tokens = encoding.encode(text, disallowed_special=())
+    tokens = get_encoding(encoding_name).encode(text, disallowed_special=())
     token_count = len(tokens)
 
     return token_count
 
 
+def count_tokens_batch(texts: list[str], encoding_name=DEFAULT_ENCODING) -> list[int]:
+    if not texts:
+        return []
+    encoded = get_encoding(encoding_name).encode_batch(texts, disallowed_special=())
+    return [len(tokens) for tokens in encoded]
+
+
 def approximate_tokens(
     text: str,
 ) -> int:
     return int(count_tokens(text) * APPROX_BUFFER)
 
 
+def approximate_tokens_batch(texts: list[str]) -> list[int]:
+    return [int(count * APPROX_BUFFER) for count in count_tokens_batch(texts)]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap tokenizer-free alternative to approximate_tokens for hot paths like streaming."""
+    if not text:
+        return 0
+    chars = len(text)
+    non_ascii = 0 if text.isascii() else chars - len(text.encode("ascii", "ignore"))
+    estimate = (
+        (chars - non_ascii) / ESTIMATE_CHARS_PER_TOKEN
+        + non_ascii * ESTIMATE_TOKENS_PER_NON_ASCII_CHAR
+    )
+    return max(1, int(estimate * APPROX_BUFFER))
+
+
 def trim_to_tokens(
     text: str,
     max_tokens: int,
@@ -1,4 +1,7 @@
-from typing import Any, List, Sequence
+from typing import Any, Callable, List, Sequence
+import os
+import pickle
+import threading
 import uuid
 from langchain_community.vectorstores import FAISS
 
@@ -6,6 +9,8 @@ from langchain_community.vectorstores import FAISS
 from python.helpers import faiss_monkey_patch
 import faiss
 
+from python.helpers.metadata_index import MetadataFilter, MetadataIndexMixin
+
 
 from langchain_core.documents import Document
 from langchain.storage import InMemoryByteStore
@@ -17,9 +22,52 @@ from langchain.embeddings import CacheBackedEmbeddings
 from simpleeval import simple_eval
 
 from agent import Agent
+import models
+
+
+class MyFaiss(MetadataIndexMixin, FAISS):
+    _lock: threading.RLock | None = None
+    _lock_guard = threading.Lock()
+
+    @property
+    def lock(self) -> threading.RLock:
+        # stores are shared by chats running on different event loops
+        if self._lock is None:
+            with MyFaiss._lock_guard:
+                if self._lock is None:
+                    self._lock = threading.RLock()
+        return self._lock
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        with self.lock:
+            return super().add_embeddings(text_embeddings, metadatas, ids, **kwargs)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        # embed without holding the lock, then add like add_embeddings
+        texts = list(texts)
+        embeddings = self._embed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas, ids, **kwargs)
+
+    def delete(self, ids=None, **kwargs):
+        with self.lock:
+            return super().delete(ids, **kwargs)
+
+    def resolve_filter(self, filter, comparator):
+        with self.lock:
+            return super().resolve_filter(filter, comparator)
+
+    def get_docs_by_filter(self, filter, comparator, limit: int = 0):
+        with self.lock:
+            return super().get_docs_by_filter(filter, comparator, limit)
+
+    def similarity_search_with_score_by_vector(
+        self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs
+    ):
+        with self.lock:
+            return super().similarity_search_with_score_by_vector(
+                embedding, k, filter, fetch_k, **kwargs
+            )
 
-
-class MyFaiss(FAISS):
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -58,10 +106,10 @@ class VectorDB:
         return VectorDB._cached_embeddings[namespace]
 
     def __init__(self, agent: Agent, cache: bool = True):
-        self.agent = agent
+        # agent only provides the embedding model, it is not kept
         self.cache = cache  # store cache preference
         self.embeddings = self._get_embeddings(agent, cache=cache)
-        self.index = faiss.IndexFlatIP(len(self.embeddings.embed_query("example")))
+        self.index = faiss.IndexFlatIP(models.get_embedding_dimension(self.embeddings))
 
         self.db = MyFaiss(
             embedding_function=self.embeddings,
@@ -74,9 +122,15 @@ class VectorDB:
         )
 
     async def search_by_similarity_threshold(
-        self, query: str, limit: int, threshold: float, filter: str = ""
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        filter: str | MetadataFilter = "",
     ):
-        comparator = get_comparator(filter) if filter else None
+        comparator, candidate_ids = self.db.resolve_filter(filter, get_comparator)
+        if candidate_ids is not None and not candidate_ids:
+            return []  # nothing matches the filter
 
         return await self.db.asearch(
             query,
@@ -84,19 +138,13 @@ class VectorDB:
             k=limit,
             score_threshold=threshold,
             filter=comparator,
+            candidate_ids=candidate_ids,
         )
 
-    async def search_by_metadata(self, filter: str, limit: int = 0) -> list[Document]:
-        comparator = get_comparator(filter)
-        all_docs = self.db.get_all_docs()
-        result = []
-        for doc in all_docs.values():
-            if comparator(doc.metadata):
-                result.append(doc)
-                # stop if limit reached and limit > 0
-                if limit > 0 and len(result) >= limit:
-                    break
-        return result
+    async def search_by_metadata(
+        self, filter: str | MetadataFilter, limit: int = 0
+    ) -> list[Document]:
+        return self.db.get_docs_by_filter(filter, get_comparator, limit)
 
     async def insert_documents(self, docs: list[Document]):
         ids = [str(uuid.uuid4()) for _ in range(len(docs))]
@@ -108,6 +156,53 @@ class VectorDB:
             self.db.add_documents(documents=docs, ids=ids)
         return ids
 
+    async def copy_documents(self, docs: list[Document], metadata: dict) -> list[str]:
+        """Insert copies of stored documents with updated metadata, reusing their vectors instead of embedding again."""
+        with self.db.lock:
+            positions = self.db._get_positions(doc.metadata["id"] for doc in docs)
+            if len(positions) != len(docs):
+                return []  # some documents are gone
+            ids = [str(uuid.uuid4()) for _ in range(len(docs))]
+            texts = [doc.page_content for doc in docs]
+            vectors = [self.db.index.reconstruct(position) for position in positions]
+            metadatas = [
+                {**doc.metadata, **metadata, "id": id} for doc, id in zip(docs, ids)
+            ]
+            self.db.add_embeddings(zip(texts, vectors), metadatas, ids)
+        return ids
+
+    def save(self, folder_path: str):
+        self.snapshot_writer()(folder_path)
+
+    def snapshot_writer(self) -> Callable[[str], None]:
+        # same files as FAISS.save_local, copied under the lock and written without it
+        with self.db.lock:
+            index_data = faiss.serialize_index(self.db.index)
+            docstore = InMemoryDocstore(dict(self.db.get_all_docs()))
+            index_to_docstore_id = dict(self.db.index_to_docstore_id)
+
+        def write(folder_path: str):
+            os.makedirs(folder_path, exist_ok=True)
+            index_data.tofile(os.path.join(folder_path, "index.faiss"))
+            with open(os.path.join(folder_path, "index.pkl"), "wb") as f:
+                pickle.dump((docstore, index_to_docstore_id), f)
+
+        return write
+
+    def load(self, folder_path: str) -> bool:
+        # replace the empty index with a previously saved one, if any
+        if not os.path.exists(os.path.join(folder_path, "index.faiss")):
+            return False
+        self.db = MyFaiss.load_local(
+            folder_path=folder_path,
+            embeddings=self.embeddings,
+            allow_dangerous_deserialization=True,
+            distance_strategy=DistanceStrategy.COSINE,
+            relevance_score_fn=cosine_normalizer,
+        )  # type: ignore
+        self.index = self.db.index
+        return True
+
     async def delete_documents_by_ids(self, ids: list[str]):
         # aget_by_ids is not yet implemented in faiss, need to do a workaround
         rem_docs = await self.db.aget_by_ids(
@@ -1,4 +1,3 @@
-import asyncio
 from dataclasses import dataclass
 import shlex
 import time
@@ -28,6 +27,13 @@ OUTPUT_TIMEOUTS: dict[str, int] = {
     "dialog_timeout": 5,
 }
 
+# longest wait for output before checking for intervention again
+INTERVENTION_INTERVAL = 0.5
+# output characters searched for shell prompts and dialogs
+PROMPT_SEARCH_CHARS = 4096
+# end of the output shown in the log while the command is running
+LOG_TAIL_CHARS = 15_000
+
 @dataclass
 class ShellWrap:
     id: int
@@ -239,7 +245,6 @@ class CodeExecution(Tool):
         between_output_timeout=15,  # Wait up to x seconds between outputs
         dialog_timeout=5,  # potential dialog detection timeout
         max_exec_timeout=180,  # hard cap on total runtime
-        sleep_time=0.1,
         prefix="",
         timeouts: dict | None = None,
     ):
@@ -259,15 +264,25 @@ class CodeExecution(Tool):
         full_output = ""
         truncated_output = ""
         got_output = False
+        dialog_checked = False
+        shell = self.state.shells[session].session
 
         # if prefix, log right away
         if prefix:
             self.log.update(content=prefix)
 
         while True:
-            await asyncio.sleep(sleep_time)
-            full_output, partial_output = await self.state.shells[session].session.read_output(
-                timeout=1, reset_full_output=reset_full_output
+            # sleep until new output arrives or the next timeout is due
+            if not got_output:
+                deadline = start_time + first_output_timeout
+            elif not dialog_checked:
+                deadline = last_output_time + dialog_timeout
+            else:
+                deadline = last_output_time + between_output_timeout
+            deadline = min(deadline, start_time + max_exec_timeout)
+            wait = min(max(deadline - time.time(), 0) + 0.01, INTERVENTION_INTERVAL)
+            full_output, partial_output = await shell.read_output(
+                timeout=1, reset_full_output=reset_full_output, wait=wait
             )
             reset_full_output = False  # only reset once
 
@@ -277,17 +292,18 @@ class CodeExecution(Tool):
             if partial_output:
                 PrintStyle(font_color="#85C1E9").stream(partial_output)
                 # full_output += partial_output # Append new output
-                truncated_output = self.fix_full_output(full_output)
+                truncated_output = self.fix_full_output(full_output, shell.output.omitted)
                 self.set_progress(truncated_output)
-                heading = self.get_heading_from_output(truncated_output, 0)
-                self.log.update(content=prefix + truncated_output, heading=heading)
+                # only the end while running, the final update shows the whole output
+                log_tail = shell.output.tail(LOG_TAIL_CHARS)
+                heading = self.get_heading_from_output(log_tail, 0)
+                self.log.update_throttled(content=prefix + log_tail, heading=heading)
                 last_output_time = now
                 got_output = True
+                dialog_checked = False
 
-                # Check for shell prompt at the end of output
-                last_lines = (
-                    truncated_output.splitlines()[-3:] if truncated_output else []
-                )
+                # Check for shell prompt at the end of output, new output only moves the end
+                last_lines = self.get_last_lines(shell, 3)
                 last_lines.reverse()
                 for idx, line in enumerate(last_lines):
                     for pat in self.prompt_patterns:
@@ -299,7 +315,9 @@ class CodeExecution(Tool):
                             heading = self.get_heading_from_output(
                                 "\n".join(last_lines), idx + 1, True
                             )
-                            self.log.update(heading=heading)
+                            self.log.update(
+                                content=prefix + truncated_output, heading=heading
+                            )
                             self.mark_session_idle(session)
                             return truncated_output
 
@@ -340,12 +358,11 @@ class CodeExecution(Tool):
                     self.log.update(content=prefix + response, heading=heading)
                     return response
 
-                # potential dialog detection
-                if now - last_output_time > dialog_timeout:
+                # potential dialog detection, once per pause in output
+                if not dialog_checked and now - last_output_time > dialog_timeout:
+                    dialog_checked = True
                     # Check for dialog prompt at the end of output
-                    last_lines = (
-                        truncated_output.splitlines()[-2:] if truncated_output else []
-                    )
+                    last_lines = self.get_last_lines(shell, 2)
                     for line in last_lines:
                         for pat in self.dialog_patterns:
                             if pat.search(line.strip()):
@@ -381,16 +398,15 @@ class CodeExecution(Tool):
         if not self.state.shells[session].running:
             return None
         
-        full_output, _ = await self.state.shells[session].session.read_output(
+        shell = self.state.shells[session].session
+        full_output, _ = await shell.read_output(
             timeout=1, reset_full_output=reset_full_output
         )
-        truncated_output = self.fix_full_output(full_output)
+        truncated_output = self.fix_full_output(full_output, shell.output.omitted)
         self.set_progress(truncated_output)
         heading = self.get_heading_from_output(truncated_output, 0)
 
-        last_lines = (
-            truncated_output.splitlines()[-3:] if truncated_output else []
-        )
+        last_lines = self.get_last_lines(shell, 3)
         last_lines.reverse()
         for idx, line in enumerate(last_lines):
             for pat in self.prompt_patterns:
@@ -463,14 +479,17 @@ class CodeExecution(Tool):
 
         return self.get_heading() + done_icon
 
-    def fix_full_output(self, output: str):
-        # remove any single byte \xXX escapes
-        output = re.sub(r"(?<!\\)\\x[0-9A-Fa-f]{2}", "", output)
+    def fix_full_output(self, output: str, omitted: int = 0):
+        # escaped bytes are already removed by the terminal output as it arrives
         # Strip every line of output before truncation
         # output = "\n".join(line.strip() for line in output.splitlines())
-        output = truncate_text_agent(agent=self.agent, output=output, threshold=1000000) # ~1MB, larger outputs should be dumped to file, not read from terminal
+        output = truncate_text_agent(agent=self.agent, output=output, threshold=1000000, omitted=omitted) # ~1MB, larger outputs should be dumped to file, not read from terminal
         return output
 
+    def get_last_lines(self, shell: LocalInteractiveSession | SSHInteractiveSession, count: int):
+        # end of the fixed output without processing all of it
+        return shell.output.tail(PROMPT_SEARCH_CHARS).splitlines()[-count:]
+
     def get_cwd(self):
         project_name = projects.get_context_project_name(self.agent.context)
         if not project_name:
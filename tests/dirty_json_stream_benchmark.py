@@ -0,0 +1,41 @@
+import sys, os, time, json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers.dirty_json import DirtyJson, DirtyJsonStream
+
+CHUNK = 12  # typical streamed delta size in chars
+SIZES = [1_000, 5_000, 20_000]
+
+
+def make_response(size: int) -> str:
+    code = "".join(f"print('line {i}')\n" for i in range(size // 16))
+    return json.dumps(
+        {
+            "thoughts": ["Running the script", "Checking the output"],
+            "headline": "Executing code",
+            "tool_name": "code_execution_tool",
+            "tool_args": {"runtime": "python", "session": 0, "code": code},
+        }
+    )[:size]
+
+
+def stream(text: str, parse) -> list[float]:
+    times = []
+    for end in range(CHUNK, len(text) + CHUNK, CHUNK):
+        start = time.perf_counter()
+        parse(text[:end])
+        times.append(time.perf_counter() - start)
+    return times
+
+
+for size in SIZES:
+    text = make_response(size)
+    parser = DirtyJsonStream()
+    full = stream(text, DirtyJson.parse_string)
+    incremental = stream(text, parser.update)
+    assert parser.result == DirtyJson.parse_string(text)
+    last = len(full) // 10 or 1
+    print(
+        f"{size:>6} chars, {len(full)} chunks:"
+        f" full reparse {sum(full) * 1e3:8.1f} ms total, {sum(full[-last:]) / last * 1e6:8.1f} us/chunk at the end |"
+        f" incremental {sum(incremental) * 1e3:6.1f} ms total, {sum(incremental[-last:]) / last * 1e6:6.1f} us/chunk at the end"
+    )
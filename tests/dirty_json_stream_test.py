@@ -0,0 +1,85 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from python.helpers.dirty_json import DirtyJson, DirtyJsonStream
+
+DOCUMENTS = [
+    '{"tool_name": "response", "tool_args": {"text": "done", "count": 3, "ok": true}}',
+    'Sure, here you go:\n{"a": 1, "b": [1, 2.5, -3e2]}\nHope that helps!',
+    '{\n  // line comment\n  "a": 1, /* block\ncomment */ "b": 2\n}',
+    '{"code": """\n  print("hi")\n  """, "note": \'single\', "tick": `back`}',
+    '{"text": "caf\\u00e9 \\u2603 \\n\\t\\"quoted\\" \\\\ end"}',
+    '{"list": [1, 2, 3,], "obj": {"x": 1,},}',
+    '{tool_name: response, tool_args: {text: plain words, n: 5}}',
+    '{a: null, b: undefined, c: FALSE, d: True}',
+    '[{"a": 1}, ["b", "c"], "d", 4]',
+    '{"empty": "", "nested": {"deep": {"deeper": []}}}',
+    '{"unicode": "žluťoučký kůň 🐎", "emoji_escape": "\\ud83d"}',
+    # cut off at the end
+    '{"a": 12',
+    '{a: true, b: nul',
+    '{"a": [1, 2, tr',
+    '{"a": 1, "bc',
+    '{"a": 1, bc',
+    '{"a": "unfinished string',
+    '{"a": -1.5',
+]
+
+
+def stream_chunks(text: str, size: int):
+    parser = DirtyJsonStream()
+    result = None
+    for start in range(0, len(text), size):
+        result = parser.feed(text[start : start + size])
+    return result
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_chunked_stream_matches_parse_string(text, size):
+    assert stream_chunks(text, size) == DirtyJson.parse_string(text)
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_feed_matches_parse_string(text):
+    assert DirtyJson().feed(text) == DirtyJson.parse_string(text)
+
+
+def test_values_cut_at_end_are_replaced():
+    parser = DirtyJsonStream()
+    assert parser.feed('{"a": 1') == {"a": 1}
+    assert parser.feed("2") == {"a": 12}
+    assert parser.feed(', b: nu') == {"a": 12, "b": "nu"}
+    assert parser.feed("ll, ke") == {"a": 12, "b": None, "ke": None}
+    assert parser.feed('y: "v"}') == {"a": 12, "b": None, "key": "v"}
+
+
+def test_unfinished_number_has_no_value():
+    parser = DirtyJsonStream()
+    assert parser.feed('{"a": -1.5') == {"a": -1.5}
+    assert parser.feed("e") == {"a": None}
+    assert parser.feed("2}") == {"a": -150.0}
+
+
+def test_doubled_braces():
+    # DirtyJson.parse_string keeps the opening quote in the first key here
+    assert stream_chunks('{{"doubled": "braces"}}', 1) == {"doubled": "braces"}
+
+
+def test_update_restarts_when_text_changes():
+    parser = DirtyJsonStream()
+    parser.update('{"text": "secret value')
+    assert parser.update('{"text": "***", "n": 1}') == {"text": "***", "n": 1}
+
+
+def test_every_prefix_of_a_response():
+    text = '{"thoughts": ["a", "b"], "tool_name": "response", "tool_args": {"text": "hi", "n": 42}}'
+    parser = DirtyJsonStream()
+    for end in range(1, len(text) + 1):
+        result = parser.update(text[:end])
+        # partial results only grow towards the final one
+        if isinstance(result, dict) and "tool_name" in result and result["tool_name"]:
+            assert "response".startswith(result["tool_name"])
+    assert parser.result == DirtyJson.parse_string(text)
@@ -0,0 +1,71 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import pytest
+from python.helpers.embedding_batcher import EmbeddingBatcher
+
+
+class RecordingEmbedder:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+        self.threads: set[str] = set()
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        self.threads.add(threading.current_thread().name)
+        return [[float(len(text)), float(ord(text[0]))] for text in texts]
+
+
+def vector(text: str) -> list[float]:
+    return [float(len(text)), float(ord(text[0]))]
+
+
+def test_concurrent_calls_are_coalesced_in_order():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch=64, max_wait=0.1)
+    requests = [[f"text {i}", f"more {i}" * (i + 1)] for i in range(10)]
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed(texts) for texts in requests))
+
+    results = asyncio.run(run())
+
+    assert results == [[vector(text) for text in texts] for texts in requests]
+    assert len(embedder.calls) == 1
+    assert embedder.calls[0] == [text for texts in requests for text in texts]
+    assert embedder.threads != {threading.current_thread().name}
+
+    metrics = batcher.get_metrics()
+    assert metrics["batches"] == 1
+    assert metrics["items"] == 20
+    assert metrics["max_batch_size"] == 20
+    assert metrics["queue_depth"] == 0
+
+
+def test_batches_are_limited_to_max_batch():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch=4, max_wait=0.1)
+    futures = [batcher.submit([f"a{i}", f"b{i}", f"c{i}"]) for i in range(3)]
+    large = batcher.submit([f"x{i}" for i in range(10)])
+
+    for i, future in enumerate(futures):
+        assert future.result() == [vector(f"a{i}"), vector(f"b{i}"), vector(f"c{i}")]
+    assert large.result() == [vector(f"x{i}") for i in range(10)]
+    assert all(len(call) <= 4 for call in embedder.calls)
+    assert batcher.get_metrics()["items"] == 19
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fail(texts):
+        raise RuntimeError("model down")
+
+    batcher = EmbeddingBatcher(fail, max_wait=0.05)
+    futures = [batcher.submit(["a"]), batcher.submit(["b"])]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    # the batcher keeps working after a failure
+    assert batcher.embed([]) == []
@@ -0,0 +1,43 @@
+import sys, os, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers import history
+
+# fixed context size so the benchmark does not depend on settings
+history._get_ctx_size_for_history = lambda: 10**9
+
+SIZES = [50, 500, 5000]
+TOPIC_SIZE = 50
+CALLS = 10000
+
+
+def build(size: int) -> history.History:
+    hist = history.History(agent=None)  # type: ignore
+    for i in range(size):
+        if i and i % TOPIC_SIZE == 0:
+            hist.new_topic()
+        hist.add_message(ai=bool(i % 2), content=f"message {i}", tokens=10)
+    return hist
+
+
+def bench(label: str, func):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<24} {elapsed / CALLS * 1e6:8.2f} us/call")
+
+
+for size in SIZES:
+    hist = build(size)
+    assert hist.get_tokens() == size * 10
+    print(f"{size} messages, {len(hist.topics)} topics:")
+    bench("is_over_limit", hist.is_over_limit)
+    bench(
+        "compress decision",
+        lambda: (
+            hist.get_current_topic_tokens(),
+            hist.get_topics_tokens(),
+            hist.get_bulks_tokens(),
+        ),
+    )
+    bench("add_message", lambda: hist.add_message(ai=False, content="x", tokens=1))
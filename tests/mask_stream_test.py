@@ -0,0 +1,78 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from types import SimpleNamespace
+from python.helpers import extension
+from python.helpers.secrets import SecretsManager, DEFAULT_SECRETS_FILE
+
+SECRET = "sk-live-1234567890"
+
+
+class FakeAgent:
+    def __init__(self):
+        self.config = SimpleNamespace(profile="")
+        self.context = SimpleNamespace(get_data=lambda key: None)
+        self.data = {}
+        self.response_streams = []
+        self.reasoning_streams = []
+
+    async def handle_response_stream(self, stream: str):
+        self.response_streams.append(stream)
+
+    async def handle_reasoning_stream(self, stream: str):
+        self.reasoning_streams.append(stream)
+
+
+def stream(monkeypatch, chunks: list[str], kind: str = "response"):
+    manager = SecretsManager(DEFAULT_SECRETS_FILE)
+    manager._secrets_cache = {"API_KEY": SECRET, "OTHER": "another-secret"}
+    monkeypatch.setitem(SecretsManager._instances, (DEFAULT_SECRETS_FILE,), manager)
+
+    agent = FakeAgent()
+    loop_data = SimpleNamespace(params_temporary={})
+    streams = agent.response_streams if kind == "response" else agent.reasoning_streams
+    printed = []
+
+    # same calls as Agent.monologue around the main LLM call
+    async def run():
+        full = ""
+        for chunk in chunks:
+            full += chunk
+            stream_data = {"chunk": chunk, "full": full}
+            await extension.call_extensions(
+                f"{kind}_stream_chunk", agent=agent, loop_data=loop_data, stream_data=stream_data
+            )
+            printed.append(stream_data["chunk"])
+            streams.append(stream_data["full"])
+        await extension.call_extensions(f"{kind}_stream_end", agent=agent, loop_data=loop_data)
+
+    asyncio.run(run())
+    return printed, streams, loop_data
+
+
+def test_secret_split_across_chunks(monkeypatch):
+    chunks = ['{"text": "key ', SECRET[:1], SECRET[1:6], SECRET[6:], ' done"}']
+    printed, streams, loop_data = stream(monkeypatch, chunks)
+
+    expected = '{"text": "key §§secret(API_KEY) done"}'
+    for full in streams:
+        assert SECRET[:3] not in full
+        assert expected.startswith(full)
+    assert "".join(printed) == expected
+    assert streams[-1] == expected
+    assert loop_data.params_temporary == {}
+
+
+def test_held_tail_delivered_at_end(monkeypatch):
+    # the last character could start a secret and is only released at the end
+    printed, streams, _ = stream(monkeypatch, ["thinking about s"], kind="reasoning")
+    assert streams == ["thinking about ", "thinking about s"]
+
+
+def test_unfinished_secret_masked_at_end(monkeypatch):
+    printed, streams, _ = stream(monkeypatch, ["value ", SECRET[:8]])
+    assert streams[-1] == "value ***"
+    assert SECRET[:3] not in "".join(printed)
+
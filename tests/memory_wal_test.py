@@ -0,0 +1,178 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+from python.helpers import memory_wal
+from python.helpers.memory_wal import MemoryWal
+
+
+# a dict of id -> text stands in for the FAISS snapshot
+def write_state(state: dict):
+    def write(folder: str):
+        for name in memory_wal.SNAPSHOT_FILES:
+            with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+                json.dump(state, f)
+
+    return write
+
+
+def load(db_dir: str) -> dict:
+    wal = MemoryWal(db_dir)
+    state = {}
+    if wal.has_snapshot():
+        with open(os.path.join(wal.snapshot_dir, "index.faiss"), encoding="utf-8") as f:
+            state = json.load(f)
+    for entry in wal.entries():
+        if entry["op"] == "add":
+            state[entry["id"]] = entry["text"]
+        elif entry["op"] == "delete":
+            for id in entry["ids"]:
+                state.pop(id, None)
+    return state
+
+
+def log(wal: MemoryWal, state: dict, start: int, count: int):
+    ids = [f"doc{i}" for i in range(start, start + count)]
+    texts = [f"text {i}" for i in range(start, start + count)]
+    wal.log_add(ids, texts, [{} for _ in ids], [[0.0, 1.0] for _ in ids])
+    state.update(zip(ids, texts))
+    wal.log_delete([ids[0]])
+    state.pop(ids[0])
+
+
+def compact(wal: MemoryWal, state: dict):
+    seq, segments = wal.rotate()
+    wal.write_snapshot(seq, segments, write_state(dict(state)))
+
+
+def test_replay_and_compact(tmp_path):
+    db_dir = str(tmp_path)
+    wal = MemoryWal(db_dir)
+    state = {}
+    log(wal, state, 0, 5)
+    assert load(db_dir) == state
+
+    compact(wal, state)
+    assert MemoryWal(db_dir).pending == 0
+    assert list(MemoryWal(db_dir).entries()) == []
+    assert load(db_dir) == state
+
+    # changes after the snapshot are replayed on top of it
+    log(wal, state, 5, 5)
+    assert load(db_dir) == state
+    compact(wal, state)
+    log(wal, state, 10, 3)
+    assert load(db_dir) == state
+    snapshots = [p for p in os.listdir(db_dir) if p.startswith("snapshot.")]
+    assert snapshots == [os.path.basename(MemoryWal(db_dir).snapshot_dir)]
+
+
+def test_legacy_snapshot_is_replaced(tmp_path):
+    db_dir = str(tmp_path)
+    write_state({"old": "text"})(db_dir)
+    wal = MemoryWal(db_dir)
+    assert wal.snapshot_dir == db_dir
+    state = {"old": "text"}
+    log(wal, state, 0, 3)
+    compact(wal, state)
+    assert load(db_dir) == state
+    assert not os.path.exists(os.path.join(db_dir, "index.faiss"))
+
+
+def test_snapshot_file_checkpoint(tmp_path):
+    db_dir = str(tmp_path)
+    wal = MemoryWal(db_dir)
+    state = {}
+    log(wal, state, 0, 5)
+    compact(wal, state)
+
+    def write(data: str):
+        def write(path: str):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+
+        return write
+
+    path = os.path.join(wal.snapshot_dir, "index.ann")
+    assert wal.write_snapshot_file("index.ann", wal.seq, write("current"))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "current"
+
+    # a file older than the snapshot must not replace the one written with it
+    seq = wal.seq
+    log(wal, state, 5, 5)
+    compact(wal, state)
+    assert not wal.write_snapshot_file("index.ann", seq, write("stale"))
+    with open(os.path.join(wal.snapshot_dir, "index.ann"), encoding="utf-8") as f:
+        assert f.read() != "stale"
+    assert [p for p in os.listdir(db_dir) if p.startswith("index.ann")] == []
+
+
+def test_append_is_fsynced(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(
+        memory_wal.os, "fsync", lambda fd: (synced.append(fd), fsync(fd))[1]
+    )
+    wal = MemoryWal(str(tmp_path))
+    log(wal, {}, 0, 2)
+    # two appends, plus the folder of the new log file
+    assert len(synced) == (2 if os.name == "nt" else 3)
+
+    synced.clear()
+    monkeypatch.setattr(memory_wal, "FSYNC_APPEND", False)
+    log(wal, {}, 2, 2)
+    assert synced == []
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_in(monkeypatch, target, name):
+    def crash(*args, **kwargs):
+        raise Crash()
+
+    monkeypatch.setattr(target, name, crash)
+
+
+@pytest.mark.parametrize(
+    "target, name",
+    [
+        # while writing the new snapshot files
+        (memory_wal, "_fsync_file"),
+        # after the files are written, before the folder is renamed into place
+        (memory_wal.os, "replace"),
+        # after the rename, before the checkpoint points to the new generation
+        (MemoryWal, "_write_checkpoint"),
+        # after the checkpoint, before the covered segments are dropped
+        (memory_wal.os, "remove"),
+    ],
+)
+def test_crash_during_compaction(tmp_path, monkeypatch, target, name):
+    db_dir = str(tmp_path)
+    wal = MemoryWal(db_dir)
+    state = {}
+    log(wal, state, 0, 5)
+    compact(wal, state)
+    log(wal, state, 5, 5)
+
+    seq, segments = wal.rotate()
+    with monkeypatch.context() as m:
+        crash_in(m, target, name)
+        with pytest.raises(Crash):
+            wal.write_snapshot(seq, segments, write_state(dict(state)))
+    assert load(db_dir) == state
+
+    # the next compaction after restart cleans up and succeeds
+    wal = MemoryWal(db_dir)
+    log(wal, state, 10, 5)
+    compact(wal, state)
+    assert load(db_dir) == state
+    assert list(MemoryWal(db_dir).entries()) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
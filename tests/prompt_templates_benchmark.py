@@ -0,0 +1,66 @@
+import sys, os, re, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers import files
+
+# prompt files read for the system prompt of agent0, see python/extensions/system_prompt
+SYSTEM_PROMPT_FILES = [
+    ("agent.system.main.md", {}),
+    ("agent.system.tools.md", {}),
+    ("agent.system.behaviour_default.md", {}),
+    ("agent.system.projects.inactive.md", {}),
+]
+DIRS = [files.get_abs_path("agents", "agent0", "prompts"), files.get_abs_path("prompts")]
+RUNS = 200
+
+
+def legacy_read_prompt_file(_file: str, _directories: list[str], **kwargs):
+    # the previous implementation: find, read, plugin, replace per variable, regex includes
+    if os.path.dirname(_file):
+        _directories = [os.path.dirname(_file)] + _directories
+        _file = os.path.basename(_file)
+    absolute_path = files.find_file_in_dirs(_file, _directories)
+    with open(absolute_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    variables = files.load_plugin_variables(_file, _directories, **kwargs) or {}
+    variables.update(kwargs)
+    content = files.replace_placeholders_text(content, **variables)
+
+    def replace_include(match):
+        try:
+            return legacy_read_prompt_file(match.group(1), _directories, **kwargs)
+        except FileNotFoundError:
+            return match.group(0)
+
+    return re.sub(r"{{\s*include\s*['\"](.*?)['\"]\s*}}", replace_include, content)
+
+
+def legacy_remove_code_fences(text: str) -> str:
+    return re.sub(r"(```|~~~)(.*?\n)(.*?)(\1)", lambda m: m.group(3), text, flags=re.DOTALL)
+
+
+def build(read, remove_code_fences) -> str:
+    # as Agent.read_prompt does for each file
+    return "\n\n".join(
+        remove_code_fences(read(name, DIRS, **kwargs)) for name, kwargs in SYSTEM_PROMPT_FILES
+    )
+
+
+legacy = (legacy_read_prompt_file, legacy_remove_code_fences)
+compiled = (files.read_prompt_file, files.remove_code_fences)
+expected = build(*legacy)
+assert build(*compiled) == expected
+
+start = time.perf_counter()
+for _ in range(RUNS):
+    build(*legacy)
+legacy_time = (time.perf_counter() - start) / RUNS
+
+start = time.perf_counter()
+for _ in range(RUNS):
+    build(*compiled)
+cached_time = (time.perf_counter() - start) / RUNS
+
+print(
+    f"system prompt, {len(expected)} chars: previous {legacy_time * 1e3:6.2f} ms,"
+    f" compiled templates {cached_time * 1e3:6.2f} ms"
+)
@@ -0,0 +1,55 @@
+import sys, os, time, random, string
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers.secrets import SecretsManager, alias_for_key
+
+SECRET_COUNTS = [10, 100, 500]
+TEXT_SIZES = [1_000, 50_000]
+rng = random.Random(0)
+
+
+def random_text(size: int) -> str:
+    return "".join(rng.choice(string.ascii_letters + string.digits + "    \n") for _ in range(size))
+
+
+def replace_loop(secrets: dict[str, str], text: str) -> str:
+    # the previous implementation: one str.replace per secret
+    for key, value in sorted(secrets.items(), key=lambda x: len(x[1]), reverse=True):
+        text = text.replace(value, alias_for_key(key))
+    return text
+
+
+for count in SECRET_COUNTS:
+    secrets = {f"KEY_{i}": random_text(rng.randint(8, 40)).strip() for i in range(count)}
+    manager = SecretsManager("benchmark")
+    manager._secrets_cache = secrets  # skip reading files
+    values = list(secrets.values())
+    for size in TEXT_SIZES:
+        text = random_text(size)
+        # sprinkle some secrets into the text
+        text = "".join(
+            text[i : i + 500] + rng.choice(values) for i in range(0, len(text), 500)
+        )
+        assert manager.mask_values(text, min_length=0) == replace_loop(secrets, text)
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            replace_loop(secrets, text)
+        loop_time = (time.perf_counter() - start) / runs
+        start = time.perf_counter()
+        for _ in range(runs):
+            manager.mask_values(text, min_length=0)
+        matcher_time = (time.perf_counter() - start) / runs
+
+        # streaming in small chunks, full text was re-masked on every chunk before
+        chunks = [text[i : i + 16] for i in range(0, len(text), 16)]
+        stream = manager.create_streaming_filter()
+        start = time.perf_counter()
+        for chunk in chunks:
+            stream.process_chunk(chunk)
+        stream.finalize()
+        stream_time = time.perf_counter() - start
+
+        print(
+            f"{count:>4} secrets, {len(text):>6} chars: str.replace loop {loop_time * 1e3:7.2f} ms,"
+            f" matcher {matcher_time * 1e3:6.2f} ms, streamed in {len(chunks)} chunks {stream_time * 1e3:7.2f} ms"
+        )
@@ -0,0 +1,55 @@
+import sys, os, time, json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers import tokens
+
+SAMPLES = {
+    "prose": "The quick brown fox jumps over the lazy dog. " * 40,
+    "json": json.dumps(
+        {"tool_name": "code_execution_tool", "tool_args": {"runtime": "python", "code": "print('hello')\n" * 20}}
+    ),
+    "code": open(os.path.abspath(__file__), encoding="utf-8").read(),
+    "non-ascii": "Příliš žluťoučký kůň úpěl ďábelské ódy. Привет, мир! 你好，世界。" * 10,
+}
+CHUNK = 16  # typical streamed delta size in chars
+CALLS = 2000
+
+
+def bench(func, text: str) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func(text)
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+tokens.get_encoding()  # load the encoder outside of the measurement
+
+print(f"{'sample':<10} {'exact':>7} {'estimate':>9} {'ratio':>6} {'exact us':>9} {'est. us':>8}")
+for name, text in SAMPLES.items():
+    exact = tokens.approximate_tokens(text)
+    estimate = tokens.estimate_tokens(text)
+    print(
+        f"{name:<10} {exact:>7} {estimate:>9} {estimate / exact:>6.2f}"
+        f" {bench(tokens.approximate_tokens, text):>9.2f}"
+        f" {bench(tokens.estimate_tokens, text):>8.2f}"
+    )
+
+# streaming: sum of per-chunk counts vs the full text
+for name, text in SAMPLES.items():
+    chunks = [text[i : i + CHUNK] for i in range(0, len(text), CHUNK)]
+    exact = tokens.approximate_tokens(text)
+    streamed_exact = sum(tokens.approximate_tokens(c) for c in chunks)
+    streamed_estimate = sum(tokens.estimate_tokens(c) for c in chunks)
+    print(
+        f"stream {name:<10} full {exact:>5}, per chunk exact {streamed_exact:>5},"
+        f" per chunk estimate {streamed_estimate:>5}"
+    )
+
+texts = list(SAMPLES.values()) * 50
+start = time.perf_counter()
+single = [tokens.count_tokens(t) for t in texts]
+single_time = time.perf_counter() - start
+start = time.perf_counter()
+batch = tokens.count_tokens_batch(texts)
+batch_time = time.perf_counter() - start
+assert single == batch
+print(f"{len(texts)} texts: count_tokens {single_time * 1e3:.2f} ms, count_tokens_batch {batch_time * 1e3:.2f} ms")
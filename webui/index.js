@@ -252,6 +252,8 @@ function setConnectionStatus(connected) {
 
 let lastLogVersion = 0;
 let lastLogGuid = "";
+// last known state of log items, polls only send the fields that changed
+let logItems = {};
 let lastSpokenNo = 0;
 
 export async function poll() {
@@ -274,119 +276,141 @@ export async function poll() {
       return false;
     }
 
-    // deselect chat if it is requested by the backend
-    if (response.deselect_chat) {
-      chatsStore.deselectChat();
-      return
-    }
+    updated = await applyUpdate(response, false);
+  } catch (error) {
+    console.error("Error:", error);
+    setConnectionStatus(false);
+  }
 
-    if (
-      response.context != context &&
-      !(response.context === null && context === null) &&
-      context !== null
-    ) {
-      return;
-    }
+  return updated;
+}
+
+async function applyUpdate(response, fromStream) {
+  // deselect chat if it is requested by the backend
+  if (response.deselect_chat) {
+    chatsStore.deselectChat();
+    return false;
+  }
 
-    // if the chat has been reset, restart this poll as it may have been called with incorrect log_from
-    if (lastLogGuid != response.log_guid) {
-      const chatHistoryEl = document.getElementById("chat-history");
-      if (chatHistoryEl) chatHistoryEl.innerHTML = "";
-      lastLogVersion = 0;
-      lastLogGuid = response.log_guid;
+  if (
+    response.context != context &&
+    !(response.context === null && context === null) &&
+    context !== null
+  ) {
+    return false;
+  }
+
+  // if the chat has been reset, restart this poll as it may have been called with incorrect log_from
+  // (the push stream sends the whole log itself when the guid changes)
+  if (lastLogGuid != response.log_guid) {
+    const chatHistoryEl = document.getElementById("chat-history");
+    if (chatHistoryEl) chatHistoryEl.innerHTML = "";
+    lastLogVersion = 0;
+    logItems = {};
+    lastLogGuid = response.log_guid;
+    if (!fromStream) {
       await poll();
-      return;
+      return false;
     }
+  }
 
-    if (lastLogVersion != response.log_version) {
-      updated = true;
-      for (const log of response.logs) {
-        const messageId = log.id || log.no; // Use log.id if available
-        setMessage(
-          messageId,
-          log.type,
-          log.heading,
-          log.content,
-          log.temp,
-          log.kvps
-        );
-      }
-      afterMessagesUpdate(response.logs);
+  let updated = false;
+  if (lastLogVersion != response.log_version) {
+    updated = true;
+    const logs = [];
+    for (const change of response.logs) {
+      const log = (logItems[change.no] = { ...logItems[change.no], ...change });
+      logs.push(log);
+      const messageId = log.id || log.no; // Use log.id if available
+      setMessage(
+        messageId,
+        log.type,
+        log.heading,
+        log.content,
+        log.temp,
+        log.kvps
+      );
     }
+    afterMessagesUpdate(logs);
+  }
 
-    lastLogVersion = response.log_version;
-    lastLogGuid = response.log_guid;
+  lastLogVersion = response.log_version;
+  lastLogGuid = response.log_guid;
 
-    updateProgress(response.log_progress, response.log_progress_active);
+  updateProgress(response.log_progress, response.log_progress_active);
 
-    // Update notifications from response
-    notificationStore.updateFromPoll(response);
+  // Update notifications from response
+  notificationStore.updateFromPoll(response);
 
-    //set ui model vars from backend
-    inputStore.paused = response.paused;
+  //set ui model vars from backend
+  inputStore.paused = response.paused;
 
-    // Update status icon state
-    setConnectionStatus(true);
+  // Update status icon state
+  setConnectionStatus(true);
 
-    // Update chats list using store
-    let contexts = response.contexts || [];
-    chatsStore.applyContexts(contexts);
+  // the push stream only sends the lists when they changed
+  if (fromStream && !response.contexts) {
+    lastLogVersion = response.log_version;
+    lastLogGuid = response.log_guid;
+    return updated;
+  }
 
-    // Update tasks list using store
-    let tasks = response.tasks || [];
-    tasksStore.applyTasks(tasks);
+  // Update chats list using store
+  let contexts = response.contexts || [];
+  chatsStore.applyContexts(contexts);
 
-    // Make sure the active context is properly selected in both lists
-    if (context) {
-      // Update selection in both stores
-      chatsStore.setSelected(context);
+  // Update tasks list using store
+  let tasks = response.tasks || [];
+  tasksStore.applyTasks(tasks);
 
-      const contextInChats = chatsStore.contains(context);
-      const contextInTasks = tasksStore.contains(context);
+  // Make sure the active context is properly selected in both lists
+  if (context) {
+    // Update selection in both stores
+    chatsStore.setSelected(context);
 
-      if (contextInTasks) {
-        tasksStore.setSelected(context);
-      }
+    const contextInChats = chatsStore.contains(context);
+    const contextInTasks = tasksStore.contains(context);
 
-      if (!contextInChats && !contextInTasks) {
-        if (chatsStore.contexts.length > 0) {
-          // If it doesn't exist in the list but other contexts do, fall back to the first
-          const firstChatId = chatsStore.firstId();
-          if (firstChatId) {
-            setContext(firstChatId);
-            chatsStore.setSelected(firstChatId);
-          }
-        } else if (typeof deselectChat === "function") {
-          // No contexts remain – clear state so the welcome screen can surface
-          deselectChat();
-        }
-      }
-    } else {
-      const welcomeStore =
-        globalThis.Alpine && typeof globalThis.Alpine.store === "function"
-          ? globalThis.Alpine.store("welcomeStore")
-          : null;
-      const welcomeVisible = Boolean(welcomeStore && welcomeStore.isVisible);
-
-      // No context selected, try to select the first available item unless welcome screen is active
-      if (!welcomeVisible && contexts.length > 0) {
+    if (contextInTasks) {
+      tasksStore.setSelected(context);
+    }
+
+    if (!contextInChats && !contextInTasks) {
+      if (chatsStore.contexts.length > 0) {
+        // If it doesn't exist in the list but other contexts do, fall back to the first
         const firstChatId = chatsStore.firstId();
         if (firstChatId) {
           setContext(firstChatId);
           chatsStore.setSelected(firstChatId);
         }
+      } else if (typeof deselectChat === "function") {
+        // No contexts remain – clear state so the welcome screen can surface
+        deselectChat();
+      }
+    }
+  } else {
+    const welcomeStore =
+      globalThis.Alpine && typeof globalThis.Alpine.store === "function"
+        ? globalThis.Alpine.store("welcomeStore")
+        : null;
+    const welcomeVisible = Boolean(welcomeStore && welcomeStore.isVisible);
+
+    // No context selected, try to select the first available item unless welcome screen is active
+    if (!welcomeVisible && contexts.length > 0) {
+      const firstChatId = chatsStore.firstId();
+      if (firstChatId) {
+        setContext(firstChatId);
+        chatsStore.setSelected(firstChatId);
       }
     }
-
-    lastLogVersion = response.log_version;
-    lastLogGuid = response.log_guid;
-  } catch (error) {
-    console.error("Error:", error);
-    setConnectionStatus(false);
   }
 
+  lastLogVersion = response.log_version;
+  lastLogGuid = response.log_guid;
+
   return updated;
 }
+
 globalThis.poll = poll;
 
 function afterMessagesUpdate(logs) {
@@ -477,6 +501,7 @@ export const setContext = function (id) {
   // This ensures we get fresh data from the backend
   lastLogGuid = "";
   lastLogVersion = 0;
+  logItems = {};
   lastSpokenNo = 0;
 
   // Stop speech when switching chats
@@ -573,6 +598,53 @@ globalThis.updateAfterScroll = updateAfterScroll;
 
 // setInterval(poll, 250);
 
+// server push stream (/poll_stream), replaces polling while it is connected
+let eventSource = null;
+let eventSourceContext = null;
+let eventSourceRetryAt = 0;
+const eventSourceRetryDelay = 10000;
+
+function streamActive() {
+  return eventSource !== null && eventSourceContext === context;
+}
+
+function openStream() {
+  closeStream();
+  if (typeof EventSource === "undefined" || Date.now() < eventSourceRetryAt) return;
+
+  const params = new URLSearchParams({
+    context: context || "",
+    log_guid: lastLogGuid,
+    log_from: lastLogVersion,
+    notifications_guid: notificationStore.lastNotificationGuid || "",
+    notifications_from: notificationStore.lastNotificationVersion || 0,
+    timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+  });
+  const source = new EventSource(`/poll_stream?${params}`);
+  source.onmessage = async (event) => {
+    if (source !== eventSource) return;
+    try {
+      await applyUpdate(JSON.parse(event.data), true);
+    } catch (error) {
+      console.error("Error:", error);
+    }
+  };
+  source.onerror = () => {
+    // fall back to polling for a while
+    if (source !== eventSource) return;
+    closeStream();
+    eventSourceRetryAt = Date.now() + eventSourceRetryDelay;
+  };
+  eventSource = source;
+  eventSourceContext = context;
+}
+
+function closeStream() {
+  if (eventSource) eventSource.close();
+  eventSource = null;
+  eventSourceContext = null;
+}
+
 async function startPolling() {
   const shortInterval = 25;
   const longInterval = 250;
@@ -583,10 +655,15 @@ async function startPolling() {
     let nextInterval = longInterval;
 
     try {
-      const result = await poll();
-      if (result) shortIntervalCount = shortIntervalPeriod; // Reset the counter when the result is true
-      if (shortIntervalCount > 0) shortIntervalCount--; // Decrease the counter on each call
-      nextInterval = shortIntervalCount > 0 ? shortInterval : longInterval;
+      // while the push stream is connected, only watch for context switches
+      if (!streamActive()) {
+        const result = await poll();
+        if (result) shortIntervalCount = shortIntervalPeriod; // Reset the counter when the result is true
+        if (shortIntervalCount > 0) shortIntervalCount--; // Decrease the counter on each call
+        nextInterval = shortIntervalCount > 0 ? shortInterval : longInterval;
+        // open the stream after a poll, which also obtains the csrf cookie
+        openStream();
+      }
     } catch (error) {
       console.error("Error:", error);
     }